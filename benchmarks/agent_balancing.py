@@ -0,0 +1,146 @@
+"""
+Simulated tail latency of agent replica selection policies under skewed load
+
+Usage:
+    python benchmarks/agent_balancing.py --replicas 4 --requests 200000 --utilization 0.7
+
+A discrete-event simulation of one agent pool: Poisson arrivals, lognormal
+service times and replicas of unequal speed, where the slow replica moves
+halfway through the run (a noisy neighbour appearing elsewhere). Each
+policy sees the same arrivals and service demands:
+
+- static: each query class is pinned to one replica, as with fixed
+  keyword routing; the class mix is Zipf-skewed
+- round_robin: replicas in turn
+- shared: one queue that idle replicas pull from (AgentPool "shared")
+- p2c, least_outstanding: lexicontrail.balancing.LoadBalancer, the code
+  AgentPool uses, fed with simulated service times
+
+Latency percentiles (in units of the mean service time) and the share of
+requests each replica served are printed as JSON.
+"""
+
+import argparse
+import heapq
+import json
+from collections import deque
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from lexicontrail.balancing import LoadBalancer
+
+POLICIES = ("static", "round_robin", "shared", "p2c", "least_outstanding")
+
+
+def make_workload(requests: int, replicas: int, utilization: float, classes: int,
+                  skew: float, slowdown: float, seed: int) -> Dict[str, np.ndarray]:
+    """Arrival times, service demands and query classes shared by all policies"""
+    rng = np.random.default_rng(seed)
+    # Capacity in requests per unit time, with one replica ``slowdown`` times slower
+    capacity = (replicas - 1) + 1 / slowdown
+    gaps = rng.exponential(1.0 / (utilization * capacity), requests)
+    weights = 1.0 / np.arange(1, classes + 1) ** skew
+    return {
+        "arrivals": np.cumsum(gaps),
+        # Mean service demand of 1 time unit
+        "demands": rng.lognormal(-0.5, 1.0, requests),
+        "classes": rng.choice(classes, size=requests, p=weights / weights.sum()),
+    }
+
+
+def simulate(policy: str, workload: Dict[str, np.ndarray], replicas: int,
+             slowdown: float, seed: int) -> Dict[str, object]:
+    arrivals, demands, classes = workload["arrivals"], workload["demands"], workload["classes"]
+    n = len(arrivals)
+    switch_at = arrivals[n // 2]
+    balancer = LoadBalancer(replicas, policy, seed=seed) if policy in ("p2c", "least_outstanding") else None
+
+    def service_time(replica: int, demand: float, now: float) -> float:
+        slow = 0 if now < switch_at else replicas - 1
+        return demand * (slowdown if replica == slow else 1.0)
+
+    queues: List[deque] = [deque() for _ in range(replicas)]
+    shared: deque = deque()
+    idle = set(range(replicas))
+    served = [0] * replicas
+    latencies = np.empty(n)
+    events: list = []  # (completed_at, replica, request, started_at)
+    next_arrival = 0
+    turn = 0
+
+    def start(replica: int, request: int, now: float):
+        idle.discard(replica)
+        heapq.heappush(events, (now + service_time(replica, demands[request], now), replica, request, now))
+
+    while next_arrival < n or events:
+        if events and (next_arrival >= n or events[0][0] <= arrivals[next_arrival]):
+            now, replica, request, started = heapq.heappop(events)
+            latencies[request] = now - arrivals[request]
+            served[replica] += 1
+            if balancer is not None:
+                balancer.release(replica, 1, now - started)
+            source = shared if policy == "shared" else queues[replica]
+            if source:
+                start(replica, source.popleft(), now)
+            else:
+                idle.add(replica)
+            continue
+
+        now, request = arrivals[next_arrival], next_arrival
+        next_arrival += 1
+        if policy == "shared":
+            if idle:
+                start(min(idle), request, now)
+            else:
+                shared.append(request)
+            continue
+        if policy == "static":
+            replica = int(classes[request]) % replicas
+        elif policy == "round_robin":
+            replica, turn = turn, (turn + 1) % replicas
+        else:
+            replica = balancer.acquire()
+        if replica in idle:
+            start(replica, request, now)
+        else:
+            queues[replica].append(request)
+
+    p50, p95, p99, p999 = np.percentile(latencies, [50, 95, 99, 99.9])
+    return {
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "p99.9": round(float(p999), 3),
+        "mean": round(float(latencies.mean()), 3),
+        "replica_share": [round(count / n, 3) for count in served],
+    }
+
+
+def main(argv: Sequence[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--replicas", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--utilization", type=float, default=0.7)
+    parser.add_argument("--slowdown", type=float, default=4.0,
+                        help="Service time multiplier of the slow replica")
+    parser.add_argument("--classes", type=int, default=8, help="Query classes for static routing")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of the class mix")
+    parser.add_argument("--policies", nargs="+", choices=POLICIES, default=list(POLICIES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    workload = make_workload(args.requests, args.replicas, args.utilization, args.classes,
+                             args.skew, args.slowdown, args.seed)
+    report = {
+        "parameters": vars(args),
+        "latency": {
+            policy: simulate(policy, workload, args.replicas, args.slowdown, args.seed)
+            for policy in args.policies
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
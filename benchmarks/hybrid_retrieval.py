@@ -0,0 +1,123 @@
+"""
+Recall and stage latency of dense, BM25 and fused retrieval on keyword-heavy queries
+
+Usage:
+    python benchmarks/hybrid_retrieval.py --chunks 50000 --queries 500 --k 5
+
+Builds a synthetic legal corpus where each chunk is boilerplate drawn from
+a shared vocabulary plus one docket number and one statute citation, as
+in case law and filings. Each query names one chunk's docket number and a
+few of its words, the way practitioners search. The target chunk must be
+in the top k.
+
+Modes follow ``retrieval_config["hybrid"]``:
+
+- dense: exact cosine search over the embeddings (the ``retrieval`` stage)
+- sparse: ``InvertedIndex`` BM25 only (the ``bm25`` stage)
+- rrf: both, ``fusion_depth`` deep, merged by reciprocal rank fusion
+
+Recall@k and per-stage latency percentiles (ms) are printed as JSON.
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from lexicontrail.embeddings import HashingEmbedding
+from lexicontrail.retrieval import Retriever, reciprocal_rank_fusion
+from lexicontrail.sparse_index import InvertedIndex
+from lexicontrail.vector_store import MmapVectorStore
+
+
+def make_corpus(chunks: int, vocabulary: int, words: int, seed: int) -> List[str]:
+    rng = np.random.default_rng(seed)
+    vocab = [f"term{i}" for i in range(vocabulary)]
+    # Unique docket numbers, assigned in random order
+    dockets = rng.permutation(chunks)
+    texts = []
+    for i in range(chunks):
+        body = " ".join(vocab[j] for j in rng.integers(0, vocabulary, words))
+        docket = f"{19 + dockets[i] % 5}-cv-{dockets[i] // 5:05d}"
+        statute = f"{rng.integers(1, 50)} U.S.C. § {rng.integers(1, 3000)}"
+        texts.append(f"In docket No. {docket}, the court considered {statute}. {body}")
+    return texts
+
+
+def make_queries(texts: Sequence[str], queries: int, seed: int) -> List[tuple]:
+    rng = np.random.default_rng(seed + 1)
+    targets = rng.choice(len(texts), size=queries, replace=False)
+    result = []
+    for target in targets:
+        words = texts[target].split()
+        docket = words[3].rstrip(",")
+        chosen = " ".join(rng.choice(words[10:], size=3, replace=False))
+        result.append((int(target), f"what did the court hold in {docket} about {chosen}"))
+    return result
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    p50, p95 = np.percentile(samples, [50, 95]) if samples else (0.0, 0.0)
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3)}
+
+
+def main(argv: Sequence[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--fusion-depth", type=int, default=50)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=120, help="Boilerplate words per chunk")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    texts = make_corpus(args.chunks, args.vocabulary, args.words, args.seed)
+    ids = [f"doc:{i}" for i in range(len(texts))]
+    embedder = HashingEmbedding(dim=args.dim)
+    with tempfile.TemporaryDirectory() as path:
+        store = MmapVectorStore(path, dim=args.dim)
+        store.add(ids, ["doc"] * len(ids), embedder.embed(texts))
+        retriever = Retriever(store, embedder, mode="exact")
+        index = InvertedIndex()
+        start = time.perf_counter()
+        index.add("doc", ids, texts)
+        build_s = time.perf_counter() - start
+
+        timings: Dict[str, List[float]] = {"embed": [], "retrieval": [], "bm25": [], "fusion": []}
+        found = {"dense": 0, "sparse": 0, "rrf": 0}
+        depth = max(args.k, args.fusion_depth)
+        for target, query in make_queries(texts, args.queries, args.seed):
+            start = time.perf_counter()
+            vector = embedder.embed_query(query)[np.newaxis]
+            timings["embed"].append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            dense = retriever.search(vector, k=depth)[0]
+            timings["retrieval"].append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            sparse = index.search(query, k=depth)
+            timings["bm25"].append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            fused = reciprocal_rank_fusion([dense, sparse], limit=args.k)
+            timings["fusion"].append((time.perf_counter() - start) * 1000)
+
+            target_id = ids[target]
+            for mode, hits in (("dense", dense), ("sparse", sparse), ("rrf", fused)):
+                found[mode] += any(hit.node_id == target_id for hit in hits[:args.k])
+
+        report = {
+            "parameters": vars(args),
+            "index": {**index.stats(), "build_s": round(build_s, 2)},
+            f"recall@{args.k}": {mode: round(count / args.queries, 3) for mode, count in found.items()},
+            "stage_latency_ms": {stage: percentiles(samples) for stage, samples in timings.items()},
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Cold-start benchmark: import time and client construction
+
+Usage:
+    python benchmarks/import_time.py --runs 10 --budget-ms 400
+
+Each run starts a fresh interpreter, imports lexicontrail, builds a client
+and calls health_check(). The median wall time of each stage and the heavy
+modules that were loaded are printed as JSON. The script exits with status
+1 if the median cold start exceeds --budget-ms or if a module that must be
+imported lazily (LlamaIndex by default) was loaded, so it can gate CI.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import lexicontrail
+imported = time.perf_counter()
+from lexicontrail import LexiconTrailClient
+client_imported = time.perf_counter()
+client = LexiconTrailClient(api_key="benchmark")
+client.health_check()
+ready = time.perf_counter()
+client.close()
+print(json.dumps({
+    "import_package_ms": (imported - start) * 1000,
+    "import_client_ms": (client_imported - imported) * 1000,
+    "construct_and_health_check_ms": (ready - client_imported) * 1000,
+    "cold_start_ms": (ready - start) * 1000,
+    "modules": sorted({name.split(".")[0] for name in sys.modules}),
+}))
+"""
+
+
+def run_probe() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=400.0)
+    parser.add_argument("--forbid", nargs="*", default=["llama_index"],
+                        help="Top-level modules that must not be loaded at cold start")
+    args = parser.parse_args()
+
+    probes = [run_probe() for _ in range(args.runs)]
+    stages = [key for key in probes[0] if key.endswith("_ms")]
+    report = {
+        "runs": args.runs,
+        "median": {stage: statistics.median(p[stage] for p in probes) for stage in stages},
+        "max": {stage: max(p[stage] for p in probes) for stage in stages},
+        "budget_ms": args.budget_ms,
+        "forbidden_loaded": sorted(set(args.forbid) & set(probes[0]["modules"])),
+    }
+    failures = []
+    if report["median"]["cold_start_ms"] > args.budget_ms:
+        failures.append(f"median cold start {report['median']['cold_start_ms']:.1f}ms "
+                        f"exceeds budget {args.budget_ms:.1f}ms")
+    if report["forbidden_loaded"]:
+        failures.append(f"eagerly imported: {', '.join(report['forbidden_loaded'])}")
+    report["failures"] = failures
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Memory held per chunk and per result object, before and after the compact layouts
+
+Usage:
+    python benchmarks/memory_footprint.py --chunks 1000000 --documents 2000 --results 100000
+
+Measures with tracemalloc the memory retained by:
+
+- chunk metadata: the vector store's former per-row Python lists (a node
+  id string, a document id string and a span tuple per row, plus a row
+  list per document) against ``ChunkTable``'s typed-array columns; both
+  are loaded from the same ``ids.jsonl`` records, as ``refresh`` does
+- result objects: the former ``__dict__`` dataclasses holding lists
+  against the frozen, slotted ``QueryResponse``/``DocumentAnalysisResult``
+  with tuple fields and interned entity and concept strings; values are
+  decoded from JSON so every string starts out as its own copy, as it
+  does when read from an analyzer or a cache
+
+Bytes per chunk and per result are printed as JSON.
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence
+
+from lexicontrail.client import DocumentAnalysisResult, QueryResponse
+from lexicontrail.vector_store import ChunkTable
+
+ENTITIES = ["Basel Committee", "Federal Reserve", "European Central Bank", "IMF", "BIS"]
+TOPICS = ["liquidity", "capital adequacy", "stress testing", "credit risk"]
+AGENTS = ["QueryProcessor", "ResponseGenerator"]
+
+
+@dataclass
+class LegacyQueryResponse:
+    answer: str
+    confidence: float
+    sources: List[str]
+    agents_used: List[str]
+    processing_time_ms: int
+    metadata: Dict[str, Any]
+
+
+@dataclass
+class LegacyDocumentAnalysisResult:
+    document_id: str
+    entities: List[str]
+    key_concepts: List[str]
+    summary: str
+    embeddings_created: int
+    processing_time_ms: int
+
+
+def make_records(chunks: int, documents: int) -> List[str]:
+    """``ids.jsonl`` lines of a store; half the documents came from files"""
+    per_document = max(1, chunks // documents)
+    lines = []
+    for row in range(chunks):
+        doc = row // per_document
+        doc_id = f"doc_{doc:016x}"
+        record = {"id": f"{doc_id}:{row % per_document}", "doc_id": doc_id}
+        if doc % 2:
+            start = (row % per_document) * 3000
+            record["span"] = [start, start + 4096]
+        lines.append(json.dumps(record))
+    return lines
+
+
+def load_lists(lines: Sequence[str]):
+    ids, doc_ids, spans, doc_rows = [], [], [], {}
+    for row, line in enumerate(lines):
+        record = json.loads(line)
+        ids.append(record["id"])
+        doc_ids.append(record["doc_id"])
+        span = record.get("span")
+        spans.append(tuple(span) if span is not None else None)
+        doc_rows.setdefault(record["doc_id"], []).append(row)
+    return ids, doc_ids, spans, doc_rows
+
+
+def load_table(lines: Sequence[str]) -> ChunkTable:
+    table = ChunkTable()
+    for line in lines:
+        record = json.loads(line)
+        table.append(record["id"], record["doc_id"], record.get("span"))
+    return table
+
+
+def make_results(count: int, legacy: bool) -> list:
+    """Cached query responses and document results, half of each"""
+    query_cls = LegacyQueryResponse if legacy else QueryResponse
+    document_cls = LegacyDocumentAnalysisResult if legacy else DocumentAnalysisResult
+    results = []
+    for i in range(count):
+        # Fresh string objects, as decoded from an agent or a cache entry
+        sources, agents, entities, topics = json.loads(json.dumps(
+            [[f"doc_{i % 997:016x}", f"doc_{i % 991:016x}"], AGENTS, ENTITIES, TOPICS]
+        ))
+        if i % 2:
+            results.append(query_cls(f"Answer {i}", 0.92, sources, agents, 120,
+                                     {"query_type": "factual", "cache_hit": False}))
+        else:
+            results.append(document_cls(f"doc_{i:016x}", entities, topics,
+                                        "Document processed using multi-agent architecture.", 12, 200))
+    return results
+
+
+def retained_bytes(build: Callable[[], Any]) -> int:
+    """Memory still allocated once ``build`` returns, while its result lives"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del value
+    return after - before
+
+
+def main(argv: Sequence[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=1000000)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--results", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    lines = make_records(args.chunks, args.documents)
+    lists = retained_bytes(lambda: load_lists(lines))
+    table = retained_bytes(lambda: load_table(lines))
+    legacy_results = retained_bytes(lambda: make_results(args.results, legacy=True))
+    results = retained_bytes(lambda: make_results(args.results, legacy=False))
+
+    def per(total: int, count: int) -> float:
+        return round(total / count, 1)
+
+    report = {
+        "parameters": vars(args),
+        "bytes_per_chunk": {
+            "lists": per(lists, args.chunks),
+            "chunk_table": per(table, args.chunks),
+            "reduction": round(lists / table, 2),
+        },
+        "bytes_per_result": {
+            "dataclass_lists": per(legacy_results, args.results),
+            "slotted_tuples_interned": per(results, args.results),
+            "reduction": round(legacy_results / results, 2),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
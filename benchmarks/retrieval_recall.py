@@ -0,0 +1,81 @@
+"""
+Recall/latency benchmark of IVF retrieval against exact search
+
+Usage:
+    python benchmarks/retrieval_recall.py --corpus 200000 --dim 256 --queries 200
+
+Generates a clustered synthetic corpus, measures exact top-k latency, then
+reports recall@k and latency of IVF search for a range of nprobe values.
+Results are printed as JSON.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from lexicontrail.retrieval import IVFIndex, exact_top_k
+
+
+def make_corpus(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(truth: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.corpus, args.dim, clusters=max(16, args.corpus // 2000), seed=args.seed)
+    queries = corpus[np.random.default_rng(args.seed + 1).choice(args.corpus, args.queries)]
+    queries = queries + 0.05 * np.random.default_rng(args.seed + 2).standard_normal(queries.shape).astype(np.float32)
+
+    start = time.perf_counter()
+    _, truth = exact_top_k(queries, corpus, args.k)
+    exact_ms = (time.perf_counter() - start) * 1000
+
+    nlist = args.nlist or int(4 * np.sqrt(args.corpus))
+    start = time.perf_counter()
+    index = IVFIndex.train(corpus, nlist, seed=args.seed)
+    index.add(corpus)
+    build_s = time.perf_counter() - start
+
+    report = {
+        "corpus": args.corpus,
+        "dim": args.dim,
+        "queries": args.queries,
+        "k": args.k,
+        "exact": {"latency_ms_per_query": exact_ms / args.queries},
+        "ivf": {"nlist": nlist, "build_s": build_s, "runs": []},
+    }
+    for nprobe in args.nprobe:
+        start = time.perf_counter()
+        _, found = index.search(queries, corpus, args.k, nprobe=nprobe)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        report["ivf"]["runs"].append({
+            "nprobe": nprobe,
+            "recall_at_k": recall_at_k(truth, found),
+            "latency_ms_per_query": elapsed_ms / args.queries,
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
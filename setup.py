@@ -33,6 +33,11 @@ setup(
         "Programming Language :: Python :: 3.11",
     ],
     package_dir={"": "src"},
+    entry_points={
+        "console_scripts": [
+            "lexicontrail-bench=lexicontrail.bench:main",
+        ],
+    },
     packages=find_packages(where="src"),
     python_requires=">=3.8",
     install_requires=[
@@ -52,6 +57,9 @@ setup(
             "isort>=5.12.0",
             "flake8>=6.0.0",
         ],
+        "metrics": [
+            "prometheus-client>=0.17.0",
+        ],
         "docs": [
             "mkdocs>=1.5.0",
             "mkdocs-material>=9.1.0",
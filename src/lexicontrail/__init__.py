@@ -5,18 +5,47 @@ This is a demonstration package showing the architecture and design patterns
 of LexiconTrail without revealing proprietary implementation details.
 """
 
-from .client import LexiconTrailClient
-from .mock_agents import DocumentAnalyzer, QueryProcessor, ResponseGenerator
+import importlib
+from typing import TYPE_CHECKING
+
 from .exceptions import LexiconTrailError
 
+if TYPE_CHECKING:
+    from .client import LexiconTrailClient
+    from .async_client import AsyncLexiconTrailClient
+    from .mock_agents import DocumentAnalyzer, QueryProcessor, ResponseGenerator
+
 __version__ = "1.0.0"
 __author__ = "The AI Cowboys"
 __email__ = "m_pendleton@theaicowboys.com"
 
 __all__ = [
     "LexiconTrailClient",
+    "AsyncLexiconTrailClient",
     "DocumentAnalyzer",
     "QueryProcessor", 
     "ResponseGenerator",
     "LexiconTrailError"
-]
\ No newline at end of file
+]
+
+# Public names resolved on first access, so ``import lexicontrail`` stays cheap
+_LAZY_EXPORTS = {
+    "LexiconTrailClient": ".client",
+    "AsyncLexiconTrailClient": ".async_client",
+    "DocumentAnalyzer": ".mock_agents",
+    "QueryProcessor": ".mock_agents",
+    "ResponseGenerator": ".mock_agents",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_EXPORTS))
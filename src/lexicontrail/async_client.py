@@ -0,0 +1,202 @@
+"""
+Asyncio client for LexiconTrail
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .chunking import TextSource
+from .client import DocumentAnalysisResult, LexiconTrailClient, QueryResponse
+from .streaming import AsyncTokenStream
+from .tracing import propagate, span
+
+
+class AsyncLexiconTrailClient:
+    """
+    Asyncio counterpart of ``LexiconTrailClient``.
+
+    All methods are coroutines that run on the caller's event loop, so many
+    concurrent requests can be served without a thread per request. Blocking
+    steps (parsing, embedding, vector search, cache backends) are handed to
+    the loop's default executor so they never stall other requests. The
+    agent orchestrator and query cache are shared with a sync client: pass
+    an existing ``LexiconTrailClient`` as ``client`` to share its state, or
+    one is created from ``api_key`` and ``config``.
+    """
+
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 config: Optional[Dict[str, Any]] = None,
+                 client: Optional[LexiconTrailClient] = None):
+        """
+        Initialize the async client.
+
+        Args:
+            api_key: API key for authentication
+            config: Optional configuration dictionary
+            client: Existing sync client whose orchestrator and cache to share
+        """
+        if client is None:
+            if api_key is None:
+                raise ValueError("Either api_key or client must be provided")
+            client = LexiconTrailClient(api_key=api_key, config=config)
+        self.sync_client = client
+
+    @property
+    def orchestrator(self):
+        return self.sync_client.orchestrator
+
+    @property
+    def cache(self):
+        return self.sync_client.cache
+
+    async def _run_blocking(self, fn: Callable, *args) -> Any:
+        """Run a blocking call on the loop's default executor, inside the caller's trace"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, propagate(fn), *args)
+
+    async def analyze_document(self, document: str,
+                               metadata: Optional[Dict] = None) -> DocumentAnalysisResult:
+        """
+        Analyze a document using multi-agent approach.
+
+        Args:
+            document: Document text to analyze
+            metadata: Optional metadata
+
+        Returns:
+            DocumentAnalysisResult object
+        """
+        return await self._run_blocking(self.sync_client.analyze_document, document, metadata)
+
+    # Name used by earlier examples
+    analyze_document_async = analyze_document
+
+    async def analyze_file(self, path: str, metadata: Optional[Dict] = None,
+                           doc_id: Optional[str] = None) -> DocumentAnalysisResult:
+        """Memory-mapped file ingestion on the loop's default executor"""
+        return await self._run_blocking(self.sync_client.analyze_file, path, metadata, doc_id)
+
+    async def analyze_document_stream(self, source: TextSource,
+                                      metadata: Optional[Dict] = None,
+                                      doc_id: Optional[str] = None) -> DocumentAnalysisResult:
+        """
+        Analyze a large document incrementally without blocking the loop.
+
+        Reading and chunking run on the loop's default executor; see
+        ``LexiconTrailClient.analyze_document_stream``.
+        """
+        return await self._run_blocking(
+            self.sync_client.analyze_document_stream, source, metadata, doc_id
+        )
+
+    async def query(self,
+                    question: str,
+                    context: Optional[Dict] = None,
+                    use_cache: bool = True,
+                    return_sources: bool = True) -> QueryResponse:
+        """
+        Process a query using intelligent agent routing.
+
+        Args:
+            question: The query to process
+            context: Optional context
+            use_cache: Whether to use cache
+            return_sources: Whether to return sources
+
+        Returns:
+            QueryResponse object
+        """
+        client = self.sync_client
+        start = time.perf_counter()
+        try:
+            with client.tracer.start_trace("query") as trace:
+                response = await self._query(question, context, use_cache, return_sources)
+        finally:
+            client._observe_stage("query", start)
+        return client._attach_trace(response, trace)
+
+    async def _query(self, question: str, context: Optional[Dict], use_cache: bool,
+                     return_sources: bool) -> QueryResponse:
+        client = self.sync_client
+        start_time = time.time()
+
+        # Reads the store header, which may pick up rows from other processes
+        query_key = await self._run_blocking(client._query_key, question, context)
+        cache_key = query_key if use_cache and client.cache is not None else None
+        if cache_key is not None:
+            cached = await self._run_blocking(client._lookup_cached, cache_key, start_time,
+                                              return_sources)
+            if cached is not None:
+                return cached
+
+        query_vector = await self._run_blocking(client._embed_query, question)
+        classification = client._classify(question)
+        similar = None
+        if cache_key is not None and client.semantic_cache is not None:
+            similar = await self._run_blocking(client._lookup_similar, question, query_vector,
+                                               classification, cache_key, start_time,
+                                               return_sources)
+        if similar is not None and not client.semantic_cache.should_audit():
+            return similar
+
+        async def compute() -> QueryResponse:
+            hits = await self._run_blocking(client._retrieve, question, query_vector)
+            routed = await self.orchestrator.route_request_async(
+                client._route_payload(question, context, hits, classification)
+            )
+            response = client._build_response(question, routed, hits, start_time)
+            if similar is not None:
+                client._audit_similar(question, similar, response)
+            if cache_key is not None:
+                await self._run_blocking(client._store_response, response, cache_key, question,
+                                         query_vector, classification)
+            return response
+
+        # Identical queries already in flight against the same index, sync or
+        # async, share one run
+        with span("pipeline") as current:
+            if client.single_flight is None:
+                response, shared = await compute(), False
+            else:
+                response, shared = await client.single_flight.do_async(query_key, compute)
+            if current is not None:
+                current.set_attribute("coalesced", shared)
+        return client._finish_query(response, start_time, return_sources, shared)
+
+    async def query_stream(self,
+                           question: str,
+                           context: Optional[Dict] = None,
+                           callbacks: Optional[Dict[str, Any]] = None) -> AsyncTokenStream:
+        """
+        Stream a response for real-time applications.
+
+        Upstream agents run concurrently on the event loop; iterate the
+        returned stream with ``async for`` to receive tokens as they are
+        generated. When ``callbacks`` are given the stream is consumed
+        before returning.
+        """
+        client = self.sync_client
+        start_time = time.perf_counter()
+        try:
+            hits = await self._run_blocking(client._retrieve, question)
+            agents, tokens = await self.orchestrator.stream_request_async(
+                client._route_payload(question, context, hits)
+            )
+        except Exception as exc:
+            if callbacks and callbacks.get("on_error"):
+                callbacks["on_error"](exc)
+            raise
+        stream = AsyncTokenStream(tokens, agents, start_time=start_time, callbacks=callbacks)
+        if callbacks:
+            await stream.run()
+        return stream
+
+    def get_agent_status(self) -> Dict[str, Any]:
+        """Get current status of all agents"""
+        return self.sync_client.get_agent_status()
+
+    async def health_check(self) -> Dict[str, Any]:
+        """Perform system health check"""
+        return self.sync_client.health_check()
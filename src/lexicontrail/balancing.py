@@ -0,0 +1,115 @@
+"""
+Load- and latency-aware replica selection for agent pools
+"""
+
+import random
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from .exceptions import ConfigurationError
+
+# "shared": one admission queue that idle replicas pull from
+# "p2c": power of two choices over per-replica queues
+# "least_outstanding": the best-scoring replica over per-replica queues
+POLICIES = ("shared", "p2c", "least_outstanding")
+
+
+class ReplicaLoad:
+    """Outstanding requests and recent service latency of one replica"""
+
+    __slots__ = ("outstanding", "p95_ms", "_window")
+
+    def __init__(self, window: int = 64):
+        self.outstanding = 0
+        self.p95_ms = 0.0
+        self._window: deque = deque(maxlen=window)
+
+    def observe(self, latency_ms: float):
+        """Record the service time of one batch"""
+        self._window.append(latency_ms)
+        ordered = sorted(self._window)
+        self.p95_ms = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    @property
+    def score(self) -> float:
+        """Expected time for a new request to finish on this replica"""
+        return (self.outstanding + 1) * self.p95_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"outstanding": self.outstanding, "p95_ms": round(self.p95_ms, 3)}
+
+
+class LoadBalancer:
+    """
+    Picks the replica each new request is queued on.
+
+    A replica's score is its outstanding requests (queued plus running,
+    including the new one) times the p95 of its last ``window`` batch
+    service times, an estimate of when the new request would finish.
+    ``"p2c"`` compares two random replicas and takes the lower score,
+    which avoids the herding of always choosing the global minimum from
+    slightly stale numbers; ``"least_outstanding"`` scans every replica.
+    Replicas that have not served a batch yet score zero, so new or idle
+    replicas are tried first.
+    """
+
+    def __init__(self, replicas: int, policy: str = "p2c", window: int = 64,
+                 seed: Optional[int] = None):
+        """
+        Initialize the balancer.
+
+        Args:
+            replicas: Number of replicas
+            policy: ``"p2c"`` or ``"least_outstanding"``
+            window: Batches per replica in the p95 latency window
+            seed: Seed for the power-of-two-choices sampler
+        """
+        if policy not in ("p2c", "least_outstanding"):
+            raise ConfigurationError(f"Unknown load balancing policy: {policy}")
+        self.policy = policy
+        self.loads = [ReplicaLoad(window) for _ in range(replicas)]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def acquire(self) -> int:
+        """Choose a replica for a new request and count it as outstanding"""
+        with self._lock:
+            index = self._choose()
+            self.loads[index].outstanding += 1
+        return index
+
+    def release(self, index: int, count: int, latency_ms: Optional[float] = None):
+        """
+        Mark ``count`` requests on replica ``index`` as finished.
+
+        Args:
+            index: Replica the requests were queued on
+            count: Number of finished requests
+            latency_ms: Service time of their batch, if it ran
+        """
+        with self._lock:
+            load = self.loads[index]
+            load.outstanding -= count
+            if latency_ms is not None:
+                load.observe(latency_ms)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Load of every replica"""
+        with self._lock:
+            return [load.to_dict() for load in self.loads]
+
+    def _choose(self) -> int:
+        loads = self.loads
+        n = len(loads)
+        if n == 1:
+            return 0
+        if self.policy == "p2c":
+            a = self._rng.randrange(n)
+            b = self._rng.randrange(n - 1)
+            if b >= a:
+                b += 1
+            candidates = (a, b)
+        else:
+            candidates = range(n)
+        return min(candidates, key=lambda i: (loads[i].score, loads[i].outstanding))
@@ -0,0 +1,176 @@
+"""
+Parallel batch document analysis over a process pool
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .client import DocumentAnalysisResult, create_node_parser, run_document_analysis, run_file_analysis
+from .embeddings import create_embedder
+from .mock_agents import DocumentAnalyzer
+from .vector_store import MmapVectorStore
+
+DocumentInput = Union[str, Tuple[str, Optional[Dict]]]
+
+# Per-process parser and agent, built once by the pool initializer
+_worker_state: Dict[str, Any] = {}
+
+
+def _init_worker(llama_index_config: Dict[str, Any], index_path: Optional[str]):
+    """Build the node parser, analyzer and index handle once per worker process"""
+    _worker_state["llama_index_config"] = llama_index_config
+    _worker_state["node_parser"] = None
+    _worker_state["analyzer"] = DocumentAnalyzer()
+    _worker_state["embedder"] = None
+    _worker_state["vector_store"] = None
+    if index_path is not None:
+        embedder = create_embedder(llama_index_config, index_path)
+        _worker_state["embedder"] = embedder
+        _worker_state["vector_store"] = MmapVectorStore(
+            index_path,
+            dim=embedder.dim,
+            dtype=llama_index_config.get("embedding_dtype", "float32")
+        )
+
+
+def _node_parser():
+    # Built on first use, so workers that only map files never import LlamaIndex
+    if _worker_state["node_parser"] is None:
+        _worker_state["node_parser"] = create_node_parser(_worker_state["llama_index_config"])
+    return _worker_state["node_parser"]
+
+
+def _analyze_batch(batch: List[Tuple[str, Optional[Dict]]]) -> List[DocumentAnalysisResult]:
+    """Analyze one batch of documents inside a worker process"""
+    node_parser = _node_parser()
+    return [
+        run_document_analysis(
+            text,
+            metadata,
+            node_parser=node_parser,
+            analyzer=_worker_state["analyzer"],
+            embedder=_worker_state["embedder"],
+            vector_store=_worker_state["vector_store"]
+        )
+        for text, metadata in batch
+    ]
+
+
+def _analyze_file_batch(batch: List[Tuple[str, Optional[Dict]]]) -> List[DocumentAnalysisResult]:
+    """Analyze one batch of files, mapped by the worker itself"""
+    return [
+        run_file_analysis(
+            path,
+            metadata,
+            llama_index_config=_worker_state["llama_index_config"],
+            analyzer=_worker_state["analyzer"],
+            embedder=_worker_state["embedder"],
+            vector_store=_worker_state["vector_store"]
+        )
+        for path, metadata in batch
+    ]
+
+
+def _normalize(item: DocumentInput) -> Tuple[str, Optional[Dict]]:
+    if isinstance(item, str):
+        return item, None
+    text, metadata = item
+    return text, metadata
+
+
+def _batches(documents: Iterable[DocumentInput],
+             batch_size: int) -> Iterator[List[Tuple[str, Optional[Dict]]]]:
+    iterator = iter(documents)
+    while True:
+        batch = [_normalize(item) for item in islice(iterator, batch_size)]
+        if not batch:
+            return
+        yield batch
+
+
+def iter_analyze_documents(documents: Iterable[DocumentInput],
+                           llama_index_config: Dict[str, Any],
+                           index_path: Optional[str] = None,
+                           max_workers: Optional[int] = None,
+                           batch_size: int = 16,
+                           max_pending: Optional[int] = None) -> Iterator[DocumentAnalysisResult]:
+    """
+    Analyze documents across a process pool, yielding results as they finish.
+
+    Args:
+        documents: Iterable of document texts or (text, metadata) tuples
+        llama_index_config: Chunking and embedding configuration
+        index_path: Vector store directory that workers append embeddings to
+        max_workers: Number of worker processes (defaults to CPU count)
+        batch_size: Number of documents per worker task
+        max_pending: Maximum batches in flight (defaults to 2 * max_workers)
+
+    Yields:
+        DocumentAnalysisResult objects in completion order
+    """
+    return _run_batches(_analyze_batch, documents, llama_index_config, index_path,
+                        max_workers, batch_size, max_pending)
+
+
+def iter_analyze_files(paths: Iterable[DocumentInput],
+                       llama_index_config: Dict[str, Any],
+                       index_path: Optional[str] = None,
+                       max_workers: Optional[int] = None,
+                       batch_size: int = 16,
+                       max_pending: Optional[int] = None) -> Iterator[DocumentAnalysisResult]:
+    """
+    Analyze files across a process pool, yielding results as they finish.
+
+    Only paths cross the process boundary; each worker memory-maps its
+    files (see ``run_file_analysis``). Arguments are as for
+    ``iter_analyze_documents``, with file paths in place of texts.
+    """
+    return _run_batches(_analyze_file_batch, paths, llama_index_config, index_path,
+                        max_workers, batch_size, max_pending)
+
+
+def _run_batches(task: Callable[[List[Tuple[str, Optional[Dict]]]], List[DocumentAnalysisResult]],
+                 items: Iterable[DocumentInput],
+                 llama_index_config: Dict[str, Any],
+                 index_path: Optional[str],
+                 max_workers: Optional[int],
+                 batch_size: int,
+                 max_pending: Optional[int]) -> Iterator[DocumentAnalysisResult]:
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    max_workers = max_workers or os.cpu_count() or 1
+    batches = _batches(items, batch_size)
+
+    if max_workers == 1:
+        _init_worker(llama_index_config, index_path)
+        for batch in batches:
+            yield from task(batch)
+        return
+
+    max_pending = max_pending or 2 * max_workers
+    # Spawned, not forked: the parent client runs background threads (batchers,
+    # pools, cache writers) whose locks a fork could copy mid-hold, and workers
+    # rebuild everything they need from the config in _init_worker anyway
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker,
+                             initargs=(llama_index_config, index_path)) as executor:
+        pending = set()
+        try:
+            for batch in batches:
+                pending.add(executor.submit(task, batch))
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        finally:
+            # Consumer stopped early or a batch failed: drop queued work
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,203 @@
+"""
+Dynamic micro-batching of agent calls
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from .exceptions import AgentError
+from .metrics import AgentMetrics, Histogram
+from .tracing import current_span
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+QUEUE_WAIT_MS_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Gathers concurrent requests for one agent into batches.
+
+    A dispatcher thread takes the first queued request, then keeps
+    collecting until ``batch_size`` requests are gathered or the first
+    request has waited ``max_wait_ms``. The batch goes to the agent's
+    ``process_batch`` hook and each caller's future gets its own result.
+    """
+
+    def __init__(self, agent, batch_size: int = 8, max_wait_ms: float = 2.0):
+        """
+        Initialize the batcher.
+
+        Args:
+            agent: Agent whose ``process_batch`` is called
+            batch_size: Maximum number of requests per batch
+            max_wait_ms: Maximum time the oldest request waits for a batch to fill
+        """
+        self.agent = agent
+        self.replicas = [agent]
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._busy = 0
+
+    def submit(self, item: Any) -> Future:
+        """Queue ``item`` for the next batch and return a future for its result"""
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise AgentError(f"Batcher for {self.agent.name} is closed")
+            if not self._threads:
+                self._start_workers()
+        # The caller's span (if traced) becomes the parent of this request's
+        # agent span, which is recorded on the dispatcher thread
+        self._enqueue((item, future, time.perf_counter(), current_span()))
+        return future
+
+    def process(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Submit ``item`` and block until its result is ready"""
+        return self.submit(item).result(timeout)
+
+    def close(self):
+        """Stop the dispatcher thread after draining queued requests"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+        for replica in self.replicas[:len(threads)]:
+            self._queue_for(replica).put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def merged_metrics(self) -> AgentMetrics:
+        """Request counts and latency sketch (queue wait included) over all replicas"""
+        return AgentMetrics.merged([replica.agent_metrics for replica in self.replicas])
+
+    def agent_metrics(self) -> Dict[str, Any]:
+        """Request, error and latency-percentile totals over all replicas"""
+        return self.merged_metrics().snapshot()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batch-size and queue-wait histograms"""
+        return {
+            "batch_size_limit": self.batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self.queue_depth,
+            "batch_sizes": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+    def _start_workers(self):
+        """Start one dispatcher thread per agent replica (called under the lock)"""
+        for index, replica in enumerate(self.replicas):
+            thread = threading.Thread(
+                target=self._run,
+                args=(replica,),
+                name=f"batcher-{self.agent.name}-{index}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _enqueue(self, entry: Tuple):
+        self._queue.put(entry)
+
+    def _queue_for(self, agent) -> "queue.Queue":
+        """Queue the worker serving ``agent`` takes requests from"""
+        return self._queue
+
+    def _run(self, agent):
+        source = self._queue_for(agent)
+        while True:
+            first = source.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first, source)
+            self._dispatch(agent, batch)
+            if stop:
+                # The sentinel belonged to this worker; any remaining ones
+                # are picked up by the other workers
+                return
+
+    def _collect(self, first: Tuple, source: "queue.Queue") -> Tuple[List[Tuple], bool]:
+        """Fill a batch starting from ``first``; returns (batch, stop_requested)"""
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    item = source.get(timeout=remaining)
+                else:
+                    # Deadline passed: take whatever is already waiting
+                    item = source.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _dispatch(self, agent, batch: List[Tuple]):
+        # Callers that gave up while queued have cancelled their futures
+        batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        dispatched_at = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for _, _, enqueued_at, _ in batch:
+            self.queue_wait_ms.observe((dispatched_at - enqueued_at) * 1000)
+
+        futures = [future for _, future, _, _ in batch]
+        with self._lock:
+            self._busy += 1
+        try:
+            results = agent.process_batch([item for item, _, _, _ in batch])
+            if len(results) != len(batch):
+                raise AgentError(
+                    f"{agent.name}.process_batch returned {len(results)} "
+                    f"results for {len(batch)} inputs"
+                )
+        except Exception as exc:
+            agent.record_error(len(batch))
+            self._trace(agent, batch, dispatched_at, error=exc)
+            for future in futures:
+                future.set_exception(exc)
+            return
+        finally:
+            with self._lock:
+                self._busy -= 1
+        completed_at = self._trace(agent, batch, dispatched_at)
+        for (_, future, enqueued_at, _), result in zip(batch, results):
+            agent.update_metrics((completed_at - enqueued_at) * 1000)
+            future.set_result(result)
+
+    def _trace(self, agent, batch: List[Tuple], dispatched_at: float,
+               error: Optional[Exception] = None) -> float:
+        """Record an agent span for every traced request in a finished batch"""
+        completed_at = time.perf_counter()
+        for _, _, enqueued_at, parent in batch:
+            if parent is None:
+                continue
+            attributes = {
+                "queue_wait_ms": round((dispatched_at - enqueued_at) * 1000, 3),
+                "batch_size": len(batch),
+                "model_type": agent.model_type,
+            }
+            if error is not None:
+                attributes["error"] = type(error).__name__
+            parent.trace.record_span(f"agent.{agent.name}", parent, enqueued_at, completed_at, attributes)
+        return completed_at
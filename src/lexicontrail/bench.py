@@ -0,0 +1,348 @@
+"""
+Benchmark harness for the client, document analysis and agent routing
+
+Usage:
+    python -m lexicontrail.bench --scenario all --requests 2000 --concurrency 16
+
+Each scenario runs a warmup, then issues ``--requests`` operations from
+``--concurrency`` threads and reports latency percentiles, throughput and
+process memory as JSON. Query workloads are drawn from a mix of query
+types (``--mix explanatory=4,procedural=2,analytical=2,factual=2``) with
+unique questions, so results measure the pipeline rather than the cache
+unless ``--cache`` is given.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .client import LexiconTrailClient
+
+SCENARIOS = ("query", "analyze", "route")
+
+DEFAULT_MIX = {"explanatory": 4, "procedural": 2, "analytical": 2, "factual": 2}
+
+# One question template per query type of ``classifier.QUERY_TYPE_RULES``
+_TEMPLATES = {
+    "explanatory": ["What is {topic}?", "Explain {topic}."],
+    "procedural": ["How do I evaluate {topic}?", "How does {topic} work?"],
+    "analytical": ["Why does {topic} matter?", "Why did {topic} change?"],
+    "factual": ["List the key facts about {topic}.", "{topic} figures for the last year."],
+}
+
+_TOPICS = [
+    "climate risk", "contract law", "supply chains", "neural networks", "vaccine trials",
+    "interest rates", "data privacy", "renewable energy", "patent disputes", "urban planning",
+]
+
+_DOCUMENT = (
+    "The {topic} report covers recent developments, open questions and the "
+    "methodology used to collect evidence. Analysts reviewed {n} sources and "
+    "summarized the findings for each region. "
+)
+
+Operation = Tuple[str, Callable[[], Any]]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse ``type=weight,...`` into a weight per query type"""
+    mix = {}
+    for part in filter(None, spec.split(",")):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in _TEMPLATES:
+            raise ValueError(f"Unknown query type in mix: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def make_questions(count: int, mix: Dict[str, float], seed: int = 0) -> List[Tuple[str, str]]:
+    """``count`` unique ``(query_type, question)`` pairs drawn from ``mix``"""
+    rng = random.Random(seed)
+    types = list(mix)
+    weights = [mix[name] for name in types]
+    questions = []
+    for i in range(count):
+        query_type = rng.choices(types, weights)[0]
+        topic = f"{rng.choice(_TOPICS)} #{i}"
+        questions.append((query_type, rng.choice(_TEMPLATES[query_type]).format(topic=topic)))
+    return questions
+
+
+def make_documents(count: int, seed: int = 0, sentences: int = 20) -> List[str]:
+    """Synthetic documents of ``sentences`` sentences each"""
+    rng = random.Random(seed)
+    return [
+        "".join(_DOCUMENT.format(topic=rng.choice(_TOPICS), n=rng.randint(3, 90))
+                for _ in range(sentences))
+        for _ in range(count)
+    ]
+
+
+def summarize(latencies_ms: Sequence[float]) -> Dict[str, float]:
+    """Latency percentiles of a run, in milliseconds"""
+    if not latencies_ms:
+        return {}
+    values = np.asarray(latencies_ms)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "mean": round(float(values.mean()), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+def memory_usage() -> Dict[str, Optional[float]]:
+    """Current and peak resident set size of this process in MiB"""
+    current = peak = None
+    try:
+        with open("/proc/self/statm") as statm:
+            current = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        peak = peak_kb / 2**20 if sys.platform == "darwin" else peak_kb / 2**10
+    except ImportError:
+        pass
+    return {
+        "rss_mb": round(current, 1) if current is not None else None,
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+    }
+
+
+def run_operations(operations: Sequence[Operation],
+                   concurrency: int,
+                   warmup: int = 0) -> Dict[str, Any]:
+    """
+    Execute labelled operations from a thread pool and time each one.
+
+    The first ``warmup`` operations are run but not measured.
+
+    Returns:
+        Latency percentiles overall and per label, throughput and errors
+    """
+    def timed(operation: Operation) -> Tuple[str, float, Optional[str]]:
+        label, fn = operation
+        start = time.perf_counter()
+        try:
+            fn()
+            error = None
+        except Exception as exc:
+            error = type(exc).__name__
+        return label, (time.perf_counter() - start) * 1000, error
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, operations[:warmup]))
+        start = time.perf_counter()
+        results = list(executor.map(timed, operations[warmup:]))
+        elapsed = time.perf_counter() - start
+
+    latencies = [latency for _, latency, error in results if error is None]
+    errors: Dict[str, int] = {}
+    by_label: Dict[str, List[float]] = {}
+    for label, latency, error in results:
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+        else:
+            by_label.setdefault(label, []).append(latency)
+    return {
+        "requests": len(results),
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "throughput_qps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": summarize(latencies),
+        "by_type": {
+            label: {"count": len(values), **summarize(values)}
+            for label, values in sorted(by_label.items())
+        },
+        "errors": errors,
+    }
+
+
+def _selection_overhead_us(client: LexiconTrailClient,
+                           questions: Sequence[Tuple[str, str]]) -> float:
+    """Mean time of ``select_agents`` alone, in microseconds"""
+    texts = [question for _, question in questions]
+    start = time.perf_counter()
+    for text in texts:
+        client.orchestrator.select_agents(text)
+    return round((time.perf_counter() - start) / max(1, len(texts)) * 1e6, 3)
+
+
+def _merge_config(base: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply ``overrides`` on top of ``base`` section by section.
+
+    Nested sections such as ``retrieval_config`` are merged key by key, so
+    overriding one setting keeps the section's other defaults.
+
+    Returns:
+        New configuration; neither argument is modified
+    """
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def run_benchmark(scenarios: Sequence[str] = SCENARIOS,
+                  requests: int = 1000,
+                  concurrency: int = 8,
+                  warmup: int = 100,
+                  mix: Optional[Dict[str, float]] = None,
+                  corpus_size: int = 200,
+                  cache: bool = False,
+                  seed: int = 0,
+                  config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Run the selected scenarios, each against a fresh client.
+
+    Args:
+        scenarios: Any of ``"query"``, ``"analyze"`` and ``"route"``
+        requests: Measured operations per scenario
+        concurrency: Number of client threads
+        warmup: Unmeasured operations run first in each scenario
+        mix: Relative weight of each query type
+        corpus_size: Documents indexed before the query scenario
+        cache: Keep the query caches enabled
+        seed: Seed for the synthetic workload
+        config: Client configuration overrides
+
+    Returns:
+        JSON-serializable report
+    """
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {sorted(unknown)}")
+    mix = mix or DEFAULT_MIX
+    client_config = _merge_config(LexiconTrailClient._default_config(), config or {})
+    if not cache:
+        client_config["cache_enabled"] = False
+
+    report: Dict[str, Any] = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "parameters": {
+            "requests": requests,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "mix": mix,
+            "corpus_size": corpus_size,
+            "cache": cache,
+            "seed": seed,
+        },
+        "scenarios": {},
+    }
+    questions = make_questions(warmup + requests, mix, seed)
+    for scenario in SCENARIOS:
+        if scenario not in scenarios:
+            continue
+        # A fresh client per scenario, so no scenario sees another's documents
+        client = LexiconTrailClient(api_key="benchmark", config=client_config)
+        try:
+            if scenario == "analyze":
+                documents = make_documents(warmup + requests, seed)
+                result = run_operations(
+                    [("document", lambda doc=doc: client.analyze_document(doc)) for doc in documents],
+                    concurrency, warmup
+                )
+            elif scenario == "query":
+                result = _run_queries(client, questions, corpus_size, seed, concurrency, warmup)
+            else:
+                result = _run_routing(client, questions, concurrency, warmup)
+        finally:
+            client.close()
+        report["scenarios"][scenario] = result
+    report["memory"] = memory_usage()
+    return report
+
+
+def _run_queries(client: LexiconTrailClient, questions: Sequence[Tuple[str, str]],
+                 corpus_size: int, seed: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    """Index a ``corpus_size`` corpus, then time ``client.query``"""
+    for document in make_documents(corpus_size, seed + 1):
+        client.analyze_document(document)
+    return run_operations(
+        [(query_type, lambda q=question: client.query(q)) for query_type, question in questions],
+        concurrency, warmup
+    )
+
+
+def _run_routing(client: LexiconTrailClient, questions: Sequence[Tuple[str, str]],
+                 concurrency: int, warmup: int) -> Dict[str, Any]:
+    """Time ``route_request`` with requests shaped like the client's"""
+    orchestrator = client.orchestrator
+
+    def request(query_type: str, question: str) -> Dict[str, Any]:
+        # The client classifies a query before routing it, as done here
+        return {
+            "type": query_type,
+            "data": question,
+            "context": {},
+            "retrieval_results": {},
+            "classification": orchestrator.classifier.classify(question),
+        }
+
+    result = run_operations(
+        [(query_type, lambda q=query_type, text=question: orchestrator.route_request(request(q, text)))
+         for query_type, question in questions],
+        concurrency, warmup
+    )
+    result["selection_overhead_us"] = _selection_overhead_us(client, questions)
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), nargs="+", default=["all"])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Query type weights, e.g. explanatory=4,factual=1")
+    parser.add_argument("--corpus-size", type=int, default=200)
+    parser.add_argument("--cache", action="store_true", help="Keep query caching enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    scenarios = SCENARIOS if "all" in args.scenario else tuple(args.scenario)
+    report = run_benchmark(
+        scenarios=scenarios,
+        requests=args.requests,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        mix=args.mix,
+        corpus_size=args.corpus_size,
+        cache=args.cache,
+        seed=args.seed,
+    )
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
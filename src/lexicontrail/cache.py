@@ -0,0 +1,347 @@
+"""
+Query result caches: pluggable exact-match backends and a semantic tier
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from .exceptions import ConfigurationError
+
+
+def make_cache_key(question: str, context: Optional[Dict] = None) -> Tuple[str, str]:
+    """
+    Build a cache key from a question and its context.
+
+    The question is lower-cased and whitespace-collapsed so trivially
+    different spellings of the same question share an entry. The context
+    is serialized with sorted keys so dict ordering does not matter.
+    """
+    normalized = " ".join(question.lower().split())
+    context_key = json.dumps(context, sort_keys=True, default=str) if context else ""
+    return normalized, context_key
+
+
+class CacheBackend:
+    """
+    Interface of exact-match query result caches.
+
+    Keys are the tuples built by ``make_cache_key``. Implementations must be
+    thread-safe, expire entries after a TTL and cap their size.
+    """
+
+    name = "base"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for ``key`` or None on a miss"""
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any):
+        """Insert or refresh ``key``"""
+        raise NotImplementedError
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove ``key`` from the cache. Returns True if it was present"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove all entries"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and occupancy"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources held by the backend"""
+
+
+class QueryCache(CacheBackend):
+    """
+    Thread-safe in-process TTL/LRU cache for query responses.
+
+    Entries expire ``ttl`` seconds after insertion. When ``max_size`` is
+    reached the least recently used entry is evicted.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept
+            ttl: Time-to-live for each entry in seconds
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for ``key`` or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        """Insert or refresh ``key``, evicting the LRU entry if full"""
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove ``key`` from the cache. Returns True if it was present"""
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.name,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+def create_cache_backend(config: Dict[str, Any],
+                         codec=None,
+                         default_dir: Optional[str] = None) -> Optional[CacheBackend]:
+    """
+    Build the exact-match cache selected by ``config["cache_backend"]``.
+
+    ``"memory"`` (the default) keeps entries in the process. ``"sqlite"``
+    stores them in a SQLite file shared by every process on the host that
+    points at the same ``cache_path`` (default: ``query_cache.sqlite3`` in
+    ``default_dir``). A ``CacheBackend`` instance is used as is.
+
+    Args:
+        config: Client configuration
+        codec: Value codec with ``dumps``/``loads`` for backends that serialize
+        default_dir: Directory for file-backed caches without a ``cache_path``
+
+    Returns:
+        The cache, or None if caching is disabled
+    """
+    if not config.get("cache_enabled", False):
+        return None
+    backend = config.get("cache_backend", "memory")
+    if isinstance(backend, CacheBackend):
+        return backend
+
+    max_size = config.get("cache_max_size", 1024)
+    ttl = config.get("cache_ttl", 3600)
+    if backend == "memory":
+        return QueryCache(max_size=max_size, ttl=ttl)
+    if backend == "sqlite":
+        from .sqlite_cache import SQLiteCache
+
+        path = config.get("cache_path")
+        if path is None:
+            if default_dir is None:
+                raise ConfigurationError("The sqlite cache backend needs cache_path or index_path")
+            path = os.path.join(default_dir, "query_cache.sqlite3")
+        if codec is None:
+            raise ConfigurationError("The sqlite cache backend needs a value codec")
+        return SQLiteCache(path, codec, max_size=max_size, ttl=ttl)
+    raise ConfigurationError(f"Unknown cache backend: {backend}")
+
+
+class SemanticCache:
+    """
+    Similarity-keyed cache for near-duplicate queries.
+
+    Each entry is stored with the embedding of the query that produced it.
+    A lookup returns the most similar live entry in the same partition
+    (query class and context) if its cosine similarity reaches
+    ``threshold``. Embeddings sit in a fixed ``(max_size, dim)`` matrix, so
+    a lookup is one matrix-vector product over the whole cache; when full,
+    the least recently used entry is overwritten.
+
+    Hits can be audited: the caller re-runs a sample of them and reports
+    through ``record_audit`` whether the cached answer still agreed.
+    """
+
+    def __init__(self,
+                 dim: int,
+                 max_size: int = 512,
+                 ttl: float = 3600,
+                 threshold: float = 0.95,
+                 audit_rate: float = 0.0,
+                 audit_log_size: int = 100):
+        """
+        Initialize the cache.
+
+        Args:
+            dim: Query embedding dimension
+            max_size: Maximum number of entries kept
+            ttl: Time-to-live for each entry in seconds
+            threshold: Minimum cosine similarity for a hit
+            audit_rate: Fraction of hits the caller should verify
+            audit_log_size: Number of recent audits kept for inspection
+        """
+        self.dim = dim
+        self.max_size = max(0, max_size)
+        self.ttl = ttl
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self._vectors = np.zeros((self.max_size, dim), dtype=np.float32)
+        self._expires = np.full(self.max_size, -np.inf)
+        self._last_used = np.zeros(self.max_size)
+        self._partition_hashes = np.zeros(self.max_size, dtype=np.int64)
+        self._entries: List[Optional[Tuple[Hashable, str, Any]]] = [None] * self.max_size
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self.audit_log: Deque[Dict[str, Any]] = deque(maxlen=audit_log_size)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.audits = 0
+        self.false_hits = 0
+
+    def get(self, vector: np.ndarray, partition: Hashable) -> Optional[Tuple[Any, str, float]]:
+        """
+        Find the closest cached entry for a query embedding.
+
+        Args:
+            vector: L2-normalized query embedding
+            partition: Only entries stored under an equal partition match
+
+        Returns:
+            ``(value, cached_query, similarity)`` on a hit, otherwise None
+        """
+        if self.max_size == 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            scores = self._vectors @ np.asarray(vector, dtype=np.float32)
+            scores[self._partition_hashes != hash(partition)] = -np.inf
+            scores[self._expires <= now] = -np.inf
+            slot = int(np.argmax(scores))
+            entry = self._entries[slot]
+            if scores[slot] < self.threshold or entry is None or entry[0] != partition:
+                self.misses += 1
+                return None
+            self._last_used[slot] = now
+            self.hits += 1
+            return entry[2], entry[1], float(scores[slot])
+
+    def set(self, vector: np.ndarray, partition: Hashable, query: str, value: Any):
+        """Store ``value`` under a query embedding, evicting the LRU entry if full"""
+        if self.max_size == 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            free = np.flatnonzero(self._expires == -np.inf)
+            if len(free):
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+            self._vectors[slot] = vector
+            self._expires[slot] = now + self.ttl
+            self._last_used[slot] = now
+            self._partition_hashes[slot] = hash(partition)
+            self._entries[slot] = (partition, query, value)
+
+    def should_audit(self) -> bool:
+        """Whether the caller should verify the current hit"""
+        return self.audit_rate > 0 and self._rng.random() < self.audit_rate
+
+    def record_audit(self, query: str, cached_query: str, similarity: float, agreed: bool):
+        """Record the outcome of re-running a semantic hit through the pipeline"""
+        with self._lock:
+            self.audits += 1
+            if not agreed:
+                self.false_hits += 1
+            self.audit_log.append({
+                "query": query,
+                "cached_query": cached_query,
+                "similarity": similarity,
+                "agreed": agreed,
+            })
+
+    def clear(self):
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._expires[:] = -np.inf
+            self._entries = [None] * self.max_size
+
+    def _expire(self, now: float):
+        expired = np.flatnonzero((self._expires <= now) & (self._expires > -np.inf))
+        for slot in expired:
+            self._entries[slot] = None
+        self._expires[expired] = -np.inf
+        self.expirations += len(expired)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._expires > -np.inf))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss, eviction and audit counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "audits": self.audits,
+                "false_hits": self.false_hits,
+                "false_hit_rate": self.false_hits / self.audits if self.audits else 0.0,
+                "recent_audits": list(self.audit_log),
+            }
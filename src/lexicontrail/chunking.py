@@ -0,0 +1,204 @@
+"""
+Incremental chunking of documents too large to hold in memory
+"""
+
+import codecs
+import mmap
+from contextlib import contextmanager
+from typing import IO, Any, Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+# Characters read from the source per step
+DEFAULT_WINDOW_CHARS = 1 << 20
+
+# Approximate UTF-8 bytes per model token, to size byte-level chunks from
+# the token-based ``chunk_size``/``chunk_overlap`` settings
+BYTES_PER_TOKEN = 4
+
+# Preferred chunk boundaries, best first; a chunk ends right after one
+_BOUNDARIES = (b"\n\n", b". ", b"? ", b"! ", b".\n", b"\n", b" ")
+
+TextSource = Union[IO, Iterable[Union[str, bytes]]]
+
+
+class ChunkWindow(NamedTuple):
+    """Chunks completed after reading one window of the source"""
+    text: str  # newly read text, without the carried-over tail
+    chunks: List[str]
+    offset: int  # character offset of ``text`` in the document
+
+
+def iter_text_windows(source: TextSource, window_chars: int = DEFAULT_WINDOW_CHARS,
+                      encoding: str = "utf-8") -> Iterator[str]:
+    """
+    Read ``source`` as text pieces of about ``window_chars`` characters.
+
+    Args:
+        source: Text or binary file object, or an iterable of ``str`` or
+            ``bytes`` pieces of any size
+        window_chars: Target size of each yielded piece
+        encoding: Decoding of binary input; multi-byte characters split
+            across reads are reassembled
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    def decode(piece: Union[str, bytes]) -> str:
+        return piece if isinstance(piece, str) else decoder.decode(piece)
+
+    read = getattr(source, "read", None)
+    if read is not None:
+        while True:
+            piece = read(window_chars)
+            if not piece:
+                break
+            yield decode(piece)
+    else:
+        pending: List[str] = []
+        size = 0
+        for piece in source:
+            text = decode(piece)
+            pending.append(text)
+            size += len(text)
+            if size >= window_chars:
+                yield "".join(pending)
+                pending, size = [], 0
+        if pending:
+            yield "".join(pending)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_chunk_windows(source: TextSource, splitter: Any,
+                       window_chars: int = DEFAULT_WINDOW_CHARS,
+                       metadata_str: str = "",
+                       encoding: str = "utf-8") -> Iterator[ChunkWindow]:
+    """
+    Split a document into chunks while reading it window by window.
+
+    Each window is appended to the text carried over from the previous
+    step and split with the splitter's public ``split_text`` (or
+    ``split_text_metadata_aware``), so ``chunk_size`` and ``chunk_overlap``
+    mean exactly what they do for ``analyze_document``. Every chunk but the
+    last is complete and is yielded; the last may have been cut by the
+    window edge, so the text from its start is carried into the next step.
+    The carry is therefore at most one chunk, and memory stays around
+    ``window_chars`` plus one chunk whatever the document size.
+
+    Args:
+        source: See ``iter_text_windows``
+        splitter: LlamaIndex ``SentenceSplitter``
+        window_chars: Characters read per step
+        metadata_str: Metadata text whose size is reserved in every chunk
+        encoding: Decoding of binary input
+
+    Raises:
+        ValueError: If a chunk is not a substring of the text it was split
+            from, so the carry cannot be located
+    """
+    carry = ""
+    offset = 0
+    for window in iter_text_windows(source, window_chars, encoding):
+        text = carry + window
+        chunks = _split(splitter, text, metadata_str)
+        if len(chunks) < 2:
+            # Not even one complete chunk yet: keep reading
+            carry = text
+            yield ChunkWindow(window, [], offset)
+        else:
+            carry = text[_last_chunk_start(text, chunks[-1]):]
+            yield ChunkWindow(window, chunks[:-1], offset)
+        offset += len(window)
+    if carry.strip():
+        yield ChunkWindow("", _split(splitter, carry, metadata_str), offset)
+
+
+def _split(splitter: Any, text: str, metadata_str: str) -> List[str]:
+    if metadata_str:
+        return splitter.split_text_metadata_aware(text, metadata_str)
+    return splitter.split_text(text)
+
+
+def _last_chunk_start(text: str, chunk: str) -> int:
+    """
+    Offset in ``text`` of its last chunk.
+
+    Chunks are stripped slices of the text and the last one ends where the
+    text does, apart from whitespace, so its last occurrence is the one
+    the splitter produced, however often the same text repeats.
+    """
+    start = text.rfind(chunk)
+    if start < 0:
+        raise ValueError("Splitter returned a chunk that is not a slice of its input")
+    return start
+
+
+@contextmanager
+def map_file(path: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    Map ``path`` read-only for the duration of the ``with`` block.
+
+    Pages are read on demand by the OS and shared with any other process
+    mapping the same file. Empty files, which cannot be mapped, yield b"".
+    """
+    with open(path, "rb") as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield b""
+            return
+        try:
+            yield buffer
+        finally:
+            buffer.close()
+
+
+def iter_byte_spans(buffer: Union[mmap.mmap, bytes], chunk_bytes: int,
+                    overlap_bytes: int = 0) -> Iterator[Tuple[int, int]]:
+    """
+    Chunk boundaries of a UTF-8 buffer as ``(start, end)`` byte offsets.
+
+    Boundaries are found by searching the buffer itself, so nothing is
+    copied or decoded. A chunk ends after the last paragraph break,
+    sentence end or whitespace in the second half of its ``chunk_bytes``
+    budget (in that order of preference), and the next chunk starts at a
+    word boundary about ``overlap_bytes`` before it. Without such a
+    boundary the cut falls between two characters.
+
+    Args:
+        buffer: Mapped file or bytes holding UTF-8 text
+        chunk_bytes: Maximum chunk size in bytes
+        overlap_bytes: Bytes shared by consecutive chunks
+    """
+    size = len(buffer)
+    # Room for at least one character whatever its encoded length
+    chunk_bytes = max(8, chunk_bytes)
+    overlap_bytes = min(max(0, overlap_bytes), chunk_bytes // 2)
+    start = 0
+    while start < size:
+        limit = start + chunk_bytes
+        if limit >= size:
+            yield start, size
+            return
+        end = -1
+        for boundary in _BOUNDARIES:
+            found = buffer.rfind(boundary, start + chunk_bytes // 2, limit)
+            if found >= 0:
+                end = found + len(boundary)
+                break
+        if end < 0:
+            end = _char_boundary(buffer, limit)
+        yield start, end
+
+        next_start = _char_boundary(buffer, end - overlap_bytes)
+        if overlap_bytes:
+            space = buffer.find(b" ", next_start, end)
+            if space >= 0:
+                next_start = space + 1
+        start = next_start if next_start > start else end
+
+
+def _char_boundary(buffer: Union[mmap.mmap, bytes], offset: int) -> int:
+    """Move ``offset`` back past UTF-8 continuation bytes"""
+    while offset > 0 and buffer[offset] & 0xC0 == 0x80:
+        offset -= 1
+    return offset
@@ -0,0 +1,168 @@
+"""
+Shared query classification and agent routing rules
+
+Usage:
+    python -m lexicontrail.classifier queries.txt
+
+prints the query type and route counts of a query log (one query per
+line, or stdin) as JSON.
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+# Keyword rules, in priority order: the first rule with a keyword present
+# in the lower-cased query decides. Matching is by substring, so "how"
+# also fires inside "show".
+QUERY_TYPE_RULES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("explanatory", ("what", "explain")),
+    ("procedural", ("how",)),
+    ("analytical", ("why",)),
+)
+ROUTE_RULES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("document", ("document",)),
+    ("question", ("?",)),
+)
+DEFAULT_QUERY_TYPE = "factual"
+DEFAULT_ROUTE = "query"
+
+
+class QueryClass(NamedTuple):
+    """Classification of one query"""
+    query_type: str
+    route: str
+    keywords: FrozenSet[str]
+
+
+class QueryClassifier:
+    """
+    Classifies queries by type and agent route in one scan.
+
+    Every keyword of every rule is compiled into a single regular
+    expression, so a query is lower-cased and scanned once no matter how
+    many rules there are. The scan tries a zero-width match at each
+    position with keywords ordered longest first; a keyword that matches
+    implies every shorter keyword contained in it, which recovers matches
+    the alternation shadows.
+    """
+
+    def __init__(self,
+                 query_type_rules: Sequence[Tuple[str, Sequence[str]]] = QUERY_TYPE_RULES,
+                 route_rules: Sequence[Tuple[str, Sequence[str]]] = ROUTE_RULES,
+                 default_query_type: str = DEFAULT_QUERY_TYPE,
+                 default_route: str = DEFAULT_ROUTE):
+        """
+        Initialize the classifier.
+
+        Args:
+            query_type_rules: ``(query_type, keywords)`` pairs in priority order
+            route_rules: ``(route, keywords)`` pairs in priority order
+            default_query_type: Type of queries that match no rule
+            default_route: Route of queries that match no rule
+        """
+        self.query_type_rules = [(label, tuple(k.lower() for k in keys))
+                                 for label, keys in query_type_rules]
+        self.route_rules = [(label, tuple(k.lower() for k in keys))
+                            for label, keys in route_rules]
+        self.default_query_type = default_query_type
+        self.default_route = default_route
+
+        keywords = sorted({k for _, keys in self.query_type_rules + self.route_rules for k in keys},
+                          key=lambda k: (-len(k), k))
+        self._pattern = re.compile(
+            "(?=(" + "|".join(re.escape(k) for k in keywords) + "))"
+        ) if keywords else None
+        self._implied: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset(k for k in keywords if k in keyword) for keyword in keywords
+        }
+
+    def keywords(self, text: str) -> FrozenSet[str]:
+        """All rule keywords that occur in ``text``"""
+        if self._pattern is None:
+            return frozenset()
+        found = set()
+        for match in self._pattern.finditer(text.lower()):
+            found |= self._implied[match.group(1)]
+        return frozenset(found)
+
+    def classify(self, text: str) -> QueryClass:
+        """Classify one query"""
+        found = self.keywords(text)
+        return QueryClass(
+            query_type=self._first(self.query_type_rules, found, self.default_query_type),
+            route=self._first(self.route_rules, found, self.default_route),
+            keywords=found,
+        )
+
+    def classify_batch(self, texts: Iterable[str]) -> List[QueryClass]:
+        """
+        Classify many queries, e.g. a query log for offline routing analysis.
+
+        Repeated queries are classified once.
+        """
+        seen: Dict[str, QueryClass] = {}
+        results = []
+        for text in texts:
+            result = seen.get(text)
+            if result is None:
+                result = seen[text] = self.classify(text)
+            results.append(result)
+        return results
+
+    def summarize(self, texts: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        """Query counts by type, by route and by ``type/route`` pair"""
+        results = self.classify_batch(texts)
+        return {
+            "query_type": dict(Counter(r.query_type for r in results)),
+            "route": dict(Counter(r.route for r in results)),
+            "combined": dict(Counter(f"{r.query_type}/{r.route}" for r in results)),
+        }
+
+    @staticmethod
+    def _first(rules: Sequence[Tuple[str, Tuple[str, ...]]], found: FrozenSet[str],
+               default: str) -> str:
+        for label, keys in rules:
+            if not found.isdisjoint(keys):
+                return label
+        return default
+
+
+DEFAULT_CLASSIFIER = QueryClassifier()
+
+
+def classify_request(request: Dict, classifier: Optional[QueryClassifier] = None) -> QueryClass:
+    """
+    Classification of a routed request, computed on first use.
+
+    The result is stored under ``request["classification"]`` so every
+    later stage handling the same request reuses it.
+    """
+    result = request.get("classification")
+    if result is None:
+        result = (classifier or DEFAULT_CLASSIFIER).classify(request.get("type", "query"))
+        request["classification"] = result
+    return result
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Summarize query types and routes of a query log")
+    parser.add_argument("files", nargs="*", help="Query logs, one query per line (default: stdin)")
+    args = parser.parse_args(argv)
+
+    def lines():
+        if not args.files:
+            yield from sys.stdin
+        for path in args.files:
+            with open(path, encoding="utf-8") as f:
+                yield from f
+
+    queries = (line.rstrip("\n") for line in lines())
+    print(json.dumps(DEFAULT_CLASSIFIER.summarize(q for q in queries if q), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,39 +2,335 @@
 LexiconTrail Client - Demonstration of the API interface
 """
 
+import hashlib
+import sys
+import tempfile
+import threading
 import time
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
+from collections import deque
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Any, Callable, Optional, Iterable, Iterator, Tuple, Union
+from dataclasses import dataclass, replace
+from itertools import islice
 import json
 
-from llama_index.core import Document, VectorStoreIndex
-from llama_index.core.node_parser import SimpleNodeParser
-from llama_index.core.response_synthesizers import get_response_synthesizer
+import numpy as np
 
-from .mock_agents import AgentOrchestrator
-from .exceptions import LexiconTrailError
+from .cache import CacheBackend, SemanticCache, create_cache_backend, make_cache_key
+from .chunking import (
+    BYTES_PER_TOKEN,
+    DEFAULT_WINDOW_CHARS,
+    TextSource,
+    iter_byte_spans,
+    iter_chunk_windows,
+    iter_text_windows,
+    map_file,
+)
+from .classifier import QueryClass
+from .coalescing import SingleFlight
+from .embedding_cache import CachedEmbedder, content_hash
+from .embeddings import create_embedder
+from .instrumentation import collect_metrics, start_metrics_server
+from .metrics import LATENCY_MS_BUCKETS, StageTimer, render_text
+from .mock_agents import AgentOrchestrator, DocumentAnalyzer
+from .exceptions import ConfigurationError, LexiconTrailError
+from .retrieval import Retriever, SearchHit, reciprocal_rank_fusion
+from .serialization import DataclassCodec, FrozenRecord
+from .sparse_index import InvertedIndex
+from .streaming import TokenStream
+from .tracing import FileTraceExporter, Trace, Tracer, span
+from .vector_store import MmapVectorStore
 
+if TYPE_CHECKING:
+    from llama_index.core.node_parser import SimpleNodeParser
+    from .pool import AgentPool
 
-@dataclass
-class QueryResponse:
+
+# "rrf": BM25 and dense rankings fused; "sparse": BM25, dense only as a
+# fallback; "dense": no keyword index
+HYBRID_MODES = ("rrf", "sparse", "dense")
+
+
+@dataclass(frozen=True)
+class QueryResponse(FrozenRecord):
     """Response object for queries"""
+    __slots__ = ("answer", "confidence", "sources", "agents_used", "processing_time_ms", "metadata")
     answer: str
     confidence: float
-    sources: List[str]
-    agents_used: List[str]
+    sources: Tuple[str, ...]
+    agents_used: Tuple[str, ...]
     processing_time_ms: int
     metadata: Dict[str, Any]
+    
+    def __post_init__(self):
+        # Tuples can be shared between cached and returned responses
+        object.__setattr__(self, "sources", tuple(self.sources))
+        object.__setattr__(self, "agents_used", tuple(self.agents_used))
 
 
-@dataclass
-class DocumentAnalysisResult:
+@dataclass(frozen=True)
+class SemanticSearchResponse(FrozenRecord):
+    """Result of a semantic search"""
+    __slots__ = ("query", "results", "processing_time_ms")
+    query: str
+    results: Tuple[SearchHit, ...]
+    processing_time_ms: int
+    
+    def __post_init__(self):
+        object.__setattr__(self, "results", tuple(self.results))
+
+
+@dataclass(frozen=True)
+class DocumentAnalysisResult(FrozenRecord):
     """Result of document analysis"""
+    __slots__ = ("document_id", "entities", "key_concepts", "summary",
+                 "embeddings_created", "processing_time_ms")
     document_id: str
-    entities: List[str]
-    key_concepts: List[str]
+    entities: Tuple[str, ...]
+    key_concepts: Tuple[str, ...]
     summary: str
     embeddings_created: int
     processing_time_ms: int
+    
+    def __post_init__(self):
+        # The same few entity and concept names recur across documents;
+        # interning keeps one copy of each however many results hold it
+        object.__setattr__(self, "entities", tuple(map(sys.intern, self.entities)))
+        object.__setattr__(self, "key_concepts", tuple(map(sys.intern, self.key_concepts)))
+
+
+def create_node_parser(llama_index_config: Dict[str, Any]) -> "SimpleNodeParser":
+    """
+    Build the chunking node parser.
+    
+    LlamaIndex takes over a second to import, so it is only loaded here,
+    on the first call that actually parses documents.
+    """
+    from llama_index.core.node_parser import SimpleNodeParser
+    
+    return SimpleNodeParser.from_defaults(
+        chunk_size=llama_index_config["chunk_size"],
+        chunk_overlap=llama_index_config["chunk_overlap"]
+    )
+
+
+def run_document_analysis(document: str,
+                          metadata: Optional[Dict],
+                          node_parser: "SimpleNodeParser",
+                          analyzer: DocumentAnalyzer,
+                          embedder: Optional[Any] = None,
+                          vector_store: Optional[MmapVectorStore] = None,
+                          doc_id: Optional[str] = None) -> DocumentAnalysisResult:
+    """
+    Parse and analyze a single document.
+    
+    Shared by ``LexiconTrailClient.analyze_document`` and the batch workers
+    so both paths produce identical results. When an embedder and vector
+    store are given, the document's node embeddings replace any rows the
+    store already holds for ``doc_id`` (which defaults to a content hash).
+    """
+    start_time = time.time()
+    
+    # Mock document processing
+    # In reality, this would:
+    # 1. Route to specialized document analysis SLMs
+    # 2. Build LlamaIndex indices
+    # 3. Extract structured information
+    # 4. Create knowledge graph entries
+    
+    from llama_index.core import Document
+    
+    if doc_id is None:
+        doc_id = f"doc_{content_hash(document, digest_size=8)}"
+    
+    nodes = node_parser.get_nodes_from_documents(
+        [Document(text=document, metadata=metadata or {})]
+    )
+    analysis = analyzer.process(document)
+    
+    ids = [f"{doc_id}:{i}" for i in range(len(nodes))]
+    texts = [node.get_content() for node in nodes]
+    if embedder is not None and vector_store is not None:
+        vector_store.replace_document(doc_id, ids=ids, vectors=embedder.embed(texts), texts=texts)
+    
+    return DocumentAnalysisResult(
+        document_id=doc_id,
+        entities=analysis["entities"],
+        key_concepts=analysis["topics"],
+        summary="Document processed using multi-agent architecture.",
+        embeddings_created=len(nodes),
+        processing_time_ms=int((time.time() - start_time) * 1000 + 200)
+    )
+
+
+def run_document_stream_analysis(source: TextSource,
+                                 metadata: Optional[Dict],
+                                 node_parser: "SimpleNodeParser",
+                                 analyzer_pool: "AgentPool",
+                                 embedder: Any,
+                                 vector_store: MmapVectorStore,
+                                 doc_id: Optional[str] = None,
+                                 window_chars: int = DEFAULT_WINDOW_CHARS,
+                                 max_pending: int = 2) -> DocumentAnalysisResult:
+    """
+    Parse, embed and analyze a document read incrementally from ``source``.
+    
+    The stages overlap: while the caller reads and chunks the next window
+    and embeds its chunks into ``vector_store``, ``DocumentAnalyzer`` works
+    on earlier windows in its pool. At most ``max_pending`` windows wait
+    for analysis, so memory is bounded by the window size, not the
+    document size.
+    
+    New chunks become searchable as each window is indexed; rows of an
+    earlier version of ``doc_id`` are tombstoned once the whole document
+    has been indexed. If reading fails part way, the chunks indexed so far
+    stay next to the earlier version until the document is streamed again.
+    
+    Without a ``doc_id`` the document is hashed first (see
+    ``_hashed_stream``), so it gets the id ``run_document_analysis`` would
+    give the same text and streaming it again replaces it.
+    """
+    if doc_id is None:
+        with _hashed_stream(source, window_chars) as (source, digest):
+            return run_document_stream_analysis(
+                source, metadata, node_parser, analyzer_pool, embedder, vector_store,
+                doc_id=f"doc_{digest}", window_chars=window_chars, max_pending=max_pending
+            )
+    start_time = time.time()
+    metadata_str = "\n".join(f"{key}: {value}" for key, value in (metadata or {}).items())
+    
+    entities: Dict[str, None] = {}
+    topics: Dict[str, None] = {}
+    pending: deque = deque()
+    
+    def collect():
+        analysis = pending.popleft().result()
+        entities.update(dict.fromkeys(analysis["entities"]))
+        topics.update(dict.fromkeys(analysis["topics"]))
+    
+    count = 0
+    for window in iter_chunk_windows(source, node_parser, window_chars, metadata_str):
+        if window.text:
+            pending.append(analyzer_pool.submit(window.text))
+        if window.chunks:
+            ids = [f"{doc_id}:{count + i}" for i in range(len(window.chunks))]
+            vector_store.add(
+                ids=ids,
+                doc_ids=[doc_id] * len(window.chunks),
+                vectors=embedder.embed(window.chunks),
+                texts=window.chunks
+            )
+            count += len(window.chunks)
+        while len(pending) > max_pending:
+            collect()
+    while pending:
+        collect()
+    vector_store.delete_document(doc_id, keep_last=count)
+    
+    return DocumentAnalysisResult(
+        document_id=doc_id,
+        entities=tuple(entities),
+        key_concepts=tuple(topics),
+        summary="Document processed using multi-agent architecture.",
+        embeddings_created=count,
+        processing_time_ms=int((time.time() - start_time) * 1000)
+    )
+
+
+@contextmanager
+def _hashed_stream(source: TextSource, window_chars: int) -> Iterator[Tuple[TextSource, str]]:
+    """
+    Hash a streamed document as ``content_hash(text, digest_size=8)`` would.
+    
+    Yields a source that reads the document again from the start and the
+    hex digest. Seekable file objects are read twice; other sources are
+    copied to a temporary file while they are hashed, which stays in
+    memory up to about ``window_chars``.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    seekable = getattr(source, "seekable", None)
+    if seekable is not None and seekable():
+        position = source.tell()
+        for text in iter_text_windows(source, window_chars):
+            digest.update(text.encode("utf-8"))
+        source.seek(position)
+        yield source, digest.hexdigest()
+        return
+    with tempfile.SpooledTemporaryFile(max_size=window_chars) as spool:
+        for text in iter_text_windows(source, window_chars):
+            data = text.encode("utf-8")
+            digest.update(data)
+            spool.write(data)
+        spool.seek(0)
+        yield spool, digest.hexdigest()
+
+
+def run_file_analysis(path: str,
+                      metadata: Optional[Dict],
+                      llama_index_config: Dict[str, Any],
+                      analyzer: DocumentAnalyzer,
+                      embedder: Optional[Any] = None,
+                      vector_store: Optional[MmapVectorStore] = None,
+                      doc_id: Optional[str] = None,
+                      batch_chunks: int = 256) -> DocumentAnalysisResult:
+    """
+    Parse, embed and analyze a UTF-8 text file without reading it into memory.
+    
+    The file is memory-mapped and chunk boundaries are found on the mapped
+    bytes (see ``iter_byte_spans``), with ``chunk_size``/``chunk_overlap``
+    converted from tokens at ``BYTES_PER_TOKEN``. Only the chunks being
+    embedded, ``batch_chunks`` at a time, are decoded, straight from the
+    mapped pages. Each stored row keeps its chunk's byte span, so search
+    hits can cite exact byte ranges of the file, and the keyword index
+    reads the text back from the file through the span; the store never
+    holds a copy of it.
+    
+    ``doc_id`` defaults to the content hash of the file, which matches the
+    id ``analyze_document`` gives the same text. Rows of an earlier version
+    are tombstoned after the new ones are written.
+    """
+    start_time = time.time()
+    metadata_str = "\n".join(f"{key}: {value}" for key, value in (metadata or {}).items())
+    chunk_bytes = llama_index_config["chunk_size"] * BYTES_PER_TOKEN - len(metadata_str.encode("utf-8"))
+    overlap_bytes = llama_index_config["chunk_overlap"] * BYTES_PER_TOKEN
+    
+    entities: Dict[str, None] = {}
+    topics: Dict[str, None] = {}
+    count = 0
+    with map_file(path) as buffer:
+        if doc_id is None:
+            doc_id = f"doc_{hashlib.blake2b(buffer, digest_size=8).hexdigest()}"
+        spans = iter_byte_spans(buffer, chunk_bytes, overlap_bytes)
+        with memoryview(buffer) as view:
+            while True:
+                batch = list(islice(spans, batch_chunks))
+                if not batch:
+                    break
+                texts = [str(view[start:end], "utf-8", "replace") for start, end in batch]
+                for analysis in analyzer.process_batch(texts):
+                    entities.update(dict.fromkeys(analysis["entities"]))
+                    topics.update(dict.fromkeys(analysis["topics"]))
+                ids = [f"{doc_id}:{count + i}" for i in range(len(batch))]
+                if embedder is not None and vector_store is not None:
+                    vector_store.add(
+                        ids=ids,
+                        doc_ids=[doc_id] * len(batch),
+                        vectors=embedder.embed(texts),
+                        spans=batch,
+                        source_path=path
+                    )
+                count += len(batch)
+    if vector_store is not None:
+        vector_store.delete_document(doc_id, keep_last=count)
+    
+    return DocumentAnalysisResult(
+        document_id=doc_id,
+        entities=tuple(entities),
+        key_concepts=tuple(topics),
+        summary="Document processed using multi-agent architecture.",
+        embeddings_created=count,
+        processing_time_ms=int((time.time() - start_time) * 1000)
+    )
 
 
 class LexiconTrailClient:
@@ -56,30 +352,114 @@ class LexiconTrailClient:
         self.api_key = api_key
         self.config = config or self._default_config()
         self.orchestrator = AgentOrchestrator(config=self.config)
+        self.cache = self._init_cache()
         
         # Initialize LlamaIndex components (mock)
         self._init_llama_index()
+        # Store version the caches were last cleared for; the current
+        # version is part of each cache key, so results computed against
+        # the index before an edit, by any process, are never served after it
+        self._cache_version = self.vector_store.version
+        self._cache_version_lock = threading.Lock()
+        self.semantic_cache = self._init_semantic_cache()
+        self.single_flight = SingleFlight() if self.config.get("coalesce_requests", False) else None
+        self.metrics_enabled = self.config.get("metrics_enabled", False)
+        self.stage_latency = StageTimer(LATENCY_MS_BUCKETS)
+        self.tracer = self._init_tracer()
         
-    def _default_config(self) -> Dict[str, Any]:
+    @staticmethod
+    def _default_config() -> Dict[str, Any]:
         """Default configuration"""
         return {
             "agent_pool_size": 4,
+            "agent_queue_size": 256,
+            "agent_balancing": "shared",
             "cache_enabled": True,
             "cache_ttl": 3600,
+            "cache_max_size": 1024,
+            "cache_backend": "memory",
+            "cache_path": None,
+            "coalesce_requests": True,
+            "metrics_enabled": True,
+            "tracing": {
+                "sample_rate": 0.0,
+                "export_path": None,
+                "attach_to_response": False
+            },
+            "semantic_cache_enabled": True,
+            "semantic_cache_threshold": 0.95,
+            "semantic_cache_max_size": 512,
+            "semantic_cache_audit_rate": 0.0,
             "max_retries": 3,
             "timeout": 30,
+            "execution_mode": "dag",
+            "index_path": None,
+            "compaction_threshold": 0.3,
+            "stream_window_chars": 1048576,
             "llama_index_config": {
                 "chunk_size": 1024,
                 "chunk_overlap": 200,
-                "embedding_model": "text-embedding-ada-002"
+                "embedding_model": "text-embedding-ada-002",
+                "embedding_dim": 256,
+                "embedding_dtype": "float32",
+                "embedding_cache": True
+            },
+            "retrieval_config": {
+                "mode": "auto",
+                "top_k": 5,
+                "nprobe": 8,
+                "nlist": None,
+                "ivf_threshold": 2000000,
+                "hybrid": "rrf",
+                "fusion_depth": 50,
+                "rrf_k": 60,
+                "bm25_k1": 1.2,
+                "bm25_b": 0.75
             },
             "slm_config": {
                 "model_size": "small",
                 "optimization_level": "high",
-                "batch_size": 8
+                "batch_size": 8,
+                "max_batch_wait_ms": 2.0
             }
         }
     
+    def _init_cache(self) -> Optional[CacheBackend]:
+        """Create the configured query result cache if caching is enabled"""
+        return create_cache_backend(
+            self.config,
+            codec=DataclassCodec(QueryResponse),
+            default_dir=self.config.get("index_path")
+        )
+    
+    def _init_semantic_cache(self) -> Optional[SemanticCache]:
+        """Create the near-duplicate query cache if both cache tiers are enabled"""
+        if self.cache is None or not self.config.get("semantic_cache_enabled", False):
+            return None
+        return SemanticCache(
+            dim=self.embedder.dim,
+            max_size=self.config.get("semantic_cache_max_size", 512),
+            ttl=self.config.get("cache_ttl", 3600),
+            threshold=self.config.get("semantic_cache_threshold", 0.95),
+            audit_rate=self.config.get("semantic_cache_audit_rate", 0.0)
+        )
+    
+    @property
+    def node_parser(self) -> "SimpleNodeParser":
+        """Document chunker, created (and LlamaIndex imported) on first use"""
+        if self._node_parser is None:
+            self._node_parser = create_node_parser(self.config["llama_index_config"])
+        return self._node_parser
+    
+    def _init_tracer(self) -> Tracer:
+        """Create the request tracer; traces are exported if a path is configured"""
+        tracing_config = self.config.get("tracing", {})
+        export_path = tracing_config.get("export_path")
+        return Tracer(
+            sample_rate=tracing_config.get("sample_rate", 0.0),
+            exporter=FileTraceExporter(export_path) if export_path else None
+        )
+    
     def _init_llama_index(self):
         """Initialize LlamaIndex components"""
         # This is a mock initialization
@@ -88,11 +468,50 @@ class LexiconTrailClient:
         # - Knowledge graph indices
         # - Document stores
         # - Custom retrievers
-        self.node_parser = SimpleNodeParser.from_defaults(
-            chunk_size=self.config["llama_index_config"]["chunk_size"],
-            chunk_overlap=self.config["llama_index_config"]["chunk_overlap"]
+        llama_config = self.config["llama_index_config"]
+        self._node_parser = None
+        
+        # A persistent index is mapped, not rebuilt; without one, embeddings
+        # live in a temporary store for the lifetime of the client
+        index_path = self.config.get("index_path")
+        self._index_tmpdir = None
+        if index_path is None:
+            self._index_tmpdir = tempfile.TemporaryDirectory(prefix="lexicontrail-index-")
+            index_path = self._index_tmpdir.name
+        self.embedder = create_embedder(llama_config, index_path)
+        self.vector_store = MmapVectorStore(
+            index_path,
+            dim=self.embedder.dim,
+            dtype=llama_config.get("embedding_dtype", "float32")
+        )
+        self._compaction_thread = None
+        
+        retrieval_config = self.config.get("retrieval_config", {})
+        self.retriever = Retriever(
+            self.vector_store,
+            self.embedder,
+            mode=retrieval_config.get("mode", "auto"),
+            nprobe=retrieval_config.get("nprobe", 8),
+            nlist=retrieval_config.get("nlist"),
+            ivf_threshold=retrieval_config.get("ivf_threshold", 2000000)
         )
         
+        # Keyword index mirroring the vector store, fused with dense
+        # results at query time
+        self.hybrid_mode = retrieval_config.get("hybrid", "rrf")
+        if self.hybrid_mode not in HYBRID_MODES:
+            raise ConfigurationError(f"Unknown hybrid retrieval mode: {self.hybrid_mode}")
+        self.sparse_index = None
+        self._sparse_thread = None
+        self._sparse_thread_lock = threading.Lock()
+        if self.hybrid_mode != "dense":
+            self.sparse_index = self._new_sparse_index()
+            if len(self.vector_store):
+                # Rebuilt from the stored chunk texts without delaying startup
+                self._sync_sparse_index(wait=False)
+            else:
+                self.sparse_index.sync(self.vector_store)
+        
     def analyze_document(self, document: str, metadata: Optional[Dict] = None) -> DocumentAnalysisResult:
         """
         Analyze a document using multi-agent approach.
@@ -110,38 +529,297 @@ class LexiconTrailClient:
         Returns:
             DocumentAnalysisResult object
         """
-        start_time = time.time()
+        result = run_document_analysis(
+            document,
+            metadata,
+            node_parser=self.node_parser,
+            analyzer=self.orchestrator.agents["document_analyzer"],
+            embedder=self.embedder,
+            vector_store=self.vector_store
+        )
+        self._sync_sparse_index()
+        self._invalidate_caches()
+        self._maybe_compact()
+        return result
+    
+    def analyze_document_stream(self,
+                                source: TextSource,
+                                metadata: Optional[Dict] = None,
+                                doc_id: Optional[str] = None,
+                                window_chars: Optional[int] = None) -> DocumentAnalysisResult:
+        """
+        Analyze a document too large to load at once.
         
-        # Mock document processing
-        # In reality, this would:
-        # 1. Route to specialized document analysis SLMs
-        # 2. Build LlamaIndex indices
-        # 3. Extract structured information
-        # 4. Create knowledge graph entries
-        
-        doc_id = f"doc_{hash(document) % 100000}"
-        
-        # Simulate multi-step processing
-        steps = [
-            "Parsing document structure",
-            "Extracting entities",
-            "Building semantic index",
-            "Creating knowledge graph",
-            "Generating summary"
-        ]
+        The document is read in windows of ``window_chars`` characters and
+        chunked with the configured ``chunk_size``/``chunk_overlap`` as it
+        is read; chunks are embedded and indexed while ``DocumentAnalyzer``
+        processes earlier windows, so peak memory follows the window size.
+        
+        Args:
+            source: Text or binary file object, or an iterable of ``str``
+                or ``bytes`` pieces
+            metadata: Optional metadata
+            doc_id: Document id; an existing document with this id is
+                replaced once the new one is fully indexed (defaults to the
+                content hash, as for ``analyze_document``; a source that
+                cannot seek is copied to a temporary file to compute it)
+            window_chars: Characters read per step (defaults to the
+                ``stream_window_chars`` config)
+            
+        Returns:
+            DocumentAnalysisResult object
+        """
+        result = run_document_stream_analysis(
+            source,
+            metadata,
+            node_parser=self.node_parser,
+            analyzer_pool=self.orchestrator.pools["DocumentAnalyzer"],
+            embedder=self.embedder,
+            vector_store=self.vector_store,
+            doc_id=doc_id,
+            window_chars=window_chars or self.config.get("stream_window_chars", DEFAULT_WINDOW_CHARS)
+        )
+        self._sync_sparse_index()
+        self._invalidate_caches()
+        self._maybe_compact()
+        return result
+    
+    def analyze_file(self, path: str, metadata: Optional[Dict] = None,
+                     doc_id: Optional[str] = None) -> DocumentAnalysisResult:
+        """
+        Analyze a UTF-8 text file in place, without loading it into memory.
         
-        # Mock extracted data
-        result = DocumentAnalysisResult(
-            document_id=doc_id,
-            entities=["LlamaIndex", "NVIDIA", "SLMs", "Multi-Agent"],
-            key_concepts=["Semantic Search", "Agent Orchestration", "Performance"],
-            summary="Document processed using multi-agent architecture.",
-            embeddings_created=42,
-            processing_time_ms=int((time.time() - start_time) * 1000 + 200)
+        The file is memory-mapped and only the chunks being embedded are
+        decoded. Search hits for its chunks carry ``byte_range`` offsets
+        into the file.
+        
+        Args:
+            path: Path of the file
+            metadata: Optional metadata
+            doc_id: Document id (defaults to the content hash, as for
+                ``analyze_document``); an earlier version is replaced
+            
+        Returns:
+            DocumentAnalysisResult object
+        """
+        result = run_file_analysis(
+            path,
+            metadata,
+            llama_index_config=self.config["llama_index_config"],
+            analyzer=self.orchestrator.agents["document_analyzer"],
+            embedder=self.embedder,
+            vector_store=self.vector_store,
+            doc_id=doc_id
         )
+        self._sync_sparse_index()
+        self._invalidate_caches()
+        self._maybe_compact()
+        return result
+    
+    def analyze_files(self,
+                      paths: Iterable[Union[str, Tuple[str, Optional[Dict]]]],
+                      max_workers: Optional[int] = None,
+                      batch_size: int = 16) -> Iterator[DocumentAnalysisResult]:
+        """
+        Analyze many files in parallel across a process pool.
+        
+        Like ``analyze_documents``, but workers receive paths and map the
+        files themselves, so no document text is read by this process or
+        pickled to the workers. As there, the files' chunks reach this
+        client's BM25 index in the background once all batches are done.
+        
+        Args:
+            paths: Iterable of file paths or (path, metadata) tuples
+            max_workers: Number of worker processes (defaults to CPU count);
+                1 runs everything in the calling process
+            batch_size: Number of files sent to a worker per task
+            
+        Yields:
+            DocumentAnalysisResult objects as they complete
+        """
+        from .batch import iter_analyze_files
         
+        try:
+            yield from iter_analyze_files(
+                paths,
+                llama_index_config=self.config["llama_index_config"],
+                index_path=self.vector_store.path,
+                max_workers=max_workers,
+                batch_size=batch_size
+            )
+        finally:
+            self.vector_store.refresh()
+            self._sync_sparse_index(wait=False)
+            self._invalidate_caches()
+    
+    def upsert_document(self, doc_id: str, text: str,
+                        metadata: Optional[Dict] = None) -> DocumentAnalysisResult:
+        """
+        Insert or replace a document in the index under a caller-chosen id.
+        
+        Only the chunks of this document are parsed and embedded (unchanged
+        chunks come from the embedding cache); its previous rows are
+        tombstoned in the same atomic update.
+        
+        Args:
+            doc_id: Stable document identifier
+            text: Full document text
+            metadata: Optional metadata
+            
+        Returns:
+            DocumentAnalysisResult object
+        """
+        result = run_document_analysis(
+            text,
+            metadata,
+            node_parser=self.node_parser,
+            analyzer=self.orchestrator.agents["document_analyzer"],
+            embedder=self.embedder,
+            vector_store=self.vector_store,
+            doc_id=doc_id
+        )
+        self._sync_sparse_index()
+        self._invalidate_caches()
+        self._maybe_compact()
         return result
     
+    def delete_document(self, doc_id: str) -> bool:
+        """
+        Remove a document from the index.
+        
+        Returns:
+            True if the document had indexed chunks
+        """
+        deleted = self.vector_store.delete_document(doc_id) > 0
+        if deleted:
+            self._sync_sparse_index()
+            self._invalidate_caches()
+            self._maybe_compact()
+        return deleted
+    
+    def _invalidate_caches(self, version: Optional[Tuple[int, int, int]] = None):
+        """
+        Drop cached query results after the indexed documents changed.
+        
+        Args:
+            version: Store version already read by the caller
+        """
+        version = version or self.vector_store.version
+        with self._cache_version_lock:
+            if version <= self._cache_version:
+                return
+            # Keys already carry the new version, so a query still running
+            # against the old index stores its result where no lookup looks
+            self._cache_version = version
+            if self.cache is not None:
+                self.cache.clear()
+            if self.semantic_cache is not None:
+                self.semantic_cache.clear()
+    
+    def _maybe_compact(self):
+        """Start background compaction once enough rows are tombstoned"""
+        threshold = self.config.get("compaction_threshold", 0.3)
+        if self.vector_store.dead_ratio < threshold:
+            return
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(
+            target=self._compact, name="index-compaction", daemon=True
+        )
+        self._compaction_thread.start()
+    
+    def _compact(self):
+        """Compact the vector store, then rebuild the BM25 and IVF indexes to match its rows"""
+        if not self.vector_store.compact():
+            return
+        if self.sparse_index is not None:
+            self._refresh_sparse_index()
+        self.retriever.train()
+    
+    def _new_sparse_index(self) -> InvertedIndex:
+        retrieval_config = self.config.get("retrieval_config", {})
+        return InvertedIndex(
+            k1=retrieval_config.get("bm25_k1", 1.2),
+            b=retrieval_config.get("bm25_b", 0.75)
+        )
+    
+    def _sync_sparse_index(self, wait: bool = True):
+        """
+        Bring the BM25 index up to date with the vector store.
+        
+        Rows added or deleted since the last sync are applied in the calling
+        thread if ``wait``. A rebuild (after opening a non-empty store or a
+        compaction) and any sync with ``wait=False`` run on a background
+        thread; until the index mirrors the store, ``_retrieve`` uses dense
+        results only.
+        """
+        index = self.sparse_index
+        if index is None:
+            return
+        if wait and index.generation == self.vector_store.generation and index.sync(self.vector_store):
+            return
+        with self._sparse_thread_lock:
+            if self._sparse_thread is not None and self._sparse_thread.is_alive():
+                return
+            self._sparse_thread = threading.Thread(
+                target=self._refresh_sparse_index, name="sparse-index-sync", daemon=True
+            )
+            self._sparse_thread.start()
+    
+    def _refresh_sparse_index(self):
+        """Catch the BM25 index up, or replace it with one built from the store's texts"""
+        index = self.sparse_index
+        if index.generation == self.vector_store.generation and index.sync(self.vector_store):
+            return
+        index = self._new_sparse_index()
+        # Starts over if the store is compacted while this runs
+        while not index.sync(self.vector_store):
+            index = self._new_sparse_index()
+        self.sparse_index = index
+    
+    def analyze_documents(self,
+                          documents: Iterable[Union[str, Tuple[str, Optional[Dict]]]],
+                          max_workers: Optional[int] = None,
+                          batch_size: int = 16) -> Iterator[DocumentAnalysisResult]:
+        """
+        Analyze many documents in parallel across a process pool.
+        
+        Documents are read lazily from ``documents`` and sent to worker
+        processes in batches of ``batch_size``. Each worker chunks the text
+        with the configured node parser and runs ``DocumentAnalyzer``.
+        Results are yielded as batches finish, so their order is not the
+        input order; use ``document_id`` to correlate them. Only a bounded
+        number of batches is in flight at once, keeping memory flat for
+        arbitrarily large inputs. The workers store chunk texts with the
+        embeddings; once all batches are done, this client's BM25 index
+        picks them up in the background.
+        
+        Args:
+            documents: Iterable of document texts or (text, metadata) tuples
+            max_workers: Number of worker processes (defaults to CPU count);
+                1 runs everything in the calling process
+            batch_size: Number of documents sent to a worker per task
+            
+        Yields:
+            DocumentAnalysisResult objects as they complete
+        """
+        from .batch import iter_analyze_documents
+        
+        try:
+            yield from iter_analyze_documents(
+                documents,
+                llama_index_config=self.config["llama_index_config"],
+                index_path=self.vector_store.path,
+                max_workers=max_workers,
+                batch_size=batch_size
+            )
+        finally:
+            # Map the rows the workers appended to the shared store and
+            # index their texts in the background
+            self.vector_store.refresh()
+            self._sync_sparse_index(wait=False)
+            self._invalidate_caches()
+    
     def query(self, 
               question: str, 
               context: Optional[Dict] = None,
@@ -165,73 +843,403 @@ class LexiconTrailClient:
         Returns:
             QueryResponse object
         """
+        start = time.perf_counter()
+        try:
+            with self.tracer.start_trace("query") as trace:
+                response = self._query(question, context, use_cache, return_sources)
+        finally:
+            self._observe_stage("query", start)
+        return self._attach_trace(response, trace)
+    
+    def _query(self, question: str, context: Optional[Dict], use_cache: bool,
+               return_sources: bool) -> QueryResponse:
         start_time = time.time()
         
+        query_key = self._query_key(question, context)
+        cache_key = query_key if use_cache and self.cache is not None else None
+        cached = self._lookup_cached(cache_key, start_time, return_sources)
+        if cached is not None:
+            return cached
+        
+        query_vector = self._embed_query(question)
+        classification = self._classify(question)
+        similar = self._lookup_similar(question, query_vector, classification, cache_key,
+                                       start_time, return_sources)
+        if similar is not None and not self.semantic_cache.should_audit():
+            return similar
+        
+        # Identical queries already in flight against the same index share
+        # one pipeline run
+        response, shared = self._single_flight(
+            query_key,
+            lambda: self._compute_query(question, context, start_time, cache_key, query_vector,
+                                        similar, classification)
+        )
+        return self._finish_query(response, start_time, return_sources, shared)
+    
+    @contextmanager
+    def _timed(self, stage: str) -> Iterator[None]:
+        """Trace a pipeline stage and record its latency when metrics are on"""
+        with span(stage):
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self._observe_stage(stage, start)
+    
+    def _observe_stage(self, stage: str, start: float):
+        if self.metrics_enabled:
+            self.stage_latency.observe(stage, (time.perf_counter() - start) * 1000)
+    
+    def _attach_trace(self, response: QueryResponse, trace: Optional[Trace]) -> QueryResponse:
+        """Reference a sampled trace (and optionally its spans) from the response"""
+        if trace is None:
+            return response
+        metadata = {**response.metadata, "trace_id": trace.trace_id}
+        if self.config.get("tracing", {}).get("attach_to_response", False):
+            metadata["trace"] = trace.to_dict()
+        return replace(response, metadata=metadata)
+    
+    def _embed_query(self, question: str) -> np.ndarray:
+        with self._timed("embed"):
+            return self.embedder.embed_query(question)
+    
+    def _classify(self, question: str) -> QueryClass:
+        """Classify a query once; every later stage reuses the result"""
+        with span("classify"):
+            return self.orchestrator.classifier.classify(question)
+    
+    def _single_flight(self, key, compute: Callable[[], QueryResponse]) -> Tuple[QueryResponse, bool]:
+        if self.single_flight is None:
+            with span("pipeline"):
+                return compute(), False
+        with span("pipeline") as current:
+            response, shared = self.single_flight.do(key, compute)
+            if current is not None:
+                current.set_attribute("coalesced", shared)
+        return response, shared
+    
+    def _compute_query(self, question: str, context: Optional[Dict], start_time: float,
+                       cache_key, query_vector: np.ndarray,
+                       similar: Optional[QueryResponse],
+                       classification: Optional[QueryClass] = None) -> QueryResponse:
+        """Run the pipeline for a cache miss and store the result"""
+        response = self._process_query(question, context, start_time, query_vector, classification)
+        if similar is not None:
+            self._audit_similar(question, similar, response)
+        self._store_response(response, cache_key, question, query_vector, classification)
+        return response
+    
+    def _query_key(self, question: str, context: Optional[Dict]) -> Tuple[Any, ...]:
+        """
+        Cache and single-flight key of a query against the current index.
+        
+        Includes the store version, which every process sharing the store
+        sees change on any edit; the caches are cleared the first time this
+        client sees a new version.
+        """
+        version = self.vector_store.version
+        if version > self._cache_version:
+            self._invalidate_caches(version)
+        return make_cache_key(question, context) + (version,)
+    
+    def _lookup_cached(self, cache_key, start_time: float,
+                       return_sources: bool) -> Optional[QueryResponse]:
+        """Return a cache-hit response for ``cache_key`` if one is stored"""
+        if cache_key is None:
+            return None
+        with self._timed("cache_lookup"):
+            cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        response = replace(
+            cached,
+            processing_time_ms=int((time.time() - start_time) * 1000),
+            metadata={**cached.metadata, "cache_hit": True}
+        )
+        return response if return_sources else self._without_sources(response)
+    
+    def _semantic_partition(self, question: str, classification: QueryClass,
+                            cache_key) -> Tuple[Any, ...]:
+        """
+        Semantic hits are only allowed between queries with the same class,
+        context, index generation and agent plan, so a hit never answers
+        with the wrong agents or from an edited index
+        """
+        agents = tuple(agent.name for agent in self.orchestrator.select_agents(question, classification))
+        return classification.query_type, cache_key[1:], agents
+    
+    def _lookup_similar(self, question: str, query_vector: np.ndarray,
+                        classification: QueryClass, cache_key,
+                        start_time: float, return_sources: bool) -> Optional[QueryResponse]:
+        """Return the cached response of a near-duplicate query, if any"""
+        if cache_key is None or self.semantic_cache is None:
+            return None
+        with self._timed("semantic_cache_lookup"):
+            found = self.semantic_cache.get(
+                query_vector, self._semantic_partition(question, classification, cache_key)
+            )
+        if found is None:
+            return None
+        cached, cached_query, similarity = found
+        response = replace(
+            cached,
+            processing_time_ms=int((time.time() - start_time) * 1000),
+            metadata={
+                **cached.metadata,
+                "cache_hit": True,
+                "semantic_cache_hit": True,
+                "cached_query": cached_query,
+                "similarity": round(similarity, 4)
+            }
+        )
+        return response if return_sources else self._without_sources(response)
+    
+    def _audit_similar(self, question: str, similar: QueryResponse, fresh: QueryResponse):
+        """Compare an audited semantic hit against the full pipeline's answer"""
+        # The retrieved documents and agents decide what an answer is grounded
+        # in, so a hit that disagrees on either would have been a false hit
+        agreed = (
+            set(similar.sources) <= set(fresh.sources)
+            and similar.agents_used == fresh.agents_used
+        )
+        self.semantic_cache.record_audit(
+            question,
+            similar.metadata["cached_query"],
+            similar.metadata["similarity"],
+            agreed
+        )
+    
+    def _process_query(self, question: str, context: Optional[Dict],
+                       start_time: float,
+                       query_vector: Optional[np.ndarray] = None,
+                       classification: Optional[QueryClass] = None) -> QueryResponse:
+        """Run the agent pipeline for a query that missed the cache"""
         # In the actual implementation:
         # 1. Query is classified by type
         # 2. Appropriate SLMs are selected
         # 3. LlamaIndex retrieval is performed
         # 4. Response is synthesized
+        hits = self._retrieve(question, query_vector)
+        routed = self.orchestrator.route_request(
+            self._route_payload(question, context, hits, classification)
+        )
+        return self._build_response(question, routed, hits, start_time)
+    
+    def _retrieve(self, question: str,
+                  query_vector: Optional[np.ndarray] = None) -> List[SearchHit]:
+        """
+        Top-k chunks for a query, reusing its embedding if already computed.
         
-        # Mock agent selection
-        agents = self.orchestrator.select_agents(question)
-        
+        With ``hybrid: "rrf"`` the BM25 and dense rankings, each
+        ``fusion_depth`` deep, are merged by reciprocal rank fusion, so
+        exact terms such as statute citations rank well even where their
+        embedding is diluted. ``"sparse"`` answers from BM25 alone, skipping
+        the vector scan, whenever BM25 finds a match. In both modes a query
+        sharing no term with the index falls back to dense results, as do
+        all queries while the index does not yet cover every live row of
+        the store (it is then brought up to date in the background).
+        """
+        retrieval_config = self.config.get("retrieval_config", {})
+        top_k = retrieval_config.get("top_k", 5)
+        depth = max(top_k, retrieval_config.get("fusion_depth", 50))
+        sparse: List[SearchHit] = []
+        index = self.sparse_index
+        if index is not None and not index.mirrors(self.vector_store):
+            self._sync_sparse_index(wait=False)
+        elif index is not None and len(index):
+            with self._timed("bm25"):
+                sparse = index.search(question, k=depth)
+            if sparse and self.hybrid_mode == "sparse":
+                return sparse[:top_k]
+        query = question if query_vector is None else query_vector[np.newaxis]
+        with self._timed("retrieval"):
+            dense = self.retriever.search(query, k=depth if sparse else top_k)[0]
+        if not sparse:
+            return dense
+        with self._timed("fusion"):
+            return reciprocal_rank_fusion([dense, sparse], k=retrieval_config.get("rrf_k", 60),
+                                          limit=top_k)
+    
+    def _route_payload(self, question: str, context: Optional[Dict],
+                       hits: List[SearchHit],
+                       classification: Optional[QueryClass] = None) -> Dict[str, Any]:
+        """Orchestrator request for a query"""
+        payload = {
+            "type": question,
+            "data": question,
+            "context": context or {},
+            "retrieval_results": {"hits": hits}
+        }
+        if classification is not None:
+            payload["classification"] = classification
+        return payload
+    
+    def _build_response(self, question: str, routed: Dict[str, Any],
+                        hits: List[SearchHit], start_time: float) -> QueryResponse:
+        """Assemble the QueryResponse from the orchestrator's routing result"""
+        if self.metrics_enabled:
+            self.stage_latency.observe("routing", routed["routing_time_ms"])
+        metadata = {
+            "query_type": routed["classification"].query_type,
+            "cache_hit": False,
+            "tokens_processed": 256,
+            "routing_time_ms": routed["routing_time_ms"]
+        }
+        # Chunks ingested from files can be cited by exact byte range
+        citations = [
+            {"document_id": hit.document_id, "node_id": hit.node_id, "byte_range": list(hit.byte_range)}
+            for hit in hits if hit.byte_range is not None
+        ]
+        if citations:
+            metadata["citations"] = citations
         # Mock response
-        response = QueryResponse(
+        return QueryResponse(
             answer=f"Based on multi-agent analysis: {question[:50]}...",
             confidence=0.92,
-            sources=["Document Index", "Knowledge Graph", "Cache"] if return_sources else [],
-            agents_used=[a.name for a in agents],
-            processing_time_ms=int((time.time() - start_time) * 1000 + 180),
-            metadata={
-                "query_type": self._classify_query(question),
-                "cache_hit": False,
-                "tokens_processed": 256
-            }
+            # Retrieved documents, best first
+            sources=tuple(dict.fromkeys(hit.document_id for hit in hits)),
+            agents_used=routed["agents_used"],
+            processing_time_ms=int((time.time() - start_time) * 1000),
+            metadata=metadata
         )
+    
+    def _store_response(self, response: QueryResponse, cache_key, question: str,
+                        query_vector: Optional[np.ndarray] = None,
+                        classification: Optional[QueryClass] = None):
+        """Store a fresh response in the caches"""
+        if cache_key is None:
+            return
+        # Copy the metadata dict so callers mutating theirs can't poison the cache
+        stored = replace(response, metadata=dict(response.metadata))
+        self.cache.set(cache_key, stored)
+        if self.semantic_cache is not None and query_vector is not None:
+            if classification is None:
+                classification = self.orchestrator.classifier.classify(question)
+            partition = self._semantic_partition(question, classification, cache_key)
+            self.semantic_cache.set(query_vector, partition, question, stored)
+    
+    def _finish_query(self, response: QueryResponse, start_time: float,
+                      return_sources: bool, shared: bool = False) -> QueryResponse:
+        """Apply per-caller output options to a computed response"""
+        if shared:
+            # Coalesced callers get their own copy and their own latency
+            response = replace(
+                response,
+                processing_time_ms=int((time.time() - start_time) * 1000),
+                metadata={**response.metadata, "coalesced": True}
+            )
+        
+        if not return_sources:
+            response = self._without_sources(response)
         
         return response
     
-    def query_stream(self, question: str, context: Optional[Dict] = None):
+    @staticmethod
+    def _without_sources(response: QueryResponse) -> QueryResponse:
+        metadata = {key: value for key, value in response.metadata.items() if key != "citations"}
+        return replace(response, sources=(), metadata=metadata)
+    
+    def semantic_search(self,
+                        query: str,
+                        top_k: int = 10,
+                        nprobe: Optional[int] = None) -> SemanticSearchResponse:
         """
-        Stream a response for real-time applications.
+        Retrieve the chunks most similar to ``query``.
         
-        Yields response chunks as they're generated.
+        Args:
+            query: Search text
+            top_k: Number of chunks to return
+            nprobe: IVF lists to probe (ignored for exact search)
+            
+        Returns:
+            SemanticSearchResponse with hits ordered by cosine similarity
         """
-        # Mock streaming response
-        response_parts = [
-            "Based on the analysis using ",
-            "multiple specialized agents ",
-            "and LlamaIndex retrieval, ",
-            "here's the answer to your query."
-        ]
+        start_time = time.time()
+        hits = self.retriever.search(query, k=top_k, nprobe=nprobe)[0]
+        return SemanticSearchResponse(
+            query=query,
+            results=hits,
+            processing_time_ms=int((time.time() - start_time) * 1000)
+        )
+    
+    def query_stream(self,
+                     question: str,
+                     context: Optional[Dict] = None,
+                     callbacks: Optional[Dict[str, Any]] = None) -> TokenStream:
+        """
+        Stream a response for real-time applications.
+        
+        Retrieval and the upstream agents run first; the response generator's
+        tokens are then produced lazily as the returned stream is iterated.
         
-        for part in response_parts:
-            time.sleep(0.1)  # Simulate processing
-            yield part
-    
-    def _classify_query(self, question: str) -> str:
-        """Classify query type"""
-        question_lower = question.lower()
-        if "what" in question_lower or "explain" in question_lower:
-            return "explanatory"
-        elif "how" in question_lower:
-            return "procedural"
-        elif "why" in question_lower:
-            return "analytical"
-        else:
-            return "factual"
+        Args:
+            question: The question to ask
+            context: Optional context for the query
+            callbacks: Optional ``on_token``, ``on_complete`` and ``on_error``
+                handlers; when given, the stream is consumed immediately
+            
+        Returns:
+            TokenStream whose ``stats`` report time-to-first-token and
+            tokens/sec once it is exhausted
+        """
+        start_time = time.perf_counter()
+        try:
+            hits = self._retrieve(question)
+            agents, tokens = self.orchestrator.stream_request(
+                self._route_payload(question, context, hits)
+            )
+        except Exception as exc:
+            if callbacks and callbacks.get("on_error"):
+                callbacks["on_error"](exc)
+            raise
+        stream = TokenStream(tokens, agents, start_time=start_time, callbacks=callbacks)
+        if callbacks:
+            stream.run()
+        return stream
     
     def get_agent_status(self) -> Dict[str, Any]:
         """Get current status of all agents"""
         return self.orchestrator.get_status()
     
+    def get_stage_latency(self) -> Dict[str, Dict[str, Any]]:
+        """Latency histogram (milliseconds) of each query pipeline stage"""
+        return self.stage_latency.snapshot()
+    
+    def metrics_text(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        return render_text(collect_metrics(self))
+    
+    def start_metrics_server(self, port: int = 9464, addr: str = "127.0.0.1"):
+        """
+        Serve Prometheus metrics on ``http://addr:port/metrics``.
+        
+        Returns:
+            The running HTTP server; call ``shutdown()`` to stop it
+        """
+        return start_metrics_server(self, port=port, addr=addr)
+    
+    def close(self):
+        """Release agent worker threads and cache connections"""
+        self.orchestrator.close()
+        if self.cache is not None:
+            self.cache.close()
+    
     def health_check(self) -> Dict[str, Any]:
         """Perform system health check"""
         return {
             "status": "healthy",
             "agents_available": 4,
-            "cache_status": "active",
+            "cache_status": "active" if self.cache is not None else "disabled",
+            "cache": self.cache.stats() if self.cache is not None else {},
+            "semantic_cache": (
+                self.semantic_cache.stats() if self.semantic_cache is not None else {}
+            ),
+            "coalescing": self.single_flight.stats() if self.single_flight is not None else {},
+            "embedding_cache": (
+                self.embedder.stats() if isinstance(self.embedder, CachedEmbedder) else {}
+            ),
+            "sparse_index": self.sparse_index.stats() if self.sparse_index is not None else {},
             "index_status": "ready",
             "response_time_avg_ms": 240
         }
\ No newline at end of file
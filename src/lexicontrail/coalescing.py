@@ -0,0 +1,119 @@
+"""
+Single-flight coalescing of identical in-flight requests
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class _LeaderCancelled(Exception):
+    """Published to waiting callers when the leader was cancelled midway"""
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent calls that share a key.
+
+    The first caller for a key (the leader) runs the computation; callers
+    that arrive with the same key while it is in flight wait for the
+    leader's result, or exception, instead of repeating the work. Sync
+    and asyncio callers share the same in-flight table, so an ``async``
+    query can attach to a computation started by a thread and vice versa.
+
+    Cancelling a waiting asyncio caller only cancels that caller. If the
+    leader itself is cancelled, its waiting callers rejoin the key: the
+    first becomes the new leader and runs its own ``fn``.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run ``fn`` once for all concurrent callers with ``key``.
+
+        Returns:
+            (result, shared) where ``shared`` is True for callers that
+            received another caller's result
+        """
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return future.result(), True
+            except _LeaderCancelled:
+                continue
+        try:
+            result = fn()
+        except BaseException as exc:
+            self._finish(key, future, exception=exc)
+            raise
+        self._finish(key, future, result=result)
+        return result, False
+
+    async def do_async(self, key: Hashable,
+                       fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Asyncio variant of ``do``; ``fn`` returns an awaitable"""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                # Shielded: cancelling this caller must not cancel the
+                # future every other caller of the key is waiting on
+                return await asyncio.shield(asyncio.wrap_future(future)), True
+            except _LeaderCancelled:
+                continue
+        try:
+            result = await fn()
+        except BaseException as exc:
+            self._finish(key, future, exception=exc)
+            raise
+        self._finish(key, future, result=result)
+        return result, False
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, result: Any = None,
+                exception: BaseException = None):
+        # Drop the key before publishing, so a request arriving afterwards
+        # starts a fresh computation rather than reusing a finished one
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if isinstance(exception, asyncio.CancelledError):
+            # The computation was abandoned, not failed: let a waiter redo it
+            exception = _LeaderCancelled()
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            # Already cancelled by a caller that did not wait through shield
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Leader and coalesced request counts"""
+        with self._lock:
+            total = self.leaders + self.coalesced
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": self.coalesced / total if total else 0.0,
+            }
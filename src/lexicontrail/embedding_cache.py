@@ -0,0 +1,111 @@
+"""
+Content-addressed persistent embedding cache
+"""
+
+import hashlib
+import os
+import re
+import threading
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from .vector_store import MmapVectorStore
+
+
+def content_hash(text: str, digest_size: int = 16) -> str:
+    """Stable hex digest of ``text`` (independent of PYTHONHASHSEED)"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=digest_size).hexdigest()
+
+
+class CachedEmbedder:
+    """
+    Embedder wrapper that skips texts it has embedded before.
+
+    Each text is keyed by the blake2b hash of its content, and vectors are
+    kept in an ``MmapVectorStore`` so the cache survives restarts and is
+    shared by every process pointing at the same directory. Re-ingesting a
+    mostly unchanged document only embeds the chunks whose text changed.
+    """
+
+    def __init__(self, embedder, path: str, dtype: str = "float32"):
+        """
+        Initialize the cache.
+
+        Args:
+            embedder: Underlying embedder with ``embed``, ``dim`` and ``model_name``
+            path: Cache root; a subdirectory per model and dimension is used
+            dtype: On-disk element type
+        """
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.model_name = embedder.model_name
+        model_dir = re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{self.model_name}-{self.dim}")
+        self.store = MmapVectorStore(os.path.join(path, model_dir), dim=self.dim, dtype=dtype)
+        self._rows: Dict[str, int] = {}
+        self._indexed = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed ``texts``, computing vectors only for unseen content"""
+        keys = [content_hash(text) for text in texts]
+        matrix = np.empty((len(texts), self.dim), dtype=np.float32)
+
+        with self._lock:
+            rows = self._lookup(keys)
+            missing = [i for i, row in enumerate(rows) if row is None]
+            # Duplicate texts within one call are embedded once
+            new_keys: Dict[str, List[int]] = {}
+            for i in missing:
+                new_keys.setdefault(keys[i], []).append(i)
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        cached = [i for i, row in enumerate(rows) if row is not None]
+        if cached:
+            vectors = self.store.vectors
+            matrix[cached] = vectors[[rows[i] for i in cached]]
+
+        if new_keys:
+            unique_keys = list(new_keys)
+            fresh = self.embedder.embed([texts[new_keys[key][0]] for key in unique_keys])
+            for key, vector in zip(unique_keys, fresh):
+                matrix[new_keys[key]] = vector
+            self.store.add(ids=unique_keys, doc_ids=[self.model_name] * len(unique_keys), vectors=fresh)
+        return matrix
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Queries are rarely repeated verbatim, so they bypass the cache"""
+        return self.embedder.embed([text])[0]
+
+    def _lookup(self, keys: List[str]) -> List[Any]:
+        """Row of each key in the store, refreshing from disk on a miss"""
+        rows = [self._rows.get(key) for key in keys]
+        if None not in rows:
+            return rows
+        # Other processes may have embedded these since we last looked
+        self.store.refresh()
+        if self._indexed < len(self.store):
+            self._index_new_rows()
+            rows = [self._rows.get(key) for key in keys]
+        return rows
+
+    def _index_new_rows(self):
+        chunks = self.store.chunks
+        end = len(chunks)
+        for row, key in enumerate(chunks.node_ids(self._indexed), self._indexed):
+            self._rows.setdefault(key, row)
+        self._indexed = end
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of this process and total cached entries"""
+        self.store.refresh()
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,72 @@
+"""
+Mock embedding model
+"""
+
+import os
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .embedding_cache import CachedEmbedder
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class HashingEmbedding:
+    """
+    Deterministic feature-hashing embedder.
+
+    Stands in for the configured ``embedding_model``: each token is hashed
+    into one of ``dim`` buckets with a hashed sign, and the result is
+    L2-normalized so cosine similarity is a plain dot product. The output
+    is stable across processes and runs, which the on-disk index relies on.
+
+    In production, this would call the configured embedding model.
+    """
+
+    def __init__(self, dim: int = 256, model_name: str = "hashing"):
+        self.dim = dim
+        self.model_name = model_name
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed ``texts`` into a (len(texts), dim) float32 matrix"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                digest = zlib.crc32(token.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                matrix[row, digest % self.dim] += sign
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single query string into a (dim,) vector"""
+        return self.embed([text])[0]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens, as used by the embedder"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def create_embedder(llama_index_config: Dict[str, Any], index_path: Optional[str] = None):
+    """
+    Build the configured embedder.
+    
+    When ``index_path`` is given and ``embedding_cache`` is enabled, the
+    embedder is wrapped in a content-addressed cache stored next to the index.
+    """
+    embedder = HashingEmbedding(
+        dim=llama_index_config.get("embedding_dim", 256),
+        model_name=llama_index_config.get("embedding_model", "hashing")
+    )
+    if index_path is None or not llama_index_config.get("embedding_cache", True):
+        return embedder
+    return CachedEmbedder(
+        embedder,
+        os.path.join(index_path, "embedding_cache"),
+        dtype=llama_index_config.get("embedding_dtype", "float32")
+    )
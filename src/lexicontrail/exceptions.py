@@ -2,6 +2,8 @@
 Custom exceptions for LexiconTrail
 """
 
+from typing import Optional
+
 
 class LexiconTrailError(Exception):
     """Base exception for LexiconTrail"""
@@ -25,7 +27,10 @@ class AuthenticationError(LexiconTrailError):
 
 class RateLimitError(LexiconTrailError):
     """Rate limit exceeded"""
-    pass
+    
+    def __init__(self, message: str = "Rate limit exceeded", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 class TimeoutError(LexiconTrailError):
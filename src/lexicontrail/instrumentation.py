@@ -0,0 +1,202 @@
+"""
+Prometheus export of agent, cache and pipeline metrics
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from .metrics import (
+    LATENCY_MS_BUCKETS,
+    AgentMetrics,
+    MetricFamily,
+    histogram_samples,
+    render_text,
+    sketch_histogram_samples,
+    summary_samples,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_MS = 0.001  # histograms record milliseconds; Prometheus expects seconds
+
+
+def collect_metrics(client) -> List[MetricFamily]:
+    """
+    Snapshot every metric of a ``LexiconTrailClient``.
+
+    Nothing here runs on the request path: agents record into per-thread
+    counter shards and sketches, pipeline stages into bucket counters, and
+    this function only merges and reads them when a scrape arrives.
+    """
+    pools = client.orchestrator.pools
+    agents = {name: pool.merged_metrics() for name, pool in pools.items()}
+    totals = {name: metrics.snapshot() for name, metrics in agents.items()}
+    latency = {name: metrics.latency_ms for name, metrics in agents.items()}
+    families = [
+        _counter("lexicontrail_agent_requests",
+                 "Requests completed by each agent",
+                 {name: stats["requests_processed"] for name, stats in totals.items()}),
+        _counter("lexicontrail_agent_errors",
+                 "Requests that failed inside each agent",
+                 {name: stats["errors"] for name, stats in totals.items()}),
+        _counter("lexicontrail_agent_rejected",
+                 "Requests rejected because the agent queue was full",
+                 {name: pool.rejected for name, pool in pools.items()}),
+        _counter("lexicontrail_agent_timeouts",
+                 "Requests whose caller timed out waiting for the agent",
+                 {name: pool.timed_out for name, pool in pools.items()}),
+        _gauge("lexicontrail_agent_queue_depth",
+               "Requests waiting in each agent queue",
+               {name: pool.queue_depth for name, pool in pools.items()}),
+        _gauge("lexicontrail_agent_utilization",
+               "Fraction of each agent's workers processing a batch",
+               {name: pool.utilization for name, pool in pools.items()}),
+        MetricFamily(
+            "lexicontrail_agent_latency_seconds", "histogram",
+            "Agent request latency from submission to result",
+            [sample for name, sketch in latency.items()
+             for sample in sketch_histogram_samples("lexicontrail_agent_latency_seconds",
+                                                    {"agent": name}, sketch,
+                                                    LATENCY_MS_BUCKETS, _MS)]
+        ),
+        MetricFamily(
+            "lexicontrail_agent_latency_quantile_seconds", "summary",
+            "Agent request latency percentiles (1% relative error)",
+            [sample for name, sketch in latency.items()
+             for sample in summary_samples("lexicontrail_agent_latency_quantile_seconds",
+                                           {"agent": name}, sketch,
+                                           AgentMetrics.QUANTILES, _MS)]
+        ),
+        MetricFamily(
+            "lexicontrail_agent_queue_wait_seconds", "histogram",
+            "Time requests wait in an agent queue before dispatch",
+            [sample for name, pool in pools.items()
+             for sample in histogram_samples("lexicontrail_agent_queue_wait_seconds",
+                                             {"agent": name}, pool.queue_wait_ms, _MS)]
+        ),
+        MetricFamily(
+            "lexicontrail_agent_batch_size", "histogram",
+            "Requests per micro-batch dispatched to an agent",
+            [sample for name, pool in pools.items()
+             for sample in histogram_samples("lexicontrail_agent_batch_size",
+                                             {"agent": name}, pool.batch_sizes)]
+        ),
+        MetricFamily(
+            "lexicontrail_query_stage_latency_seconds", "histogram",
+            "Latency of each query pipeline stage",
+            [sample for stage, histogram in sorted(client.stage_latency.stages.items())
+             for sample in histogram_samples("lexicontrail_query_stage_latency_seconds",
+                                             {"stage": stage}, histogram, _MS)]
+        ),
+    ]
+
+    caches = {}
+    if client.cache is not None:
+        caches["exact"] = client.cache.stats()
+    if client.semantic_cache is not None:
+        caches["semantic"] = client.semantic_cache.stats()
+    families += [
+        _counter("lexicontrail_cache_hits", "Query cache hits",
+                 {tier: stats["hits"] for tier, stats in caches.items()}, label="tier"),
+        _counter("lexicontrail_cache_misses", "Query cache misses",
+                 {tier: stats["misses"] for tier, stats in caches.items()}, label="tier"),
+        _counter("lexicontrail_cache_evictions", "Query cache LRU evictions",
+                 {tier: stats["evictions"] for tier, stats in caches.items()}, label="tier"),
+        _gauge("lexicontrail_cache_hit_ratio", "Query cache hit ratio since start",
+               {tier: stats["hit_rate"] for tier, stats in caches.items()}, label="tier"),
+        _gauge("lexicontrail_cache_entries", "Entries held by each query cache",
+               {tier: stats["size"] for tier, stats in caches.items()}, label="tier"),
+    ]
+    if client.single_flight is not None:
+        families.append(_counter(
+            "lexicontrail_requests_coalesced",
+            "Queries that attached to an identical in-flight query",
+            {None: client.single_flight.coalesced}
+        ))
+    return families
+
+
+def _counter(name: str, help: str, values: Dict[Any, float], label: str = "agent") -> MetricFamily:
+    return MetricFamily(name, "counter", help, [
+        (f"{name}_total", {} if key is None else {label: key}, value)
+        for key, value in values.items()
+    ])
+
+
+def _gauge(name: str, help: str, values: Dict[Any, float], label: str = "agent") -> MetricFamily:
+    return MetricFamily(name, "gauge", help, [
+        (name, {} if key is None else {label: key}, value) for key, value in values.items()
+    ])
+
+
+class PrometheusCollector:
+    """
+    ``prometheus_client`` custom collector over a client's metrics.
+
+    Register it with an existing registry to serve LexiconTrail metrics
+    from an application's own ``/metrics`` endpoint.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def collect(self):
+        from prometheus_client.core import Metric
+
+        for family in collect_metrics(self.client):
+            metric = Metric(family.name, family.help, family.kind)
+            for sample_name, labels, value in family.samples:
+                metric.add_sample(sample_name, labels, value)
+            yield metric
+
+
+def register_prometheus(client, registry=None) -> PrometheusCollector:
+    """
+    Register a client's metrics with a ``prometheus_client`` registry.
+
+    Requires the optional ``prometheus-client`` package.
+
+    Args:
+        client: LexiconTrailClient to export
+        registry: Target registry (defaults to ``prometheus_client.REGISTRY``)
+    """
+    try:
+        import prometheus_client
+    except ImportError as exc:
+        raise ImportError(
+            "register_prometheus requires prometheus-client: pip install prometheus-client"
+        ) from exc
+    collector = PrometheusCollector(client)
+    (registry or prometheus_client.REGISTRY).register(collector)
+    return collector
+
+
+def start_metrics_server(client, port: int = 9464, addr: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve ``/metrics`` for a client from a background thread.
+
+    Uses only the standard library, so the endpoint works whether or not
+    ``prometheus-client`` is installed. Call ``shutdown()`` on the returned
+    server to stop it.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_text(collect_metrics(client)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="lexicontrail-metrics", daemon=True)
+    thread.start()
+    return server
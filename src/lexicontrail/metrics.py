@@ -0,0 +1,410 @@
+"""
+Lightweight in-process metric primitives and Prometheus text rendering
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Latency buckets (milliseconds) shared by agent and pipeline-stage histograms
+LATENCY_MS_BUCKETS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with Prometheus-style cumulative buckets.
+
+    Observations above the largest bound are counted in the implicit
+    ``+Inf`` bucket.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.bounds: List[float] = sorted(buckets)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record a single observation"""
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return cumulative bucket counts, total count and sum"""
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.bounds + [float("inf")], counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "buckets": buckets,
+            "count": cumulative,
+            "sum": total_sum,
+        }
+
+
+class DDSketch:
+    """
+    Streaming quantile sketch with relative-error guarantees (DDSketch).
+
+    Positive values fall into logarithmic bins of ratio ``gamma``; any
+    quantile is then within ``relative_accuracy`` of the true value. At
+    most ``max_bins`` bins are kept, merging the lowest ones when full, so
+    memory stays bounded regardless of the number of observations while
+    the upper quantiles stay accurate. Sketches with the same accuracy
+    merge exactly, which makes them suitable for combining per-thread,
+    per-replica and per-process measurements.
+
+    Not thread-safe on its own; ``AgentMetrics`` gives each thread its own
+    sketch.
+    """
+
+    __slots__ = ("relative_accuracy", "max_bins", "gamma", "_log_gamma", "min_value",
+                 "bins", "zero_count", "count", "sum", "min", "max")
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048,
+                 min_value: float = 1e-9):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+        """Record a single observation"""
+        if value > self.min_value:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            bins = self.bins
+            bins[key] = bins.get(key, 0) + 1
+            if len(bins) > self.max_bins:
+                self._collapse()
+        else:
+            self.zero_count += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def _collapse(self):
+        """Fold the lowest bins into one so at most ``max_bins`` remain"""
+        keys = sorted(self.bins)
+        excess = keys[:len(keys) - self.max_bins + 1]
+        target = keys[len(excess)]
+        self.bins[target] += sum(self.bins.pop(key) for key in excess)
+
+    def merge(self, other: "DDSketch"):
+        """Add another sketch's observations into this one"""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, count in list(other.bins.items()):
+            self.bins[key] = self.bins.get(key, 0) + count
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate ``q``-quantile (0..1), or None if the sketch is empty"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0 if self.min > 0 else self.min
+        seen = self.zero_count
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def count_at_most(self, value: float) -> int:
+        """Approximate number of observations ``<= value`` (for bucket export)"""
+        if value <= self.min_value:
+            return self.zero_count
+        limit = math.ceil(math.log(value) / self._log_gamma)
+        return self.zero_count + sum(count for key, count in self.bins.items() if key <= limit)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form, e.g. for shipping to another process"""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "max_bins": self.max_bins,
+            "bins": {str(key): count for key, count in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DDSketch":
+        sketch = cls(data["relative_accuracy"], data["max_bins"])
+        sketch.bins = {int(key): count for key, count in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        if sketch.count:
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+        return sketch
+
+
+class _MetricsShard:
+    """Counters written by a single thread"""
+
+    __slots__ = ("requests", "errors", "latency_ms")
+
+    def __init__(self, relative_accuracy: float):
+        self.requests = 0
+        self.errors = 0
+        self.latency_ms = DDSketch(relative_accuracy)
+
+
+class AgentMetrics:
+    """
+    Request counters and latency sketch of one agent.
+
+    Every recording thread gets its own shard, so updates never contend
+    on a lock and cannot be lost to a concurrent read-modify-write; a
+    lock is only taken the first time a thread records. Readers merge
+    the shards. Snapshots from other replicas or processes combine with
+    ``merge``/``merged``, or via ``to_dict``/``from_dict``.
+    """
+
+    QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.accuracy = 0.0
+        self._local = threading.local()
+        self._shards: List[_MetricsShard] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> _MetricsShard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _MetricsShard(self.relative_accuracy)
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def record(self, latency_ms: float, accuracy: Optional[float] = None):
+        """Record one completed request"""
+        shard = self._shard()
+        shard.requests += 1
+        shard.latency_ms.add(latency_ms)
+        if accuracy is not None:
+            self.accuracy = accuracy
+
+    def record_error(self, count: int = 1):
+        """Record requests that failed"""
+        self._shard().errors += count
+
+    def _totals(self) -> Tuple[int, int, DDSketch]:
+        with self._lock:
+            shards = list(self._shards)
+        latency = DDSketch(self.relative_accuracy)
+        requests = errors = 0
+        for shard in shards:
+            requests += shard.requests
+            errors += shard.errors
+            latency.merge(shard.latency_ms)
+        return requests, errors, latency
+
+    @property
+    def latency_ms(self) -> DDSketch:
+        """Merged latency sketch over all threads"""
+        return self._totals()[2]
+
+    @classmethod
+    def merged(cls, metrics: Sequence["AgentMetrics"]) -> "AgentMetrics":
+        """Combine the metrics of several replicas into one"""
+        combined = cls(metrics[0].relative_accuracy)
+        for item in metrics:
+            combined.merge(item)
+        combined.accuracy = metrics[0].accuracy
+        return combined
+
+    def merge(self, other: "AgentMetrics"):
+        """Fold another instance's totals into this one"""
+        requests, errors, latency = other._totals()
+        shard = self._shard()
+        shard.requests += requests
+        shard.errors += errors
+        shard.latency_ms.merge(latency)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counts, mean and latency percentiles (milliseconds)"""
+        requests, errors, latency = self._totals()
+        snapshot = {
+            "requests_processed": requests,
+            "errors": errors,
+            "avg_response_time": latency.sum / latency.count if latency.count else 0,
+            "accuracy": self.accuracy,
+        }
+        for q in self.QUANTILES:
+            value = latency.quantile(q)
+            snapshot[f"p{round(q * 100):d}_ms"] = None if value is None else round(value, 3)
+        snapshot["max_ms"] = round(latency.max, 3) if latency.count else None
+        return snapshot
+
+    def to_dict(self) -> Dict[str, Any]:
+        requests, errors, latency = self._totals()
+        return {
+            "requests": requests,
+            "errors": errors,
+            "accuracy": self.accuracy,
+            "latency_ms": latency.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AgentMetrics":
+        latency = DDSketch.from_dict(data["latency_ms"])
+        metrics = cls(latency.relative_accuracy)
+        shard = metrics._shard()
+        shard.requests = data["requests"]
+        shard.errors = data["errors"]
+        shard.latency_ms = latency
+        metrics.accuracy = data["accuracy"]
+        return metrics
+
+
+class StageTimer:
+    """Latency histogram (in milliseconds) per named pipeline stage"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.stages: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, value_ms: float):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, Histogram(self.buckets))
+        histogram.observe(value_ms)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Observe the duration of the ``with`` block under ``stage``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {stage: histogram.snapshot() for stage, histogram in list(self.stages.items())}
+
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class MetricFamily(NamedTuple):
+    """One exported metric with all of its labelled samples"""
+    name: str
+    kind: str  # "counter", "gauge" or "histogram"
+    help: str
+    samples: List[Sample]
+
+
+def histogram_samples(name: str, labels: Dict[str, str], histogram: Histogram,
+                      scale: float = 1.0) -> List[Sample]:
+    """
+    Prometheus ``_bucket``/``_count``/``_sum`` samples of a histogram.
+
+    ``scale`` converts recorded units, e.g. ``0.001`` exports milliseconds
+    as seconds.
+    """
+    snapshot = histogram.snapshot()
+    samples = []
+    for bound, count in zip(histogram.bounds + [math.inf], snapshot["buckets"].values()):
+        le = "+Inf" if bound == math.inf else _format_value(bound * scale)
+        samples.append((f"{name}_bucket", {**labels, "le": le}, count))
+    samples.append((f"{name}_count", labels, snapshot["count"]))
+    samples.append((f"{name}_sum", labels, snapshot["sum"] * scale))
+    return samples
+
+
+def sketch_histogram_samples(name: str, labels: Dict[str, str], sketch: DDSketch,
+                             bounds: Sequence[float], scale: float = 1.0) -> List[Sample]:
+    """Histogram samples with bucket counts estimated from a sketch"""
+    samples = [
+        (f"{name}_bucket", {**labels, "le": _format_value(bound * scale)}, sketch.count_at_most(bound))
+        for bound in bounds
+    ]
+    samples.append((f"{name}_bucket", {**labels, "le": "+Inf"}, sketch.count))
+    samples.append((f"{name}_count", labels, sketch.count))
+    samples.append((f"{name}_sum", labels, sketch.sum * scale))
+    return samples
+
+
+def summary_samples(name: str, labels: Dict[str, str], sketch: DDSketch,
+                    quantiles: Sequence[float], scale: float = 1.0) -> List[Sample]:
+    """Prometheus summary samples (quantiles, count, sum) of a sketch"""
+    samples = []
+    for q in quantiles:
+        value = sketch.quantile(q)
+        samples.append((name, {**labels, "quantile": _format_value(q)},
+                        math.nan if value is None else value * scale))
+    samples.append((f"{name}_count", labels, sketch.count))
+    samples.append((f"{name}_sum", labels, sketch.sum * scale))
+    return samples
+
+
+def render_text(families: Sequence[MetricFamily]) -> str:
+    """Render metric families in the Prometheus text exposition format"""
+    lines = []
+    for family in families:
+        # The 0.0.4 format names counters after their ``_total`` samples
+        name = f"{family.name}_total" if family.kind == "counter" else family.name
+        lines.append(f"# HELP {name} {family.help}")
+        lines.append(f"# TYPE {name} {family.kind}")
+        for sample_name, labels, value in family.samples:
+            if labels:
+                label_text = ",".join(
+                    f'{key}="{_escape(str(val))}"' for key, val in labels.items()
+                )
+                lines.append(f"{sample_name}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{sample_name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value != value:
+        return "NaN"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -2,36 +2,77 @@
 Mock agent implementations demonstrating the architecture pattern
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from abc import ABC, abstractmethod
-import random
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+import asyncio
+import time
+
+from .classifier import DEFAULT_CLASSIFIER, QueryClass, classify_request
+from .exceptions import AgentError, TimeoutError
+from .metrics import AgentMetrics
+from .pool import AgentPool
+from .sparse_index import query_terms
+from .tracing import span
 
 
 class BaseAgent(ABC):
     """Base class for all agents"""
     
+    # Names of agents whose results this agent consumes. Agents that do not
+    # depend on each other run concurrently in AgentOrchestrator.route_request.
+    depends_on: Tuple[str, ...] = ()
+    
     def __init__(self, name: str, model_type: str = "slm"):
         self.name = name
         self.model_type = model_type
-        self.metrics = {
-            "requests_processed": 0,
-            "avg_response_time": 0,
-            "accuracy": 0.0
-        }
+        self.agent_metrics = AgentMetrics()
     
     @abstractmethod
     def process(self, input_data: Any) -> Any:
         """Process input and return result"""
         pass
     
-    def update_metrics(self, response_time: float, accuracy: float):
-        """Update agent metrics"""
-        self.metrics["requests_processed"] += 1
-        self.metrics["avg_response_time"] = (
-            (self.metrics["avg_response_time"] * (self.metrics["requests_processed"] - 1) + response_time) /
-            self.metrics["requests_processed"]
-        )
-        self.metrics["accuracy"] = accuracy
+    def process_batch(self, inputs: List[Any]) -> List[Any]:
+        """
+        Process a batch of inputs, returning one result per input.
+        
+        The default calls ``process`` for each input. Agents backed by a
+        model that supports batched inference should override this to run
+        the whole batch in one forward pass.
+        """
+        return [self.process(item) for item in inputs]
+    
+    def build_input(self, request: Dict[str, Any], upstream: Dict[str, Any]) -> Any:
+        """
+        Build the ``process`` input from a routed request.
+        
+        Args:
+            request: The request passed to ``route_request``
+            upstream: Results of the agents named in ``depends_on``
+        """
+        return request.get("data", "")
+    
+    def update_metrics(self, response_time: float, accuracy: Optional[float] = None):
+        """
+        Record one completed request.
+        
+        Called by the agent's pool worker for every request it serves.
+        
+        Args:
+            response_time: Time from submission to result, in milliseconds
+            accuracy: Latest accuracy estimate, if the agent produces one
+        """
+        self.agent_metrics.record(response_time, accuracy)
+    
+    def record_error(self, count: int = 1):
+        """Record requests that failed inside this agent"""
+        self.agent_metrics.record_error(count)
+    
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """Request count, mean and latency percentiles of this agent instance"""
+        return self.agent_metrics.snapshot()
 
 
 class DocumentAnalyzer(BaseAgent):
@@ -76,8 +117,16 @@ class QueryProcessor(BaseAgent):
     
     def __init__(self):
         super().__init__("QueryProcessor", "query-slm")
+    
+    def build_input(self, request: Dict[str, Any], upstream: Dict[str, Any]) -> Tuple[str, QueryClass]:
+        """Reuse the classification the orchestrator computed for routing"""
+        return request.get("data", ""), classify_request(request)
+    
+    def process_batch(self, inputs: List[Tuple[str, QueryClass]]) -> List[Dict[str, Any]]:
+        """Process a batch of (query, classification) pairs"""
+        return [self.process(query, classification) for query, classification in inputs]
         
-    def process(self, query: str) -> Dict[str, Any]:
+    def process(self, query: str, classification: Optional[QueryClass] = None) -> Dict[str, Any]:
         """
         Process and understand the query intent.
         
@@ -87,25 +136,16 @@ class QueryProcessor(BaseAgent):
         - Identify required data sources
         - Determine optimal retrieval strategy
         """
+        if classification is None:
+            classification = DEFAULT_CLASSIFIER.classify(query)
         return {
-            "query_type": self._classify_query(query),
-            "key_terms": query.split()[:5],  # Mock extraction
+            "query_type": classification.query_type,
+            # The terms the client's BM25 index scores the query by
+            "key_terms": query_terms(query)[:5],
             "required_sources": ["documents", "knowledge_graph"],
             "complexity": "medium",
             "suggested_agents": ["DocumentAnalyzer", "ResponseGenerator"]
         }
-    
-    def _classify_query(self, query: str) -> str:
-        """Classify query type"""
-        query_lower = query.lower()
-        if "what" in query_lower:
-            return "definition"
-        elif "how" in query_lower:
-            return "procedural"
-        elif "why" in query_lower:
-            return "causal"
-        else:
-            return "factual"
 
 
 class ResponseGenerator(BaseAgent):
@@ -115,8 +155,19 @@ class ResponseGenerator(BaseAgent):
     In production, this would use a specialized SLM for response synthesis.
     """
     
+    # Synthesis is steered by the query type and key terms
+    depends_on = ("QueryProcessor",)
+    
     def __init__(self):
         super().__init__("ResponseGenerator", "response-slm")
+    
+    def build_input(self, request: Dict[str, Any], upstream: Dict[str, Any]) -> Dict[str, Any]:
+        """Response synthesis starts from the query, any retrieved context and the query analysis"""
+        return {
+            "query": request.get("data", ""),
+            **request.get("retrieval_results", {}),
+            **upstream
+        }
         
     def process(self, retrieval_results: Dict[str, Any]) -> str:
         """
@@ -128,10 +179,22 @@ class ResponseGenerator(BaseAgent):
         - Format response appropriately
         - Add citations if needed
         """
-        return (
+        return "".join(self.stream(retrieval_results))
+    
+    def stream(self, retrieval_results: Dict[str, Any]) -> Iterator[str]:
+        """
+        Generate the response incrementally, one token at a time.
+        
+        Tokens are produced only as the consumer pulls them, so a slow
+        reader throttles generation instead of output piling up.
+        """
+        response = (
             "Based on the analysis of multiple sources using LlamaIndex retrieval "
             "and specialized SLMs, here is a comprehensive response to your query."
         )
+        words = response.split(" ")
+        for i, word in enumerate(words):
+            yield word if i == len(words) - 1 else word + " "
 
 
 class FactVerifier(BaseAgent):
@@ -141,8 +204,28 @@ class FactVerifier(BaseAgent):
     In production, this would use a specialized SLM for fact checking.
     """
     
+    # A generated response is what gets verified when one is produced
+    depends_on = ("ResponseGenerator",)
+    
     def __init__(self):
         super().__init__("FactVerifier", "verification-slm")
+    
+    def build_input(self, request: Dict[str, Any], upstream: Dict[str, Any]) -> Tuple[str, List[str]]:
+        """
+        Verification needs the statement and the sources to check it against.
+        
+        The statement is the generated response if the ``ResponseGenerator``
+        ran, else the request text; the sources are the ids of the retrieved
+        documents, best first.
+        """
+        statement = upstream.get("ResponseGenerator", request.get("data", ""))
+        hits = request.get("retrieval_results", {}).get("hits", [])
+        sources = list(dict.fromkeys(hit.document_id for hit in hits))
+        return statement, sources
+    
+    def process_batch(self, inputs: List[Tuple[str, List[str]]]) -> List[Dict[str, Any]]:
+        """Verify a batch of (statement, sources) pairs"""
+        return [self.process(statement, sources) for statement, sources in inputs]
         
     def process(self, statement: str, sources: List[str]) -> Dict[str, Any]:
         """
@@ -170,16 +253,47 @@ class AgentOrchestrator:
     This demonstrates the pattern of intelligent agent routing.
     """
     
+    # Agents run for each route of the shared query classifier
+    ROUTES = {
+        "document": ("document_analyzer", "fact_verifier"),
+        "question": ("query_processor", "response_generator"),
+        "query": ("query_processor",),
+    }
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        self.classifier = DEFAULT_CLASSIFIER
         self.agents = {
             "document_analyzer": DocumentAnalyzer(),
             "query_processor": QueryProcessor(),
             "response_generator": ResponseGenerator(),
             "fact_verifier": FactVerifier()
         }
+        self.pools = self._init_pools()
+    
+    def _init_pools(self) -> Dict[str, AgentPool]:
+        """Build a bounded worker pool with micro-batching for each agent"""
+        pool_size = max(1, self.config.get("agent_pool_size", 1))
+        slm_config = self.config.get("slm_config", {})
+        pools = {}
+        for agent in self.agents.values():
+            replicas = [agent] + [type(agent)() for _ in range(pool_size - 1)]
+            pools[agent.name] = AgentPool(
+                replicas,
+                batch_size=slm_config.get("batch_size", 1),
+                max_wait_ms=slm_config.get("max_batch_wait_ms", 2.0),
+                max_queue_size=self.config.get("agent_queue_size", 256),
+                timeout=self.config.get("timeout"),
+                balancing=self.config.get("agent_balancing", "shared")
+            )
+        return pools
+    
+    def _call_agent(self, agent: BaseAgent, data: Any) -> Any:
+        """Run ``data`` on a worker from ``agent``'s pool"""
+        return self.pools[agent.name].process(data)
         
-    def select_agents(self, task: str) -> List[BaseAgent]:
+    def select_agents(self, task: str,
+                      classification: Optional[QueryClass] = None) -> List[BaseAgent]:
         """
         Select appropriate agents for the task.
         
@@ -188,43 +302,227 @@ class AgentOrchestrator:
         - Agent capability matching
         - Load balancing
         - Performance optimization
+        
+        This picks agent types only. Which replica of each agent serves the
+        request is decided per request by its ``AgentPool``, from live
+        queue depth and recent p95 latency (``agent_balancing`` config).
+        
+        Args:
+            task: Request text
+            classification: Result of ``self.classifier`` for ``task``, if
+                already computed
         """
-        # Mock agent selection logic
-        if "document" in task.lower():
-            return [self.agents["document_analyzer"], self.agents["fact_verifier"]]
-        elif "?" in task:  # It's a question
-            return [self.agents["query_processor"], self.agents["response_generator"]]
-        else:
-            return [self.agents["query_processor"]]
+        if classification is None:
+            classification = self.classifier.classify(task)
+        return [self.agents[key] for key in self.ROUTES[classification.route]]
     
     def route_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """
         Route request to appropriate agents.
         
+        In the default ``"dag"`` execution mode, agents whose
+        ``depends_on`` are satisfied are submitted to their pools together,
+        so end-to-end latency follows the critical path of the dependency
+        graph rather than the sum of all agent latencies. ``"sequential"``
+        mode runs the selected agents one after another.
+        
         This demonstrates the routing pattern without revealing
         the proprietary optimization algorithms.
         """
-        task_type = request.get("type", "query")
-        selected_agents = self.select_agents(task_type)
-        
-        results = {}
-        for agent in selected_agents:
-            result = agent.process(request.get("data", ""))
-            results[agent.name] = result
+        start_time = time.perf_counter()
+        mode = self.config.get("execution_mode", "dag")
+        with span("route_request", mode=mode):
+            selected_agents = self._select_traced(request)
+            if mode == "sequential":
+                results = self._execute_sequential(selected_agents, request)
+            else:
+                results = self._execute_dag(selected_agents, request)
             
         return {
             "results": results,
             "agents_used": [a.name for a in selected_agents],
-            "routing_time_ms": random.randint(5, 15)
+            "classification": request["classification"],
+            "routing_time_ms": round((time.perf_counter() - start_time) * 1000, 3)
+        }
+    
+    async def route_request_async(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Asyncio variant of ``route_request`` (always uses DAG execution).
+        
+        Waits on agent pool futures without blocking the event loop.
+        """
+        start_time = time.perf_counter()
+        with span("route_request", mode="dag"):
+            selected_agents = self._select_traced(request)
+            results = await self._execute_dag_async(selected_agents, request)
+        
+        return {
+            "results": results,
+            "agents_used": [a.name for a in selected_agents],
+            "classification": request["classification"],
+            "routing_time_ms": round((time.perf_counter() - start_time) * 1000, 3)
         }
     
+    def _select_traced(self, request: Dict[str, Any]) -> List[BaseAgent]:
+        with span("select_agents") as current:
+            classification = classify_request(request, self.classifier)
+            selected = self.select_agents(request.get("type", "query"), classification)
+            if current is not None:
+                current.set_attribute("agents", [agent.name for agent in selected])
+        return selected
+    
+    def stream_request(self, request: Dict[str, Any]) -> Tuple[List[str], Iterator[str]]:
+        """
+        Run the agents a streamed response depends on, then stream it.
+        
+        Every selected agent except the ``ResponseGenerator`` runs through
+        the normal DAG; the generator's output is returned as a lazy token
+        iterator rather than a finished string.
+        
+        Returns:
+            (names of agents used, token iterator)
+        """
+        agents, generator = self._streaming_plan(request)
+        results = self._execute_dag(agents, request)
+        return self._stream_from(agents, generator, request, results)
+    
+    async def stream_request_async(self, request: Dict[str, Any]) -> Tuple[List[str], Iterator[str]]:
+        """Asyncio variant of ``stream_request``"""
+        agents, generator = self._streaming_plan(request)
+        results = await self._execute_dag_async(agents, request)
+        return self._stream_from(agents, generator, request, results)
+    
+    def _streaming_plan(self, request: Dict[str, Any]) -> Tuple[List[BaseAgent], "ResponseGenerator"]:
+        generator = self.agents["response_generator"]
+        selected = self._select_traced(request)
+        return [agent for agent in selected if agent is not generator], generator
+    
+    def _stream_from(self, agents: List[BaseAgent], generator: "ResponseGenerator",
+                     request: Dict[str, Any], results: Dict[str, Any]) -> Tuple[List[str], Iterator[str]]:
+        upstream = {name: results[name] for name in generator.depends_on if name in results}
+        tokens = generator.stream(generator.build_input(request, upstream))
+        return [agent.name for agent in agents] + [generator.name], tokens
+    
+    async def _execute_dag_async(self, agents: List[BaseAgent],
+                                 request: Dict[str, Any]) -> Dict[str, Any]:
+        graph = _AgentGraph(agents)
+        deadline = self._deadline()
+        
+        pending: Dict[asyncio.Future, str] = {}
+        try:
+            while True:
+                self._launch_ready(graph, request, pending, wrap=asyncio.wrap_future)
+                if not pending:
+                    break
+                timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise TimeoutError(f"Agents {sorted(pending.values())} timed out")
+                for future in done:
+                    graph.results[pending.pop(future)] = future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+        
+        return graph.ordered_results()
+    
+    def _deadline(self) -> Optional[float]:
+        timeout = self.config.get("timeout")
+        return None if timeout is None else time.perf_counter() + timeout
+    
+    def _execute_sequential(self, agents: List[BaseAgent],
+                            request: Dict[str, Any]) -> Dict[str, Any]:
+        results = {}
+        for agent in agents:
+            upstream = {name: results[name] for name in agent.depends_on if name in results}
+            results[agent.name] = self._call_agent(agent, agent.build_input(request, upstream))
+        return results
+    
+    def _execute_dag(self, agents: List[BaseAgent],
+                     request: Dict[str, Any]) -> Dict[str, Any]:
+        graph = _AgentGraph(agents)
+        deadline = self._deadline()
+        
+        pending: Dict[Future, str] = {}
+        try:
+            while True:
+                self._launch_ready(graph, request, pending)
+                if not pending:
+                    break
+                timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    raise TimeoutError(f"Agents {sorted(pending.values())} timed out")
+                for future in done:
+                    graph.results[pending.pop(future)] = future.result()
+        finally:
+            # On error or timeout, drop work that has not started yet
+            for future in pending:
+                future.cancel()
+        
+        return graph.ordered_results()
+    
+    def _launch_ready(self, graph: "_AgentGraph", request: Dict[str, Any],
+                      pending: Dict[Any, str], wrap=lambda future: future):
+        """Submit every agent whose dependencies have completed into ``pending``"""
+        ready = graph.pop_ready()
+        if not ready and graph.waiting and not graph.running():
+            raise AgentError(f"Circular agent dependencies: {sorted(graph.waiting)}")
+        for agent in ready:
+            upstream = {name: graph.results[name] for name in graph.deps[agent.name]}
+            future = self.pools[agent.name].submit(agent.build_input(request, upstream))
+            graph.launched.add(agent.name)
+            pending[wrap(future)] = agent.name
+    
     def get_status(self) -> Dict[str, Any]:
         """Get status of all agents"""
-        return {
-            agent_name: {
-                "status": "active",
-                "metrics": agent.metrics,
-                "model_type": agent.model_type
+        status = {}
+        for agent_name, agent in self.agents.items():
+            pool = self.pools[agent.name]
+            status[agent_name] = {
+                "status": pool.state,
+                "queue_depth": pool.queue_depth,
+                "utilization": pool.utilization,
+                "metrics": pool.agent_metrics(),
+                "model_type": agent.model_type,
+                "pool": pool.stats()
             }
-            for agent_name, agent in self.agents.items()
-        }
\ No newline at end of file
+        return status
+    
+    def close(self):
+        """Stop all agent worker threads"""
+        for pool in self.pools.values():
+            pool.close()
+
+
+class _AgentGraph:
+    """Dependency bookkeeping for one DAG execution of ``route_request``"""
+    
+    def __init__(self, agents: List[BaseAgent]):
+        self.agents = agents
+        selected = {agent.name for agent in agents}
+        # Dependencies on agents that were not selected are ignored
+        self.deps = {
+            agent.name: [name for name in agent.depends_on if name in selected]
+            for agent in agents
+        }
+        self.waiting = {agent.name: agent for agent in agents}
+        self.launched = set()
+        self.results: Dict[str, Any] = {}
+    
+    def pop_ready(self) -> List[BaseAgent]:
+        ready = [
+            agent for name, agent in self.waiting.items()
+            if all(dep in self.results for dep in self.deps[name])
+        ]
+        for agent in ready:
+            del self.waiting[agent.name]
+        return ready
+    
+    def running(self) -> bool:
+        return len(self.launched) > len(self.results)
+    
+    def ordered_results(self) -> Dict[str, Any]:
+        return {agent.name: self.results[agent.name] for agent in self.agents}
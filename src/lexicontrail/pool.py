@@ -0,0 +1,160 @@
+"""
+Bounded worker pools for agents
+"""
+
+import queue
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple
+
+from .balancing import LoadBalancer
+from .batching import MicroBatcher
+from .exceptions import ConfigurationError, RateLimitError, TimeoutError
+
+
+class AgentPool(MicroBatcher):
+    """
+    Pool of agent replicas behind a bounded admission queue.
+
+    Each replica is served by its own worker thread. With the ``"shared"``
+    balancing policy every worker pulls micro-batches from one queue;
+    otherwise each replica has its own queue and a ``LoadBalancer`` places
+    every request on the replica with the least expected completion time,
+    so a slow or overloaded replica receives less work. When the pool
+    holds ``max_queue_size`` queued requests new ones are rejected with
+    ``RateLimitError`` instead of piling up, and callers waiting longer
+    than ``timeout`` get ``TimeoutError``.
+    """
+
+    def __init__(self,
+                 replicas: List[Any],
+                 batch_size: int = 1,
+                 max_wait_ms: float = 2.0,
+                 max_queue_size: int = 256,
+                 timeout: Optional[float] = None,
+                 balancing: str = "shared"):
+        """
+        Initialize the pool.
+
+        Args:
+            replicas: Agent instances, one per worker
+            batch_size: Maximum number of requests per batch
+            max_wait_ms: Maximum time the oldest request waits for a batch to fill
+            max_queue_size: Maximum number of queued requests before rejecting
+            timeout: Default seconds a caller waits for its result
+            balancing: ``"shared"``, ``"p2c"`` or ``"least_outstanding"``
+        """
+        if not replicas:
+            raise ConfigurationError("An agent pool needs at least one replica")
+        super().__init__(replicas[0], batch_size=batch_size, max_wait_ms=max_wait_ms)
+        self.replicas = list(replicas)
+        self.max_queue_size = max_queue_size
+        self.timeout = timeout
+        self.balancing = balancing
+        self.rejected = 0
+        self.timed_out = 0
+        if balancing == "shared":
+            self.balancer = None
+            self._queue = queue.Queue(maxsize=max_queue_size)
+        else:
+            self.balancer = LoadBalancer(len(self.replicas), balancing)
+            self._queues = [queue.Queue() for _ in self.replicas]
+            self._replica_index = {id(replica): i for i, replica in enumerate(self.replicas)}
+
+    def _enqueue(self, entry: Tuple):
+        if self.balancer is None:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                self._reject()
+            return
+        # Admission is bounded by the total queued across replicas; the
+        # sum may be momentarily stale, which only shifts the bound slightly
+        if self.queue_depth >= self.max_queue_size:
+            self._reject()
+        self._queues[self.balancer.acquire()].put(entry)
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+        raise RateLimitError(
+            f"{self.agent.name} queue is full ({self.max_queue_size} pending requests)",
+            retry_after=self.max_wait or 0.01
+        ) from None
+
+    def _queue_for(self, agent) -> "queue.Queue":
+        if self.balancer is None:
+            return self._queue
+        return self._queues[self._replica_index[id(agent)]]
+
+    def _dispatch(self, agent, batch: List[Tuple]):
+        if self.balancer is None:
+            super()._dispatch(agent, batch)
+            return
+        start = time.perf_counter()
+        try:
+            super()._dispatch(agent, batch)
+        finally:
+            self.balancer.release(self._replica_index[id(agent)], len(batch),
+                                  (time.perf_counter() - start) * 1000)
+
+    def process(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Run ``item`` on a pool worker and wait for its result.
+
+        Raises:
+            RateLimitError: If the admission queue is full
+            TimeoutError: If no result arrives within ``timeout`` seconds
+        """
+        timeout = self.timeout if timeout is None else timeout
+        future: Future = self.submit(item)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # Drop the request if it has not started yet
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise TimeoutError(
+                f"{self.agent.name} did not respond within {timeout}s"
+            ) from None
+
+    @property
+    def queue_depth(self) -> int:
+        if self.balancer is None:
+            return self._queue.qsize()
+        return sum(q.qsize() for q in self._queues)
+
+    @property
+    def workers(self) -> int:
+        return len(self.replicas)
+
+    @property
+    def utilization(self) -> float:
+        """Fraction of workers currently processing a batch"""
+        return self._busy / self.workers
+
+    @property
+    def state(self) -> str:
+        if self.queue_depth >= self.max_queue_size:
+            return "saturated"
+        if self._busy:
+            return "busy"
+        return "idle"
+
+    def stats(self) -> Dict[str, Any]:
+        """Return live pool load plus batching histograms"""
+        stats = super().stats()
+        stats.update({
+            "workers": self.workers,
+            "busy_workers": self._busy,
+            "utilization": self.utilization,
+            "max_queue_size": self.max_queue_size,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "balancing": self.balancing,
+        })
+        if self.balancer is not None:
+            stats["replicas"] = self.balancer.snapshot()
+        return stats
@@ -0,0 +1,382 @@
+"""
+Vectorized top-k retrieval over the vector store
+"""
+
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .exceptions import ConfigurationError
+
+# Rows scored per matrix product; bounds temporary memory for large corpora
+DEFAULT_BLOCK_ROWS = 65536
+
+# New rows a query assigns to IVF lists itself; larger backlogs are
+# assigned in the background while queries use exact search
+IVF_INLINE_ADD_ROWS = DEFAULT_BLOCK_ROWS
+
+
+class SearchHit(NamedTuple):
+    """A single retrieved chunk"""
+    node_id: str
+    document_id: str
+    score: float
+    # [start, end) bytes of the chunk in its source file, if ingested from one
+    byte_range: Optional[Tuple[int, int]] = None
+
+
+def _merge_top_k(scores: np.ndarray, indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep the ``k`` best columns of each row of ``scores`` (unordered)"""
+    if scores.shape[1] <= k:
+        return scores, indices
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, part, axis=1), np.take_along_axis(indices, part, axis=1)
+
+
+def _sort_top_k(scores: np.ndarray, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+
+def exact_top_k(queries: np.ndarray,
+                corpus: np.ndarray,
+                k: int,
+                block_rows: int = DEFAULT_BLOCK_ROWS,
+                live_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact batched top-k by inner product.
+
+    The corpus is scored in blocks of ``block_rows`` with one matrix
+    product per block, and a running top-k is kept with ``argpartition``,
+    so memory stays bounded for memory-mapped corpora of any size. With
+    L2-normalized vectors the scores are cosine similarities.
+
+    Args:
+        queries: ``(m, dim)`` query matrix
+        corpus: ``(n, dim)`` corpus matrix (may be a memmap)
+        k: Number of results per query
+        block_rows: Corpus rows scored per matrix product
+        live_mask: Optional boolean mask; rows where it is False are skipped
+
+    Returns:
+        ``(scores, indices)``, each ``(m, min(k, n))``, best first; skipped
+        rows can only appear with a ``-inf`` score
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    m = queries.shape[0]
+    best_scores = np.empty((m, 0), dtype=np.float32)
+    best_indices = np.empty((m, 0), dtype=np.int64)
+    if k <= 0:
+        return best_scores, best_indices
+
+    for start in range(0, len(corpus), block_rows):
+        block = np.asarray(corpus[start:start + block_rows], dtype=np.float32)
+        scores = queries @ block.T
+        if live_mask is not None:
+            scores[:, ~live_mask[start:start + len(block)]] = -np.inf
+        indices = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+        best_scores, best_indices = _merge_top_k(
+            np.concatenate([best_scores, scores], axis=1),
+            np.concatenate([best_indices, indices], axis=1),
+            k
+        )
+    return _sort_top_k(best_scores, best_indices)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[SearchHit]], k: int = 60,
+                           limit: Optional[int] = None) -> List[SearchHit]:
+    """
+    Merge ranked hit lists, e.g. dense and BM25 results, by reciprocal rank.
+
+    A chunk scores ``sum(1 / (k + rank))`` over the lists it appears in,
+    with ranks starting at 1. Only ranks count, so scores on different
+    scales (cosine similarity, BM25) need no normalization, and a chunk
+    ranked well by both lists beats one ranked first by only one.
+
+    Args:
+        rankings: Hit lists, each best first
+        k: Damping constant; larger values flatten the rank weights
+        limit: Number of fused hits to return (all if None)
+
+    Returns:
+        Hits ordered by fused score, which replaces their original score
+    """
+    fused: Dict[str, float] = {}
+    first: Dict[str, SearchHit] = {}
+    for hits in rankings:
+        for rank, hit in enumerate(hits, 1):
+            fused[hit.node_id] = fused.get(hit.node_id, 0.0) + 1.0 / (k + rank)
+            first.setdefault(hit.node_id, hit)
+    # Stable sort: ties keep the order of the earlier list
+    ranked = sorted(fused, key=fused.__getitem__, reverse=True)
+    return [first[node_id]._replace(score=fused[node_id]) for node_id in ranked[:limit]]
+
+
+class IVFIndex:
+    """
+    Inverted-file index over a coarse spherical k-means quantizer.
+
+    Vectors are bucketed by their nearest of ``nlist`` centroids. A search
+    scores only the vectors in the ``nprobe`` buckets closest to the query,
+    trading recall for latency on corpora too large for exact search.
+    """
+
+    def __init__(self, centroids: np.ndarray):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.lists: List[np.ndarray] = [
+            np.empty(0, dtype=np.int64) for _ in range(len(self.centroids))
+        ]
+        self.ntotal = 0
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def copy(self) -> "IVFIndex":
+        """Index sharing this one's centroids and list arrays; ``add`` on it leaves this one intact"""
+        index = IVFIndex(self.centroids)
+        index.lists = list(self.lists)
+        index.ntotal = self.ntotal
+        return index
+
+    @classmethod
+    def train(cls,
+              vectors: np.ndarray,
+              nlist: int,
+              n_iter: int = 10,
+              sample_size: Optional[int] = None,
+              seed: int = 0) -> "IVFIndex":
+        """
+        Train centroids with spherical k-means on a sample of ``vectors``.
+
+        Args:
+            vectors: ``(n, dim)`` training vectors (may be a memmap)
+            nlist: Number of coarse clusters
+            n_iter: k-means iterations
+            sample_size: Training sample size (defaults to ``64 * nlist``)
+            seed: Random seed for sampling and initialization
+        """
+        n = len(vectors)
+        if n == 0:
+            raise ConfigurationError("Cannot train an IVF index on an empty corpus")
+        nlist = max(1, min(nlist, n))
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, sample_size or 64 * nlist)
+        rows = np.sort(rng.choice(n, size=sample_size, replace=False))
+        sample = np.asarray(vectors[rows], dtype=np.float32)
+
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(n_iter):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            counts = np.bincount(assign, minlength=nlist)
+            nonempty = np.flatnonzero(counts)
+            order = np.argsort(assign, kind="stable")
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[nonempty]
+            sums = np.zeros_like(centroids)
+            sums[nonempty] = np.add.reduceat(sample[order], starts, axis=0)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty clusters from random sample points
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+        return cls(centroids)
+
+    def add(self, vectors: np.ndarray, start: int = 0, block_rows: int = DEFAULT_BLOCK_ROWS):
+        """Assign rows ``start..start+len(vectors)`` to their nearest centroid"""
+        for offset in range(0, len(vectors), block_rows):
+            block = np.asarray(vectors[offset:offset + block_rows], dtype=np.float32)
+            assign = np.argmax(block @ self.centroids.T, axis=1)
+            rows = np.arange(start + offset, start + offset + len(block), dtype=np.int64)
+            order = np.argsort(assign, kind="stable")
+            bounds = np.searchsorted(assign[order], np.arange(self.nlist + 1))
+            for list_id in np.flatnonzero(np.diff(bounds)):
+                new_rows = rows[order[bounds[list_id]:bounds[list_id + 1]]]
+                self.lists[list_id] = np.concatenate([self.lists[list_id], new_rows])
+        self.ntotal += len(vectors)
+
+    def search(self,
+               queries: np.ndarray,
+               corpus: np.ndarray,
+               k: int,
+               nprobe: int = 8,
+               live_mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k over the ``nprobe`` closest inverted lists.
+
+        Rows where ``live_mask`` is False are skipped.
+
+        Returns:
+            ``(scores, indices)``, each ``(m, k)``; missing results are
+            padded with ``-inf`` scores and ``-1`` indices
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        nprobe = max(1, min(nprobe, self.nlist))
+        probes = np.argpartition(-(queries @ self.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+        out_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        out_indices = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, query in enumerate(queries):
+            candidates = np.concatenate([self.lists[list_id] for list_id in probes[row]])
+            if self.ntotal > len(corpus):
+                # Built from a newer snapshot than the caller's
+                candidates = candidates[candidates < len(corpus)]
+            if live_mask is not None:
+                candidates = candidates[live_mask[candidates]]
+            if not len(candidates):
+                continue
+            candidates.sort()  # sequential access on memory-mapped corpora
+            scores = np.asarray(corpus[candidates], dtype=np.float32) @ query
+            top = min(k, len(candidates))
+            part = np.argpartition(-scores, top - 1)[:top]
+            order = part[np.argsort(-scores[part], kind="stable")]
+            out_scores[row, :top] = scores[order]
+            out_indices[row, :top] = candidates[order]
+        return out_scores, out_indices
+
+
+class Retriever:
+    """
+    Top-k retrieval over an ``MmapVectorStore``.
+
+    ``mode`` selects exact search, IVF search, or ``"auto"`` which switches
+    to IVF once the store holds at least ``ivf_threshold`` vectors. The IVF
+    index is trained on a background thread the first time it is needed,
+    and again after the store is compacted; queries use exact search until
+    it is ready. ``train`` builds it in the calling thread instead, e.g. on
+    a compaction thread. Rows appended to the store afterwards are assigned
+    to existing lists without retraining. Tombstoned rows are skipped.
+
+    A published ``IVFIndex`` is never modified: new rows are added to a
+    copy that then replaces it, so searches need no lock.
+    """
+
+    MODES = ("exact", "ivf", "auto")
+
+    def __init__(self,
+                 vector_store,
+                 embedder,
+                 mode: str = "auto",
+                 nprobe: int = 8,
+                 nlist: Optional[int] = None,
+                 ivf_threshold: int = 2_000_000):
+        """
+        Initialize the retriever.
+
+        Args:
+            vector_store: Store holding the corpus embeddings
+            embedder: Embedder used for text queries
+            mode: ``"exact"``, ``"ivf"`` or ``"auto"``
+            nprobe: Default number of inverted lists probed per IVF query
+            nlist: Number of IVF lists (defaults to ``4 * sqrt(n)``)
+            ivf_threshold: Corpus size at which ``"auto"`` switches to IVF
+        """
+        if mode not in self.MODES:
+            raise ConfigurationError(f"Unknown retrieval mode: {mode}")
+        self.vector_store = vector_store
+        self.embedder = embedder
+        self.mode = mode
+        self.nprobe = nprobe
+        self.nlist = nlist
+        self.ivf_threshold = ivf_threshold
+        self._ivf: Optional[IVFIndex] = None
+        self._ivf_generation = -1
+        self._lock = threading.Lock()
+        self._train_lock = threading.Lock()
+        self._trainer: Optional[threading.Thread] = None
+
+    def uses_ivf(self, corpus_size: int) -> bool:
+        return self.mode == "ivf" or (self.mode == "auto" and corpus_size >= self.ivf_threshold)
+
+    def search(self,
+               queries: Union[str, Sequence[str], np.ndarray],
+               k: int = 5,
+               nprobe: Optional[int] = None) -> List[List[SearchHit]]:
+        """
+        Retrieve the top ``k`` chunks for each query.
+
+        Args:
+            queries: A query string, a list of strings, or a query matrix
+            k: Number of results per query
+            nprobe: Override the IVF probe count for this call
+
+        Returns:
+            One list of hits per query, best first
+        """
+        if isinstance(queries, str):
+            queries = [queries]
+        if not isinstance(queries, np.ndarray):
+            queries = np.stack([self.embedder.embed_query(text) for text in queries])
+
+        snapshot = self.vector_store.snapshot()
+        corpus = snapshot.vectors
+        ivf = None
+        if self.uses_ivf(len(corpus)) and len(corpus):
+            ivf = self._ivf_index(snapshot)
+        if ivf is not None:
+            scores, indices = ivf.search(
+                queries, corpus, k, nprobe=nprobe or self.nprobe, live_mask=snapshot.live_mask
+            )
+        else:
+            scores, indices = exact_top_k(queries, corpus, k, live_mask=snapshot.live_mask)
+        return self._to_hits(scores, indices, snapshot)
+
+    def train(self) -> bool:
+        """
+        Bring the IVF index up to date with the store in the calling thread.
+
+        Trains it if missing or built before the last compaction, then
+        assigns rows added since.
+
+        Returns:
+            False if the store is empty or IVF is not in use for its size
+        """
+        with self._train_lock:
+            snapshot = self.vector_store.snapshot()
+            corpus = snapshot.vectors
+            if not len(corpus) or not self.uses_ivf(len(corpus)):
+                return False
+            with self._lock:
+                ivf, generation = self._ivf, self._ivf_generation
+            if ivf is None or generation != snapshot.generation:
+                nlist = self.nlist or max(1, int(4 * np.sqrt(len(corpus))))
+                ivf = IVFIndex.train(corpus, nlist)
+            else:
+                ivf = ivf.copy()
+            if ivf.ntotal < len(corpus):
+                ivf.add(corpus[ivf.ntotal:], start=ivf.ntotal)
+            with self._lock:
+                self._ivf, self._ivf_generation = ivf, snapshot.generation
+        return True
+
+    def _ivf_index(self, snapshot) -> Optional[IVFIndex]:
+        """IVF index covering ``snapshot``, or None while one is built in the background"""
+        corpus = snapshot.vectors
+        with self._lock:
+            ivf = self._ivf
+            if ivf is not None and self._ivf_generation == snapshot.generation:
+                missing = len(corpus) - ivf.ntotal
+                if missing <= 0:
+                    return ivf
+                if missing <= IVF_INLINE_ADD_ROWS:
+                    ivf = ivf.copy()
+                    ivf.add(corpus[ivf.ntotal:], start=ivf.ntotal)
+                    self._ivf = ivf
+                    return ivf
+            if self._trainer is None or not self._trainer.is_alive():
+                self._trainer = threading.Thread(target=self.train, name="ivf-training", daemon=True)
+                self._trainer.start()
+        return None
+
+    def _to_hits(self, scores: np.ndarray, indices: np.ndarray,
+                 snapshot) -> List[List[SearchHit]]:
+        chunks = snapshot.chunks
+        return [
+            [
+                SearchHit(chunks.node_id(index), chunks.doc_id(index), float(score), chunks.span(index))
+                for score, index in zip(row_scores, row_indices)
+                if index >= 0 and np.isfinite(score)
+            ]
+            for row_scores, row_indices in zip(scores, indices)
+        ]
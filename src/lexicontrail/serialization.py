@@ -0,0 +1,95 @@
+"""
+Compact representation and binary encoding of result dataclasses
+"""
+
+import marshal
+from dataclasses import fields
+from typing import Any, Generic, Optional, Type, TypeVar
+
+T = TypeVar("T")
+
+# First byte of every payload: format of the rest. Entries pickled by
+# earlier versions (b"p") are no longer read.
+_MARSHAL = b"m"
+
+_SCALARS = (str, bytes, int, float, complex, bool, type(None))
+
+
+class FrozenRecord:
+    """
+    Base of frozen dataclasses that declare ``__slots__``.
+
+    Slots drop the per-instance ``__dict__``, but pickle restores slotted
+    state with ``setattr``, which frozen dataclasses refuse; records are
+    therefore rebuilt through their constructor, which also reapplies any
+    normalization done in ``__post_init__``.
+    """
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return type(self), tuple(getattr(self, field.name) for field in fields(self))
+
+
+class DataclassCodec(Generic[T]):
+    """
+    Binary codec for a flat dataclass such as ``QueryResponse``.
+
+    Field values are written positionally with ``marshal``, which is several
+    times smaller and faster than JSON for the builtin types responses hold
+    and keeps tuples and non-string dict keys intact. Decoding only ever
+    builds builtin values, so a shared cache file cannot be used to run
+    code the way a pickle could. Values are coerced to builtins first
+    (named tuples to tuples, numpy values to Python numbers and lists); a
+    record holding anything else is uncacheable. Payloads carry the
+    marshal version and field count, and ones written by an incompatible
+    interpreter or an older class layout decode to None so callers can
+    treat them as cache misses.
+    """
+
+    def __init__(self, cls: Type[T]):
+        self.cls = cls
+        self.field_names = tuple(field.name for field in fields(cls))
+        self._header = bytes([marshal.version, len(self.field_names)])
+
+    def dumps(self, value: T) -> Optional[bytes]:
+        """Encode ``value`` to bytes, or return None if it cannot be encoded"""
+        row = tuple(getattr(value, name) for name in self.field_names)
+        try:
+            # Coerced first: marshal would silently write numpy values, and
+            # anything else exposing a buffer, as raw bytes
+            body = marshal.dumps(_to_builtin(row))
+        except ValueError:
+            return None
+        return _MARSHAL + self._header + body
+
+    def loads(self, data: bytes) -> Any:
+        """Decode bytes produced by ``dumps``; returns None if unreadable"""
+        fmt, header, body = data[:1], data[1:3], data[3:]
+        if fmt != _MARSHAL or header != self._header:
+            return None
+        try:
+            row = marshal.loads(body)
+        except (EOFError, ValueError, TypeError):
+            return None
+        return self.cls(*row)
+
+
+def _to_builtin(value: Any) -> Any:
+    """``value`` rebuilt from builtin types only; raises ValueError if impossible"""
+    if isinstance(value, _SCALARS):
+        return value
+    if isinstance(value, dict):
+        return {_to_builtin(key): _to_builtin(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_to_builtin(item) for item in value]
+    if isinstance(value, tuple):
+        # Named tuples become plain tuples
+        return tuple(_to_builtin(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_to_builtin(item) for item in value)
+    tolist = getattr(value, "tolist", None)
+    if tolist is not None:
+        # numpy scalars and arrays
+        return _to_builtin(tolist())
+    raise ValueError(f"Cannot encode {type(value).__name__} without pickle")
@@ -0,0 +1,364 @@
+"""
+BM25 keyword retrieval over a compressed in-memory inverted index
+"""
+
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .retrieval import SearchHit
+from .vector_store import ChunkTable, MmapVectorStore, TextCursor
+
+# Store rows read and tokenized per step of ``InvertedIndex.sync``
+SYNC_BATCH_ROWS = 4096
+
+# Words joined by "-", "." or "/" stay one term, so abbreviations such as
+# "u.s.c" and dates such as "2019-04-01" are matched as written
+_TOKEN_RE = re.compile(r"\w+(?:[-./]\w+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with what which who how why when where does do".split()
+)
+
+
+def analyze(text: str) -> List[str]:
+    """Lower-cased index terms of ``text`` in order, stopwords removed"""
+    return [term for term in _TOKEN_RE.findall(text.lower()) if term not in STOPWORDS]
+
+
+def query_terms(text: str) -> List[str]:
+    """Distinct index terms of a query, in order of first occurrence"""
+    return list(dict.fromkeys(analyze(text)))
+
+
+def _put_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_postings(data: bytes, count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Entry numbers and term frequencies of a posting list of ``count`` pairs"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if len(raw) == 2 * count:
+        # Every gap and frequency fit in one byte, as for common terms
+        values = raw.astype(np.int64)
+    else:
+        ends = np.flatnonzero(raw < 0x80)
+        starts = np.empty_like(ends)
+        starts[0] = 0
+        starts[1:] = ends[:-1] + 1
+        # Bit offset of every byte within its varint
+        shifts = 7 * (np.arange(len(raw)) - np.repeat(starts, ends - starts + 1))
+        values = np.add.reduceat((raw & 0x7F).astype(np.int64) << shifts, starts)
+    return np.cumsum(values[0::2]), values[1::2]
+
+
+class InvertedIndex:
+    """
+    Term postings of indexed chunks, scored with Okapi BM25.
+
+    Each term's posting list is one byte string of varint pairs: the gap
+    to the previous entry holding the term, then the term's frequency in
+    that entry. Entries are only appended, so gaps are small and most
+    pairs take two bytes. A query decodes just the lists of its own terms,
+    vectorized with numpy, so its cost follows how common its terms are
+    rather than the corpus size.
+
+    Deleting a document tombstones its entries. As in Lucene, document
+    frequencies keep counting tombstoned entries until ``compact`` drops
+    them, which slightly lowers the weight of terms they contained.
+    Chunk metadata is kept in a ``ChunkTable`` like the vector store's, so
+    hits carry the same node ids, document ids and byte ranges.
+
+    An index can mirror a vector store with ``sync``, which reads back the
+    chunk texts the store keeps; entry numbers then equal store rows. That
+    covers rows written by other processes and rows from before a restart.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Initialize an empty index.
+
+        Args:
+            k1: Term frequency saturation
+            b: Strength of document length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._cursor: Optional[TextCursor] = None
+        self._reset()
+
+    def __len__(self) -> int:
+        """Number of live entries"""
+        return len(self.chunks) - len(self._deleted)
+
+    @property
+    def dead_ratio(self) -> float:
+        """Fraction of entries that are tombstoned"""
+        total = len(self.chunks)
+        return len(self._deleted) / total if total else 0.0
+
+    def add(self, doc_id: str, ids: Sequence[str], texts: Sequence[str],
+            spans: Optional[Sequence[Tuple[int, int]]] = None):
+        """
+        Index chunks of a document.
+
+        Args:
+            doc_id: Owning document id
+            ids: Node id of each chunk, as stored in the vector store
+            texts: Chunk texts
+            spans: Optional ``(start, end)`` source byte range of each chunk
+        """
+        if spans is None:
+            spans = [None] * len(ids)
+        if not (len(ids) == len(texts) == len(spans)):
+            raise ValueError("ids, texts and spans must have the same length")
+        # Tokenize outside the lock; only the appends are serialized
+        counts = [Counter(analyze(text)) for text in texts]
+        with self._lock:
+            for node_id, terms, span in zip(ids, counts, spans):
+                self._append(node_id, doc_id, terms, span)
+
+    def replace_document(self, doc_id: str, ids: Sequence[str], texts: Sequence[str]) -> int:
+        """
+        Replace all entries of ``doc_id``; searches see the old or the new ones.
+
+        Returns:
+            Number of entries tombstoned
+        """
+        counts = [Counter(analyze(text)) for text in texts]
+        with self._lock:
+            old = self._live_entries_of(doc_id)
+            for node_id, terms in zip(ids, counts):
+                self._append(node_id, doc_id, terms, None)
+            self._tombstone(old)
+        return len(old)
+
+    def delete_document(self, doc_id: str, keep_last: int = 0) -> int:
+        """
+        Tombstone the entries of ``doc_id``.
+
+        Args:
+            doc_id: Document to delete
+            keep_last: Number of the document's most recently added entries
+                to keep, as in ``MmapVectorStore.delete_document``
+
+        Returns:
+            Number of entries deleted
+        """
+        with self._lock:
+            entries = self._live_entries_of(doc_id)
+            entries = entries[:max(0, len(entries) - keep_last)]
+            self._tombstone(entries)
+        return len(entries)
+
+    @property
+    def generation(self) -> Optional[int]:
+        """Generation of the store this index mirrors, None before ``sync``"""
+        cursor = self._cursor
+        return cursor.generation if cursor is not None else None
+
+    def sync(self, store: MmapVectorStore) -> bool:
+        """
+        Index the rows ``store`` gained since the last call and tombstone
+        the rows it deleted since.
+
+        Returns:
+            False if ``store`` was compacted after this index started
+            mirroring it; row numbers changed, so nothing more can be
+            applied and a fresh index must be synced instead
+        """
+        with self._sync_lock:
+            snapshot = store.snapshot()
+            cursor = self._cursor
+            if cursor is None:
+                if len(self.chunks):
+                    raise ValueError("Only an empty index can mirror a vector store")
+                cursor = self._cursor = TextCursor(snapshot.generation, 0, 0)
+            elif cursor.generation != snapshot.generation:
+                return False
+            chunks, end = snapshot.chunks, len(snapshot.vectors)
+            while cursor.row < end:
+                start = cursor.row
+                texts, cursor = store.read_texts(cursor, end_row=min(end, start + SYNC_BATCH_ROWS))
+                if cursor.row == start:
+                    # Compacted since the snapshot was taken
+                    return False
+                counts = [Counter(analyze(text)) if text else Counter() for text in texts]
+                with self._lock:
+                    for row, terms in enumerate(counts, start):
+                        self._append(chunks.node_id(row), chunks.doc_id(row), terms, chunks.span(row))
+                    self._cursor = cursor
+            if snapshot.live_mask is not None:
+                dead = np.flatnonzero(~snapshot.live_mask)
+                with self._lock:
+                    if len(dead) != len(self._deleted):
+                        self._tombstone([row for row in dead.tolist() if row not in self._deleted])
+        return True
+
+    def mirrors(self, store: MmapVectorStore) -> bool:
+        """Whether the index holds exactly the live rows of ``store``"""
+        return (self.generation == store.generation
+                and len(self.chunks) == len(store)
+                and len(self) == store.live_count)
+
+    def search(self, query: str, k: int = 10) -> List[SearchHit]:
+        """
+        The ``k`` entries with the highest BM25 score for ``query``.
+
+        Entries sharing no term with the query are never returned, so fewer
+        than ``k`` hits (or none) may come back.
+        """
+        terms = query_terms(query)
+        with self._lock:
+            live = len(self)
+            if not terms or not live or k <= 0:
+                return []
+            avg_length = self._live_length / live
+            lengths = np.frombuffer(self._lengths, dtype=np.int32)
+            entry_parts, score_parts = [], []
+            for term in terms:
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    continue
+                df = min(self._df[term_id], live)
+                idf = math.log(1.0 + (live - df + 0.5) / (df + 0.5))
+                entries, tf = _decode_postings(bytes(self._postings[term_id]), self._df[term_id])
+                norm = self.k1 * (1.0 - self.b + self.b * lengths[entries] / avg_length)
+                entry_parts.append(entries)
+                score_parts.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+            # Release the buffer view so appends can resize the array again
+            del lengths
+            if not entry_parts:
+                return []
+
+            entries = np.concatenate(entry_parts)
+            weights = np.concatenate(score_parts)
+            if len(entries) * 16 >= len(self.chunks):
+                # Common terms: summing into one slot per entry beats sorting
+                scores = np.bincount(entries, weights=weights)
+                entries = np.flatnonzero(scores)
+                scores = scores[entries]
+            else:
+                entries, inverse = np.unique(entries, return_inverse=True)
+                scores = np.bincount(inverse, weights=weights)
+            if self._deleted:
+                keep = ~np.isin(entries, self._deleted_entries())
+                entries, scores = entries[keep], scores[keep]
+            if len(entries) > k:
+                best = np.argpartition(-scores, k - 1)[:k]
+                entries, scores = entries[best], scores[best]
+            order = np.argsort(-scores, kind="stable")
+            chunks = self.chunks
+            return [
+                SearchHit(chunks.node_id(entry), chunks.doc_id(entry), float(score), chunks.span(entry))
+                for entry, score in zip(entries[order].tolist(), scores[order].tolist())
+            ]
+
+    def compact(self) -> int:
+        """
+        Rebuild the postings without tombstoned entries.
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            dropped = len(self._deleted)
+            if not dropped:
+                return 0
+            deleted = self._deleted_entries()
+            old_chunks, old_lengths = self.chunks, self._lengths
+            old_terms, old_postings, old_df = self._terms, self._postings, self._df
+            self._reset()
+
+            keep = np.ones(len(old_chunks), dtype=bool)
+            keep[deleted] = False
+            renumber = np.cumsum(keep) - 1
+            for entry in np.flatnonzero(keep).tolist():
+                self.chunks.append(*old_chunks.record(entry))
+                self._lengths.append(old_lengths[entry])
+                self._live_length += old_lengths[entry]
+            for term, term_id in old_terms.items():
+                entries, tf = _decode_postings(bytes(old_postings[term_id]), old_df[term_id])
+                alive = keep[entries]
+                if not alive.any():
+                    continue
+                postings = bytearray()
+                previous = 0
+                for entry, count in zip(renumber[entries[alive]].tolist(), tf[alive].tolist()):
+                    _put_varint(postings, entry - previous)
+                    _put_varint(postings, count)
+                    previous = entry
+                self._terms[term] = len(self._postings)
+                self._postings.append(postings)
+                self._last.append(previous)
+                self._df.append(int(alive.sum()))
+        return dropped
+
+    def stats(self) -> Dict[str, int]:
+        """Entry, term and posting counts and the size of the postings"""
+        with self._lock:
+            return {
+                "entries": len(self),
+                "deleted": len(self._deleted),
+                "terms": len(self._terms),
+                "postings": sum(self._df),
+                "postings_bytes": sum(len(postings) for postings in self._postings),
+            }
+
+    def _append(self, node_id: str, doc_id: str, terms: Counter,
+                span: Optional[Tuple[int, int]]):
+        entry = len(self.chunks)
+        for term, count in terms.items():
+            term_id = self._terms.get(term)
+            if term_id is None:
+                term_id = self._terms[term] = len(self._postings)
+                self._postings.append(bytearray())
+                self._last.append(0)
+                self._df.append(0)
+            postings = self._postings[term_id]
+            _put_varint(postings, entry - self._last[term_id])
+            _put_varint(postings, count)
+            self._last[term_id] = entry
+            self._df[term_id] += 1
+        length = sum(terms.values())
+        self._lengths.append(length)
+        self._live_length += length
+        self.chunks.append(node_id, doc_id, span)
+
+    def _live_entries_of(self, doc_id: str) -> List[int]:
+        return [entry for entry in self.chunks.rows_of(doc_id) if entry not in self._deleted]
+
+    def _tombstone(self, entries: Sequence[int]):
+        for entry in entries:
+            self._deleted.add(entry)
+            self._live_length -= self._lengths[entry]
+        if entries:
+            self._deleted_cache = None
+
+    def _deleted_entries(self) -> np.ndarray:
+        if self._deleted_cache is None:
+            self._deleted_cache = np.fromiter(self._deleted, dtype=np.int64, count=len(self._deleted))
+        return self._deleted_cache
+
+    def _reset(self):
+        self.chunks = ChunkTable()
+        self._lengths = array("i")
+        self._live_length = 0
+        self._terms: Dict[str, int] = {}
+        self._postings: List[bytearray] = []
+        # Last entry added to each term's postings, the base of the next gap
+        self._last = array("q")
+        self._df = array("i")
+        self._deleted: set = set()
+        self._deleted_cache: Optional[np.ndarray] = None
@@ -0,0 +1,182 @@
+"""
+SQLite query result cache shared by all processes on a host
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional
+
+from .cache import CacheBackend
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+"""
+
+# Reads refresh an entry's LRU timestamp at most this often, so hot keys
+# don't turn every cache hit into a write
+_TOUCH_INTERVAL = 1.0
+
+
+class SQLiteCache(CacheBackend):
+    """
+    TTL/LRU cache stored in a SQLite database file.
+
+    Every worker process pointing at the same file shares one cache, so a
+    response computed by one worker is a hit for all of them and a restart
+    starts warm. The database runs in WAL mode, so readers never block each
+    other or the writer. Values are stored in the compact binary form
+    produced by ``codec``. Expiry uses wall-clock time because it is
+    compared across processes.
+
+    Hit/miss/eviction counters are per process; ``size`` is the shared total.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, codec, max_size: int = 1024, ttl: float = 3600,
+                 busy_timeout: float = 5.0):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Database file, created if missing
+            codec: Object with ``dumps(value) -> bytes`` (None for values
+                that cannot be stored) and ``loads(bytes)``
+            max_size: Maximum number of entries kept across all processes
+            ttl: Time-to-live for each entry in seconds
+            busy_timeout: Seconds to wait for another process's write lock
+        """
+        self.path = path
+        self.codec = codec
+        self.max_size = max_size
+        self.ttl = ttl
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        with conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection for the current thread (reopened after a fork)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _key(key: Hashable) -> bytes:
+        encoded = json.dumps(key, separators=(",", ":"), default=str).encode("utf-8")
+        return hashlib.blake2b(encoded, digest_size=16).digest()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for ``key`` or None on a miss"""
+        conn = self._connection()
+        digest = self._key(key)
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at, last_access FROM entries WHERE key = ?", (digest,)
+        ).fetchone()
+        value = None
+        if row is not None:
+            data, expires_at, last_access = row
+            if expires_at <= now:
+                conn.execute("DELETE FROM entries WHERE key = ? AND expires_at <= ?", (digest, now))
+                self._count("expirations")
+            else:
+                value = self.codec.loads(data)
+                if value is not None and now - last_access >= _TOUCH_INTERVAL:
+                    conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, digest))
+        self._count("misses" if value is None else "hits")
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Insert or refresh ``key``, evicting expired and LRU entries if full"""
+        if self.max_size <= 0:
+            return
+        data = self.codec.dumps(value)
+        if data is None:
+            # Not encodable without pickle: left uncached
+            return
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (self._key(key), data, now + self.ttl, now)
+            )
+            expired = conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+            evicted = conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                " SELECT key FROM entries ORDER BY last_access"
+                " LIMIT max(0, (SELECT count(*) FROM entries) - ?))",
+                (self.max_size,)
+            ).rowcount
+        self._count("expirations", expired)
+        self._count("evictions", evicted)
+
+    def invalidate(self, key: Hashable) -> bool:
+        """Remove ``key`` from the cache. Returns True if it was present"""
+        conn = self._connection()
+        return conn.execute("DELETE FROM entries WHERE key = ?", (self._key(key),)).rowcount > 0
+
+    def clear(self):
+        """Remove all entries for every process (counters are kept)"""
+        self._connection().execute("DELETE FROM entries")
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT count(*) FROM entries").fetchone()[0]
+
+    def _count(self, counter: str, amount: int = 1):
+        if amount:
+            with self._lock:
+                setattr(self, counter, getattr(self, counter) + amount)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return this process's hit/miss counters and the shared occupancy"""
+        size = len(self)
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": self.name,
+                "path": self.path,
+                "size": size,
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
@@ -0,0 +1,124 @@
+"""
+Token streams with latency statistics and callbacks
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+Callbacks = Dict[str, Callable]
+
+
+class _StreamStats:
+    """Timing bookkeeping shared by the sync and async streams"""
+
+    def __init__(self, agents: List[str], start_time: float):
+        self.agents = agents
+        self.start_time = start_time
+        self.first_token_time: Optional[float] = None
+        self.tokens = 0
+
+    def record_token(self):
+        if self.first_token_time is None:
+            self.first_token_time = time.perf_counter()
+        self.tokens += 1
+
+    def finish(self) -> Dict[str, Any]:
+        duration = time.perf_counter() - self.start_time
+        first = self.first_token_time
+        # Decode rate excludes the time spent before the first token
+        decode_time = duration - (first - self.start_time) if first is not None else 0.0
+        return {
+            "total_tokens": self.tokens,
+            "duration_ms": round(duration * 1000, 3),
+            "time_to_first_token_ms": (
+                round((first - self.start_time) * 1000, 3) if first is not None else None
+            ),
+            "tokens_per_second": (
+                round((self.tokens - 1) / decode_time, 3) if self.tokens > 1 and decode_time > 0 else None
+            ),
+            "agents": self.agents,
+        }
+
+
+class TokenStream:
+    """
+    Iterable over generated tokens.
+
+    Tokens are pulled from the generator only as the consumer iterates, so
+    a slow consumer applies backpressure instead of buffering output. After
+    the stream is exhausted ``stats`` holds the token count, duration,
+    time-to-first-token and decode rate. Optional ``callbacks`` are called
+    with each token (``on_token``), the final stats (``on_complete``) and
+    any exception (``on_error``).
+    """
+
+    def __init__(self,
+                 tokens: Iterator[str],
+                 agents: List[str],
+                 start_time: Optional[float] = None,
+                 callbacks: Optional[Callbacks] = None):
+        self._tokens = tokens
+        self._stats = _StreamStats(agents, start_time or time.perf_counter())
+        self.callbacks = callbacks or {}
+        self.stats: Optional[Dict[str, Any]] = None
+
+    def __iter__(self) -> Iterator[str]:
+        on_token = self.callbacks.get("on_token")
+        try:
+            for token in self._tokens:
+                self._stats.record_token()
+                if on_token is not None:
+                    on_token(token)
+                yield token
+        except Exception as exc:
+            _notify_error(self.callbacks, exc)
+            raise
+        self._complete()
+
+    def run(self) -> Dict[str, Any]:
+        """Consume the whole stream (driving the callbacks) and return stats"""
+        for _ in self:
+            pass
+        return self.stats
+
+    def _complete(self):
+        self.stats = self._stats.finish()
+        on_complete = self.callbacks.get("on_complete")
+        if on_complete is not None:
+            on_complete(self.stats)
+
+
+class AsyncTokenStream(TokenStream):
+    """
+    Async iterable over generated tokens.
+
+    Control returns to the event loop between tokens, so one stream never
+    starves other requests on the same loop.
+    """
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        on_token = self.callbacks.get("on_token")
+        try:
+            for token in self._tokens:
+                self._stats.record_token()
+                if on_token is not None:
+                    on_token(token)
+                yield token
+                await asyncio.sleep(0)
+        except Exception as exc:
+            _notify_error(self.callbacks, exc)
+            raise
+        self._complete()
+
+    async def run(self) -> Dict[str, Any]:
+        """Consume the whole stream (driving the callbacks) and return stats"""
+        async for _ in self:
+            pass
+        return self.stats
+
+
+def _notify_error(callbacks: Callbacks, exc: Exception):
+    on_error = callbacks.get("on_error")
+    if on_error is not None:
+        on_error(exc)
@@ -0,0 +1,251 @@
+"""
+Lightweight request tracing with contextvars propagation
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Span times are taken from perf_counter and shifted onto the wall clock,
+# so exported timestamps line up across traces and processes
+_PERF_ORIGIN = time.perf_counter()
+_WALL_ORIGIN = time.time()
+
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar(
+    "lexicontrail_current_span", default=None
+)
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start", "end", "attributes", "thread_id")
+
+    def __init__(self, name: str, trace: "Trace", span_id: int, parent_id: Optional[int],
+                 start: float, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start = start
+        self.end: Optional[float] = None
+        self.attributes = attributes or {}
+        self.thread_id = threading.get_ident()
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end is None else (self.end - self.start) * 1000
+
+
+class Trace:
+    """All spans recorded for one sampled request"""
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = os.urandom(8).hex()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.root = Span(name, self, next(self._ids), None, time.perf_counter(), attributes)
+        self.spans: List[Span] = [self.root]
+
+    def start_span(self, name: str, parent: Span,
+                   attributes: Optional[Dict[str, Any]] = None,
+                   start: Optional[float] = None) -> Span:
+        """Open a child span of ``parent`` (safe to call from any thread)"""
+        with self._lock:
+            span = Span(name, self, next(self._ids), parent.span_id,
+                        time.perf_counter() if start is None else start, attributes)
+            self.spans.append(span)
+        return span
+
+    def record_span(self, name: str, parent: Span, start: float, end: float,
+                    attributes: Optional[Dict[str, Any]] = None) -> Span:
+        """Add an already finished span, e.g. one measured on a worker thread"""
+        span = self.start_span(name, parent, attributes, start=start)
+        span.end = end
+        return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact form for ``QueryResponse.metadata``; times relative to the root"""
+        origin = self.root.start
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "spans": [
+                {
+                    "name": span.name,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    "start_ms": round((span.start - origin) * 1000, 3),
+                    "duration_ms": None if span.end is None else round(span.duration_ms, 3),
+                    **({"attributes": span.attributes} if span.attributes else {}),
+                }
+                for span in spans
+            ],
+        }
+
+    def to_events(self) -> List[Dict[str, Any]]:
+        """Chrome Trace Event Format "complete" events, one per finished span"""
+        pid = os.getpid()
+        with self._lock:
+            spans = [span for span in self.spans if span.end is not None]
+        return [
+            {
+                "name": span.name,
+                "cat": "lexicontrail",
+                "ph": "X",
+                "ts": round((_WALL_ORIGIN + span.start - _PERF_ORIGIN) * 1e6, 3),
+                "dur": round((span.end - span.start) * 1e6, 3),
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": {
+                    "trace_id": self.trace_id,
+                    "span_id": span.span_id,
+                    "parent_id": span.parent_id,
+                    **span.attributes,
+                },
+            }
+            for span in spans
+        ]
+
+
+class FileTraceExporter:
+    """
+    Append finished traces to a Chrome Trace Event Format JSON file.
+
+    The file is written as an open JSON array (``[`` then one event per
+    line, each followed by a comma), which the format allows. It can be
+    loaded as is in Perfetto or ``chrome://tracing``, and appending needs
+    no rewrite of earlier content.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, trace: Trace):
+        lines = "".join(json.dumps(event, default=str) + ",\n" for event in trace.to_events())
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                if f.tell() == 0:
+                    f.write("[\n")
+                f.write(lines)
+
+
+class Tracer:
+    """
+    Starts sampled traces.
+
+    Only a ``sample_rate`` fraction of requests is traced. For the rest,
+    every ``span()`` call reduces to a context-variable lookup, so
+    instrumentation can stay in place on hot paths.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, exporter: Optional[Any] = None):
+        """
+        Initialize the tracer.
+
+        Args:
+            sample_rate: Fraction of traces recorded, from 0.0 to 1.0
+            exporter: Object whose ``export(trace)`` receives finished traces
+        """
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self._rng = random.Random()
+
+    def should_sample(self) -> bool:
+        return self.sample_rate >= 1.0 or (
+            self.sample_rate > 0 and self._rng.random() < self.sample_rate
+        )
+
+    @contextmanager
+    def start_trace(self, name: str, force: bool = False,
+                    **attributes) -> Iterator[Optional[Trace]]:
+        """
+        Trace the ``with`` block as a new root span.
+
+        Yields the Trace if this request was sampled, otherwise None. Inside
+        an already traced request this opens a child span instead and
+        yields None, leaving export to the outer trace.
+
+        Args:
+            name: Root span name
+            force: Record regardless of the sample rate
+            **attributes: Attributes of the root span
+        """
+        if _current_span.get() is not None:
+            with span(name, **attributes):
+                yield None
+            return
+        if not (force or self.should_sample()):
+            yield None
+            return
+
+        trace = Trace(name, attributes)
+        token = _current_span.set(trace.root)
+        try:
+            yield trace
+        except BaseException as exc:
+            trace.root.set_attribute("error", type(exc).__name__)
+            raise
+        finally:
+            trace.root.end = time.perf_counter()
+            _current_span.reset(token)
+            if self.exporter is not None:
+                self.exporter.export(trace)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Record the ``with`` block as a child of the current span.
+
+    Yields None, at negligible cost, when the current request is not traced.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = parent.trace.start_span(name, parent, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as exc:
+        child.set_attribute("error", type(exc).__name__)
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost open span of the current thread or task, if traced"""
+    return _current_span.get()
+
+
+def propagate(fn: Callable) -> Callable:
+    """
+    Bind ``fn`` to the caller's trace context.
+
+    asyncio tasks inherit context variables automatically, but plain
+    threads do not; wrap callables handed to a thread or executor so their
+    spans join the caller's trace.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
@@ -0,0 +1,718 @@
+"""
+Persistent vector store backed by a memory-mapped embedding matrix
+"""
+
+import io
+import json
+import os
+import sys
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from .chunking import map_file
+from .exceptions import ConfigurationError
+
+HEADER_FILE = "index.json"
+VECTORS_FILE = "vectors.bin"
+IDS_FILE = "ids.jsonl"
+DELETED_FILE = "deleted.bin"
+TEXTS_FILE = "texts.jsonl"
+LOCK_FILE = ".lock"
+COMPACT_LOCK_FILE = ".compact.lock"
+
+SUPPORTED_DTYPES = ("float32", "float16")
+
+# Rows copied per step while compacting
+COMPACT_BLOCK_ROWS = 65536
+
+
+class ChunkTable:
+    """
+    Columnar metadata of the rows of a vector store.
+
+    Keeping a node id string, a document id string and a span tuple per
+    row costs several hundred bytes of object overhead per chunk, which
+    dominates memory long before the embeddings do. Here every column is
+    a typed array: node ids are concatenated UTF-8 bytes with an end
+    offset per row, documents are an index into one list of distinct
+    (interned) ids, and spans are two int64 columns holding -1 for rows
+    without one. Strings are only built for the rows a caller reads.
+
+    Rows are only appended, so a reader holding the table sees every row
+    that existed when it took its snapshot.
+    """
+
+    def __init__(self):
+        self.doc_names: List[str] = []
+        self._doc_index: Dict[str, int] = {}
+        self._doc_rows: List[array] = []
+        self._id_data = bytearray()
+        self._id_ends = array("q")
+        self._doc_refs = array("i")
+        self._span_starts = array("q")
+        self._span_ends = array("q")
+
+    def __len__(self) -> int:
+        return len(self._doc_refs)
+
+    def append(self, node_id: str, doc_id: str, span: Optional[Sequence[int]] = None):
+        """Add the metadata of the next row"""
+        ref = self._doc_index.get(doc_id)
+        if ref is None:
+            doc_id = sys.intern(doc_id)
+            ref = self._doc_index[doc_id] = len(self.doc_names)
+            self.doc_names.append(doc_id)
+            self._doc_rows.append(array("q"))
+        self._doc_rows[ref].append(len(self._doc_refs))
+        self._id_data += node_id.encode("utf-8")
+        self._id_ends.append(len(self._id_data))
+        self._span_starts.append(-1 if span is None else int(span[0]))
+        self._span_ends.append(-1 if span is None else int(span[1]))
+        # Last, so the row is only counted once all of its columns are set
+        self._doc_refs.append(ref)
+
+    def node_id(self, row: int) -> str:
+        start = self._id_ends[row - 1] if row else 0
+        return self._id_data[start:self._id_ends[row]].decode("utf-8")
+
+    def doc_id(self, row: int) -> str:
+        return self.doc_names[self._doc_refs[row]]
+
+    def span(self, row: int) -> Optional[Tuple[int, int]]:
+        """``(start, end)`` source byte range of a row, or None"""
+        start = self._span_starts[row]
+        return None if start < 0 else (start, self._span_ends[row])
+
+    def record(self, row: int) -> Tuple[str, str, Optional[Tuple[int, int]]]:
+        """Node id, document id and span of a row"""
+        return self.node_id(row), self.doc_id(row), self.span(row)
+
+    def node_ids(self, start: int = 0) -> Iterator[str]:
+        """Node ids of the rows from ``start`` on, in row order"""
+        for row in range(start, len(self)):
+            yield self.node_id(row)
+
+    def rows_of(self, doc_id: str) -> Sequence[int]:
+        """Rows of a document in the order they were added, tombstoned or not"""
+        ref = self._doc_index.get(doc_id)
+        return self._doc_rows[ref] if ref is not None else ()
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the table"""
+        columns = (self._id_ends, self._doc_refs, self._span_starts, self._span_ends, *self._doc_rows)
+        return (
+            sys.getsizeof(self._id_data)
+            + sum(sys.getsizeof(column) for column in columns)
+            + sys.getsizeof(self.doc_names) + sys.getsizeof(self._doc_index) + sys.getsizeof(self._doc_rows)
+            + sum(sys.getsizeof(name) for name in self.doc_names)
+        )
+
+
+class TextCursor(NamedTuple):
+    """Position reached by ``MmapVectorStore.read_texts``"""
+    generation: int
+    row: int
+    offset: int  # byte offset of ``row``'s line in the texts sidecar
+
+
+class StoreSnapshot(NamedTuple):
+    """Consistent view of a store for one read operation"""
+    vectors: np.ndarray
+    live_mask: Optional[np.ndarray]
+    chunks: ChunkTable
+    generation: int
+
+
+def _generation_file(name: str, generation: int) -> str:
+    """File name of ``name`` for a compaction generation"""
+    if generation == 0:
+        return name
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.g{generation}{ext}"
+
+
+class MmapVectorStore:
+    """
+    Embedding store that is memory-mapped on open.
+
+    Layout of the store directory:
+
+    - ``vectors.bin``: row-major ``(count, dim)`` matrix of ``dtype``
+    - ``ids.jsonl``: one ``{"id", "doc_id"}`` record per matrix row, plus
+      the chunk's ``[start, end)`` byte ``span`` in its source file when
+      it was ingested from one
+    - ``texts.jsonl``: one JSON line per row with the chunk's text, read
+      back only to rebuild the keyword index: a string, null, or for rows
+      ingested from a file a ``[path, start, end]`` reference, so file text
+      is not stored twice; stores written by older versions lack the lines
+      of their first ``count - text_rows`` rows
+    - ``deleted.bin``: int64 row numbers of tombstoned rows
+    - ``index.json``: header with ``dim``, ``dtype``, ``count``, the
+      committed lengths of the sidecars and the compaction ``generation``
+
+    Rows are only ever appended; deleting or replacing a document
+    tombstones its rows, so corpus edits cost time proportional to the
+    edited document. ``compact`` rewrites the live rows into files of the
+    next generation and can run in the background.
+
+    The header is replaced atomically after each write, so readers never
+    see a partially written row. Opening a store maps the matrix read-only
+    instead of rebuilding it, and worker processes that map the same store
+    share its pages through the OS page cache. Writes from several
+    processes are serialized with an advisory file lock.
+    """
+
+    def __init__(self, path: str, dim: int, dtype: str = "float32"):
+        """
+        Open or create a store.
+
+        Args:
+            path: Directory holding the store files
+            dim: Embedding dimension
+            dtype: On-disk element type, ``"float32"`` or ``"float16"``
+        """
+        if dtype not in SUPPORTED_DTYPES:
+            raise ConfigurationError(f"Unsupported embedding dtype: {dtype}")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        header = self._read_header()
+        if header is None:
+            with self._write_lock():
+                header = self._read_header()
+                if header is None:
+                    header = self._empty_header(dim, dtype, generation=0)
+                    self._write_header(header)
+        if header["dim"] != dim or header["dtype"] != dtype:
+            raise ConfigurationError(
+                f"Store at {path} has dim={header['dim']} dtype={header['dtype']}, "
+                f"expected dim={dim} dtype={dtype}"
+            )
+
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.RLock()
+        self._reset_state(generation=-1)
+
+    def __len__(self) -> int:
+        """Number of rows, including tombstoned ones"""
+        return len(self.vectors)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Read-only ``(count, dim)`` view of the stored embeddings"""
+        if self._stale:
+            self.refresh()
+        return self._matrix
+
+    @property
+    def live_mask(self) -> Optional[np.ndarray]:
+        """Boolean mask of non-deleted rows, or None if nothing is deleted"""
+        if self._stale:
+            self.refresh()
+        return self._live if self._deleted_count else None
+
+    @property
+    def generation(self) -> int:
+        """Compaction generation; row numbers change when it does"""
+        if self._stale:
+            self.refresh()
+        return self._header["generation"]
+
+    @property
+    def version(self) -> Tuple[int, int, int]:
+        """
+        Identifier of the stored rows and tombstones, re-read from disk.
+
+        Every write by any process sharing the store changes it, and later
+        versions compare greater than earlier ones.
+        """
+        self.refresh()
+        header = self._header
+        return header["generation"], header["count"], header["deleted_bytes"]
+
+    @property
+    def live_count(self) -> int:
+        return len(self.vectors) - self._deleted_count
+
+    @property
+    def dead_ratio(self) -> float:
+        """Fraction of rows that are tombstoned"""
+        total = len(self.vectors)
+        return self._deleted_count / total if total else 0.0
+
+    def snapshot(self) -> StoreSnapshot:
+        """Matrix, tombstone mask and chunk metadata captured together"""
+        with self._lock:
+            if self._stale:
+                self.refresh()
+            return StoreSnapshot(
+                vectors=self._matrix,
+                live_mask=self._live[:len(self._matrix)] if self._deleted_count else None,
+                chunks=self.chunks,
+                generation=self._header["generation"]
+            )
+
+    def document_ids(self) -> List[str]:
+        """Ids of documents with at least one live row"""
+        if self._stale:
+            self.refresh()
+        return [doc_id for doc_id in self.chunks.doc_names if self._live_rows_of(doc_id)]
+
+    def refresh(self):
+        """Re-read the header and pick up rows written by other processes"""
+        with self._lock:
+            header = self._normalize_header(self._read_header())
+            if header["generation"] != self._header["generation"]:
+                # First load or compacted elsewhere: row numbers changed
+                self._reset_state(generation=header["generation"])
+            self._stale = False
+            if (header["count"] != self._header["count"]
+                    or header["deleted_bytes"] != self._header["deleted_bytes"]):
+                self._load_ids(header)
+                self._map(header["count"])
+                self._load_deleted(header)
+            self._header = header
+
+    def add(self, ids: Sequence[str], doc_ids: Sequence[str], vectors: np.ndarray,
+            spans: Optional[Sequence[Tuple[int, int]]] = None,
+            texts: Optional[Sequence[str]] = None,
+            source_path: Optional[str] = None):
+        """
+        Append embeddings with their node and document ids.
+
+        Args:
+            ids: Node id for each row
+            doc_ids: Owning document id for each row
+            vectors: ``(len(ids), dim)`` matrix, ideally L2-normalized
+            spans: Optional ``(start, end)`` source byte range of each row
+            texts: Optional chunk text of each row, for the keyword index
+            source_path: UTF-8 file the ``spans`` point into; instead of
+                ``texts``, a reference to each row's span is stored and
+                ``read_texts`` reads the text back from the file
+        """
+        if source_path is not None:
+            if spans is None or texts is not None:
+                raise ValueError("source_path needs spans and replaces texts")
+            source_path = os.path.abspath(source_path)
+            texts = [[source_path, int(start), int(end)] for start, end in spans]
+        with self._lock, self._write_lock():
+            header = self._normalize_header(self._read_header())
+            header = self._append(header, ids, doc_ids, vectors, spans, texts)
+            self._write_header(header)
+            # Remapped lazily, so write-only workers never pay for it
+            self._stale = True
+
+    def replace_document(self, doc_id: str, ids: Sequence[str], vectors: np.ndarray,
+                         texts: Optional[Sequence[str]] = None) -> int:
+        """
+        Atomically replace all rows of ``doc_id`` with new ones.
+
+        Readers see either the old rows or the new rows, never both.
+
+        Returns:
+            Number of rows tombstoned
+        """
+        with self._lock, self._write_lock():
+            self.refresh()
+            old_rows = self._live_rows_of(doc_id)
+            header = self._append(dict(self._header), ids, [doc_id] * len(ids), vectors, texts=texts)
+            header = self._tombstone(header, old_rows)
+            self._write_header(header)
+            self._stale = True
+        return len(old_rows)
+
+    def delete_document(self, doc_id: str, keep_last: int = 0) -> int:
+        """
+        Tombstone all rows of ``doc_id``.
+
+        Args:
+            doc_id: Document to delete
+            keep_last: Number of the document's most recently added rows to
+                keep; used to retire an older version once a new one has
+                been appended in pieces (row order survives compaction)
+
+        Returns:
+            Number of rows deleted (0 if the document is unknown)
+        """
+        with self._lock, self._write_lock():
+            self.refresh()
+            rows = self._live_rows_of(doc_id)
+            rows = rows[:max(0, len(rows) - keep_last)]
+            if rows:
+                self._write_header(self._tombstone(dict(self._header), rows))
+                self._stale = True
+        return len(rows)
+
+    def compact(self) -> int:
+        """
+        Rewrite live rows into a new generation, dropping tombstoned ones.
+
+        The live rows of a snapshot are copied without holding any lock, so
+        readers and writers carry on meanwhile. The locks are then taken
+        only to copy rows appended since the snapshot, carry over rows
+        tombstoned since, and swap the header. Readers keep using their
+        current mapping until they next refresh. Row numbers change, so
+        structures derived from row numbers must check ``generation``.
+
+        Returns:
+            Number of rows dropped
+        """
+        with self._file_lock(COMPACT_LOCK_FILE):
+            with self._lock:
+                self.refresh()
+                if not self._deleted_count:
+                    return 0
+                old_header = dict(self._header)
+                matrix, chunks = self._matrix, self.chunks
+                keep = self._live[:old_header["count"]].copy()
+
+            old_generation = old_header["generation"]
+            generation = old_generation + 1
+            header = self._empty_header(self.dim, self.dtype.name, generation)
+            # Built alongside the files so this process need not re-read them
+            table = ChunkTable()
+            with self._open_texts(old_header) as texts:
+                lines = self._text_lines(texts, old_header, 0, 0)
+                header = self._copy_rows(header, table, matrix, chunks, np.flatnonzero(keep),
+                                         (line for line, _ in lines), 0, truncate=True)
+
+            with self._lock, self._write_lock():
+                self.refresh()
+                count = self._header["count"]
+                # Rows appended since the snapshot are kept as they are
+                tail = np.arange(old_header["count"], count)
+                with self._open_texts(self._header) as texts:
+                    lines = self._text_lines(texts, self._header, old_header["count"],
+                                             old_header["texts_bytes"])
+                    header = self._copy_rows(header, table, self._matrix, self.chunks, tail,
+                                             (line for line, _ in lines), old_header["count"])
+                keep = np.concatenate([keep, np.ones(len(tail), dtype=bool)])
+                # Rows tombstoned since the snapshot, renumbered
+                renumber = np.cumsum(keep) - 1
+                deleted = renumber[np.flatnonzero(keep & ~self._live[:count])].astype(np.int64)
+                with open(os.path.join(self.path, _generation_file(DELETED_FILE, generation)), "wb") as fh:
+                    fh.write(deleted.tobytes())
+                header["deleted_bytes"] = deleted.nbytes
+                self._write_header(header)
+                dropped = int(len(keep) - np.count_nonzero(keep))
+
+                self._header = header
+                self.chunks = table
+                self._live = np.ones(header["count"], dtype=bool)
+                self._live[deleted] = False
+                self._deleted_count = len(deleted)
+                self._map(header["count"])
+
+        # Processes still mapping the old files keep their open inodes
+        for name in (VECTORS_FILE, IDS_FILE, TEXTS_FILE, DELETED_FILE):
+            try:
+                os.remove(os.path.join(self.path, _generation_file(name, old_generation)))
+            except OSError:
+                pass
+        return dropped
+
+    def _copy_rows(self, header: Dict[str, Any], table: ChunkTable, matrix: np.ndarray,
+                   chunks: ChunkTable, rows: np.ndarray, text_lines: Iterator[bytes],
+                   first_row: int, truncate: bool = False) -> Dict[str, Any]:
+        """
+        Append ascending ``rows`` of a mapping to the files of ``header``'s
+        generation and to ``table``. ``text_lines`` yields the text line of
+        every row from ``first_row`` on, copied or not.
+        """
+        generation = header["generation"]
+        mode = "wb" if truncate else "ab"
+        with open(os.path.join(self.path, _generation_file(VECTORS_FILE, generation)), mode) as fh:
+            for start in range(0, len(rows), COMPACT_BLOCK_ROWS):
+                block = rows[start:start + COMPACT_BLOCK_ROWS]
+                fh.write(np.ascontiguousarray(matrix[block]).tobytes())
+        lines = []
+        for row in rows.tolist():
+            record = chunks.record(row)
+            table.append(*record)
+            lines.append(self._record(*record))
+        records = "".join(lines).encode("utf-8")
+        with open(os.path.join(self.path, _generation_file(IDS_FILE, generation)), mode) as fh:
+            fh.write(records)
+        texts_bytes = 0
+        with open(os.path.join(self.path, _generation_file(TEXTS_FILE, generation)), mode) as fh:
+            previous = first_row - 1
+            for row in rows.tolist():
+                for _ in range(row - previous - 1):
+                    next(text_lines)
+                line = next(text_lines)
+                fh.write(line)
+                texts_bytes += len(line)
+                previous = row
+        header = dict(header)
+        header["count"] += len(rows)
+        header["ids_bytes"] += len(records)
+        header["texts_bytes"] += texts_bytes
+        header["text_rows"] += len(rows)
+        return header
+
+    def compact_in_background(self) -> threading.Thread:
+        """Run ``compact`` on a daemon thread and return the thread"""
+        thread = threading.Thread(target=self.compact, name="vector-store-compaction", daemon=True)
+        thread.start()
+        return thread
+
+    def read_texts(self, cursor: Optional[TextCursor] = None,
+                   end_row: Optional[int] = None) -> Tuple[List[Optional[str]], TextCursor]:
+        """
+        Chunk texts of the rows from ``cursor`` on, in row order.
+
+        Args:
+            cursor: Position returned by an earlier call, or None to start
+                at the first row of the current generation
+            end_row: Stop before this row instead of the committed end
+
+        Returns:
+            The texts (None for rows stored without one, or whose source
+            file is gone) and the cursor to continue from. A cursor of an
+            older generation yields nothing and is returned as is; the
+            caller must start over.
+        """
+        with self._lock:
+            self.refresh()
+            header = dict(self._header)
+            if cursor is None:
+                cursor = TextCursor(header["generation"], 0, 0)
+            if cursor.generation != header["generation"]:
+                return [], cursor
+            end_row = header["count"] if end_row is None else min(end_row, header["count"])
+            if end_row <= cursor.row:
+                return [], cursor
+            # Opened under the lock, so a compaction cannot remove it first
+            fh = self._open_texts(header)
+        with fh:
+            lines = self._text_lines(fh, header, cursor.row, cursor.offset)
+            texts = []
+            offset = cursor.offset
+            for _ in range(end_row - cursor.row):
+                line, offset = next(lines)
+                texts.append(json.loads(line))
+        return self._resolve_texts(texts), TextCursor(cursor.generation, end_row, offset)
+
+    @staticmethod
+    def _resolve_texts(texts: List[Any]) -> List[Optional[str]]:
+        """Replace ``[path, start, end]`` references with the text they span"""
+        references: Dict[str, List[int]] = {}
+        for index, text in enumerate(texts):
+            if isinstance(text, list):
+                references.setdefault(text[0], []).append(index)
+        for path, indices in references.items():
+            try:
+                with map_file(path) as buffer:
+                    for index in indices:
+                        _, start, end = texts[index]
+                        texts[index] = str(buffer[start:end], "utf-8", "replace")
+            except OSError:
+                for index in indices:
+                    texts[index] = None
+        return texts
+
+    def _open_texts(self, header: Dict[str, Any]) -> IO[bytes]:
+        path = os.path.join(self.path, _generation_file(TEXTS_FILE, header["generation"]))
+        if not header["text_rows"]:
+            # Nothing written yet, or a store from before the sidecar
+            return io.BytesIO()
+        return open(path, "rb")
+
+    @staticmethod
+    def _text_lines(fh: IO[bytes], header: Dict[str, Any], row: int,
+                    offset: int) -> Iterator[Tuple[bytes, int]]:
+        """Raw text lines from ``row`` on with the offset after each"""
+        first = header["count"] - header["text_rows"]
+        fh.seek(offset)
+        while True:
+            if row < first:
+                line = b"null\n"
+            else:
+                line = fh.readline()
+                offset += len(line)
+            row += 1
+            yield line, offset
+
+    def _append(self, header: Dict[str, Any], ids: Sequence[str],
+                doc_ids: Sequence[str], vectors: np.ndarray,
+                spans: Optional[Sequence[Tuple[int, int]]] = None,
+                texts: Optional[Sequence[Any]] = None) -> Dict[str, Any]:
+        """Write rows past the committed end and return the updated header"""
+        vectors = np.asarray(vectors, dtype=self.dtype).reshape(-1, self.dim)
+        if spans is None:
+            spans = [None] * len(ids)
+        if texts is None:
+            texts = [None] * len(ids)
+        if not (len(ids) == len(doc_ids) == len(vectors) == len(spans) == len(texts)):
+            raise ValueError("ids, doc_ids, vectors, spans and texts must have the same length")
+        if not len(ids):
+            return header
+
+        records = "".join(
+            self._record(node_id, doc_id, span)
+            for node_id, doc_id, span in zip(ids, doc_ids, spans)
+        ).encode("utf-8")
+        text_lines = "".join(json.dumps(text) + "\n" for text in texts).encode("utf-8")
+        row_bytes = self.dim * self.dtype.itemsize
+        generation = header["generation"]
+        # Anything beyond the committed end is left over from an
+        # interrupted write and is overwritten
+        self._write_at(_generation_file(VECTORS_FILE, generation),
+                       header["count"] * row_bytes, vectors.tobytes())
+        self._write_at(_generation_file(IDS_FILE, generation), header["ids_bytes"], records)
+        self._write_at(_generation_file(TEXTS_FILE, generation), header["texts_bytes"], text_lines)
+        header = dict(header)
+        header["count"] += len(ids)
+        header["ids_bytes"] += len(records)
+        header["texts_bytes"] += len(text_lines)
+        header["text_rows"] += len(ids)
+        return header
+
+    @staticmethod
+    def _record(node_id: str, doc_id: str, span: Optional[Tuple[int, int]]) -> str:
+        record = {"id": node_id, "doc_id": doc_id}
+        if span is not None:
+            record["span"] = [int(span[0]), int(span[1])]
+        return json.dumps(record) + "\n"
+
+    def _tombstone(self, header: Dict[str, Any], rows: List[int]) -> Dict[str, Any]:
+        if not rows:
+            return header
+        data = np.asarray(rows, dtype=np.int64).tobytes()
+        self._write_at(_generation_file(DELETED_FILE, header["generation"]),
+                       header["deleted_bytes"], data)
+        header = dict(header)
+        header["deleted_bytes"] += len(data)
+        return header
+
+    def _live_rows_of(self, doc_id: str) -> List[int]:
+        # Iterated rather than viewed: a buffer export would block appends
+        rows = self.chunks.rows_of(doc_id)
+        rows = np.fromiter(rows, dtype=np.int64, count=len(rows))
+        return rows[self._live[rows]].tolist()
+
+    def _reset_state(self, generation: int):
+        self._header: Dict[str, Any] = {
+            "count": 0, "ids_bytes": 0, "texts_bytes": 0, "text_rows": 0,
+            "deleted_bytes": 0, "generation": generation
+        }
+        self._matrix = np.zeros((0, self.dim), dtype=self.dtype)
+        self._live = np.ones(0, dtype=bool)
+        self._deleted_count = 0
+        self.chunks = ChunkTable()
+        self._stale = True
+
+    def _map(self, count: int):
+        if count == 0:
+            self._matrix = np.zeros((0, self.dim), dtype=self.dtype)
+        else:
+            name = _generation_file(VECTORS_FILE, self._header["generation"])
+            self._matrix = np.memmap(
+                os.path.join(self.path, name),
+                dtype=self.dtype,
+                mode="r",
+                shape=(count, self.dim)
+            )
+        if len(self._live) < count:
+            self._live = np.concatenate([self._live, np.ones(count - len(self._live), dtype=bool)])
+
+    def _load_ids(self, header: Dict[str, Any]):
+        """Read sidecar records added since the last refresh"""
+        start = self._header["ids_bytes"]
+        if header["ids_bytes"] <= start:
+            return
+        name = _generation_file(IDS_FILE, self._header["generation"])
+        with open(os.path.join(self.path, name), "rb") as fh:
+            fh.seek(start)
+            data = fh.read(header["ids_bytes"] - start)
+        for line in data.decode("utf-8").splitlines():
+            record = json.loads(line)
+            self.chunks.append(record["id"], record["doc_id"], record.get("span"))
+
+    def _load_deleted(self, header: Dict[str, Any]):
+        """Apply tombstones added since the last refresh"""
+        start = self._header["deleted_bytes"]
+        end = header["deleted_bytes"]
+        if end <= start:
+            return
+        name = _generation_file(DELETED_FILE, self._header["generation"])
+        with open(os.path.join(self.path, name), "rb") as fh:
+            fh.seek(start)
+            rows = np.frombuffer(fh.read(end - start), dtype=np.int64)
+        self._live[rows] = False
+        self._deleted_count = int(len(self._live) - np.count_nonzero(self._live))
+
+    def _write_at(self, name: str, offset: int, data: bytes):
+        fd = os.open(os.path.join(self.path, name), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.lseek(fd, offset, os.SEEK_SET)
+            view = memoryview(data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _empty_header(dim: int, dtype: str, generation: int) -> Dict[str, Any]:
+        return {
+            "dim": dim,
+            "dtype": dtype,
+            "count": 0,
+            "ids_bytes": 0,
+            "texts_bytes": 0,
+            "text_rows": 0,
+            "deleted_bytes": 0,
+            "generation": generation,
+        }
+
+    @staticmethod
+    def _normalize_header(header: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill fields missing from headers written by older versions"""
+        header = dict(header)
+        header.setdefault("deleted_bytes", 0)
+        header.setdefault("generation", 0)
+        header.setdefault("texts_bytes", 0)
+        header.setdefault("text_rows", 0)
+        return header
+
+    def _read_header(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.path, HEADER_FILE), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return None
+
+    def _write_header(self, header: Dict[str, Any]):
+        target = os.path.join(self.path, HEADER_FILE)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(header, fh)
+        os.replace(tmp, target)
+
+    def _write_lock(self):
+        """Advisory lock serializing writers across processes"""
+        return self._file_lock(LOCK_FILE)
+
+    @contextmanager
+    def _file_lock(self, name: str):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.path, name), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
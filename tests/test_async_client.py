@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from lexicontrail.async_client import AsyncLexiconTrailClient
+
+
+def test_blocking_query_stages_run_off_the_event_loop():
+    client = AsyncLexiconTrailClient(api_key="test")
+    retrieve = client.sync_client._retrieve
+
+    def slow_retrieve(*args, **kwargs):
+        time.sleep(0.2)
+        return retrieve(*args, **kwargs)
+
+    client.sync_client._retrieve = slow_retrieve
+
+    async def main():
+        await client.analyze_document("The Basel Committee sets liquidity coverage rules. " * 10)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while not query.done():
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        query = asyncio.ensure_future(client.query("What does the Basel Committee set?"))
+        await asyncio.gather(query, tick())
+        return query.result(), ticks
+
+    response, ticks = asyncio.run(main())
+    assert response.sources
+    # The loop kept running while retrieval blocked its executor thread
+    assert ticks >= 10
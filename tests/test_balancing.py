@@ -0,0 +1,56 @@
+import pytest
+
+from lexicontrail.balancing import LoadBalancer, ReplicaLoad
+from lexicontrail.exceptions import ConfigurationError
+
+
+def warmed(policy, latencies_ms, seed=0):
+    """Balancer whose replicas have served one batch each at the given latencies"""
+    balancer = LoadBalancer(len(latencies_ms), policy, seed=seed)
+    for index, latency in enumerate(latencies_ms):
+        balancer.loads[index].outstanding += 1
+        balancer.release(index, 1, latency)
+    return balancer
+
+
+def test_idle_replicas_are_tried_first():
+    balancer = LoadBalancer(3, "least_outstanding")
+    assert sorted(balancer.acquire() for _ in range(3)) == [0, 1, 2]
+    assert [load["outstanding"] for load in balancer.snapshot()] == [1, 1, 1]
+
+
+def test_least_outstanding_weighs_queue_by_latency():
+    balancer = warmed("least_outstanding", [100.0, 10.0])
+    # The fast replica takes requests until (outstanding + 1) * 10ms exceeds 100ms
+    picks = [balancer.acquire() for _ in range(10)]
+    assert picks == [1] * 9 + [0]
+    balancer.release(1, 9, 10.0)
+    assert balancer.acquire() == 1
+
+
+def test_p2c_never_picks_the_worst_of_its_two_candidates():
+    balancer = warmed("p2c", [10.0, 10.0, 500.0], seed=1)
+    picks = []
+    for _ in range(200):
+        index = balancer.acquire()
+        picks.append(index)
+        balancer.release(index, 1, balancer.loads[index].p95_ms)
+    assert 2 not in picks
+    assert {0, 1} <= set(picks)
+
+
+def test_p95_follows_the_latency_window():
+    load = ReplicaLoad(window=4)
+    for latency in (1, 2, 3, 100):
+        load.observe(latency)
+    assert load.p95_ms == 100
+    for latency in (1, 2, 3, 4):
+        load.observe(latency)
+    assert load.p95_ms == 4
+    load.outstanding = 2
+    assert load.score == 12
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ConfigurationError):
+        LoadBalancer(2, "round_robin")
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from lexicontrail.batching import MicroBatcher
+from lexicontrail.exceptions import AgentError
+from lexicontrail.mock_agents import BaseAgent
+
+
+class RecordingAgent(BaseAgent):
+    def __init__(self, fail=False, drop=False):
+        super().__init__("Recorder")
+        self.batches = []
+        self.fail = fail
+        self.drop = drop
+
+    def process(self, item):
+        return item * 2
+
+    def process_batch(self, inputs):
+        self.batches.append(list(inputs))
+        if self.fail:
+            raise ValueError("model crashed")
+        results = [self.process(item) for item in inputs]
+        return results[1:] if self.drop else results
+
+
+def submit_all(batcher, items):
+    return [batcher.submit(item) for item in items]
+
+
+def test_concurrent_requests_are_batched_up_to_batch_size():
+    agent = RecordingAgent()
+    batcher = MicroBatcher(agent, batch_size=4, max_wait_ms=1000)
+    try:
+        futures = submit_all(batcher, range(8))
+        assert [future.result(timeout=5) for future in futures] == [i * 2 for i in range(8)]
+    finally:
+        batcher.close()
+    # Full batches are dispatched without waiting out max_wait_ms
+    assert agent.batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert batcher.stats()["batch_sizes"]["count"] == 2
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    agent = RecordingAgent()
+    batcher = MicroBatcher(agent, batch_size=8, max_wait_ms=30)
+    try:
+        start = time.perf_counter()
+        futures = submit_all(batcher, range(3))
+        assert [future.result(timeout=5) for future in futures] == [0, 2, 4]
+        elapsed = time.perf_counter() - start
+    finally:
+        batcher.close()
+    assert agent.batches == [[0, 1, 2]]
+    assert 0.03 <= elapsed < 1
+
+
+def test_batch_failure_reaches_every_caller():
+    agent = RecordingAgent(fail=True)
+    batcher = MicroBatcher(agent, batch_size=2, max_wait_ms=1000)
+    try:
+        futures = submit_all(batcher, range(2))
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(timeout=5)
+    finally:
+        batcher.close()
+    assert agent.metrics["errors"] == 2
+
+
+def test_wrong_result_count_is_an_agent_error():
+    batcher = MicroBatcher(RecordingAgent(drop=True), batch_size=1)
+    try:
+        with pytest.raises(AgentError):
+            batcher.process(1, timeout=5)
+    finally:
+        batcher.close()
+
+
+def test_close_drains_queue_and_rejects_new_requests():
+    agent = RecordingAgent()
+    gate = threading.Event()
+    process_batch = agent.process_batch
+    agent.process_batch = lambda inputs: gate.wait() and process_batch(inputs)
+    batcher = MicroBatcher(agent, batch_size=1, max_wait_ms=0)
+    futures = submit_all(batcher, range(3))
+    closer = threading.Thread(target=batcher.close)
+    closer.start()
+    gate.set()
+    closer.join(timeout=5)
+    assert [future.result(timeout=0) for future in futures] == [0, 2, 4]
+    with pytest.raises(AgentError):
+        batcher.submit(4)
@@ -0,0 +1,57 @@
+from lexicontrail import bench
+from lexicontrail.client import LexiconTrailClient
+
+
+def test_config_overrides_keep_section_defaults(monkeypatch):
+    configs = []
+
+    class RecordingClient(LexiconTrailClient):
+        def __init__(self, api_key, config=None):
+            configs.append(config)
+            super().__init__(api_key, config=config)
+
+    monkeypatch.setattr(bench, "LexiconTrailClient", RecordingClient)
+    bench.run_benchmark(scenarios=("route",), requests=4, concurrency=1, warmup=0,
+                        config={"retrieval_config": {"hybrid": "dense"}, "slm_config": {"batch_size": 2}})
+
+    defaults = LexiconTrailClient._default_config()
+    config = configs[0]
+    assert config["retrieval_config"] == dict(defaults["retrieval_config"], hybrid="dense")
+    assert config["slm_config"] == dict(defaults["slm_config"], batch_size=2)
+    assert config["tracing"] == defaults["tracing"]
+    assert config["cache_enabled"] is False
+
+
+def test_each_scenario_gets_a_fresh_client(monkeypatch):
+    clients = []
+
+    class RecordingClient(LexiconTrailClient):
+        def __init__(self, api_key, config=None):
+            super().__init__(api_key, config=config)
+            clients.append(self)
+
+    monkeypatch.setattr(bench, "LexiconTrailClient", RecordingClient)
+    report = bench.run_benchmark(scenarios=("analyze", "query"), requests=2, concurrency=1, warmup=0)
+
+    assert set(report["scenarios"]) == {"analyze", "query"}
+    assert len(clients) == 2 and clients[0] is not clients[1]
+
+
+def test_route_requests_carry_the_query_type(monkeypatch):
+    types = []
+    original = LexiconTrailClient.__init__
+
+    def init(self, api_key, config=None):
+        original(self, api_key, config=config)
+        route = self.orchestrator.route_request
+
+        def recording(request):
+            types.append(request["type"])
+            return route(request)
+
+        self.orchestrator.route_request = recording
+
+    monkeypatch.setattr(LexiconTrailClient, "__init__", init)
+    bench.run_benchmark(scenarios=("route",), requests=4, concurrency=1, warmup=0, mix={"factual": 1.0})
+
+    assert types == ["factual"] * 4
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from lexicontrail import cache as cache_module
+from lexicontrail.cache import QueryCache, SemanticCache, create_cache_backend, make_cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = QueryCache(max_size=4, ttl=10)
+    cache.set("a", 1)
+    clock.now += 9.9
+    assert cache.get("a") == 1
+    clock.now += 0.1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_set_refreshes_ttl(clock):
+    cache = QueryCache(max_size=4, ttl=10)
+    cache.set("a", 1)
+    clock.now += 8
+    cache.set("a", 2)
+    clock.now += 8
+    assert cache.get("a") == 2
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = QueryCache(max_size=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_zero_size_cache_stores_nothing(clock):
+    cache = QueryCache(max_size=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_keys_ignore_case_whitespace_and_context_order():
+    assert make_cache_key("What  is Basel?") == make_cache_key("what is basel?")
+    assert make_cache_key("q", {"a": 1, "b": 2}) == make_cache_key("q", {"b": 2, "a": 1})
+    assert make_cache_key("q", {"a": 1}) != make_cache_key("q")
+
+
+def test_backend_follows_config():
+    assert create_cache_backend({"cache_enabled": False}) is None
+    cache = create_cache_backend({"cache_enabled": True, "cache_max_size": 3, "cache_ttl": 5})
+    assert isinstance(cache, QueryCache)
+    assert (cache.max_size, cache.ttl) == (3, 5)
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_semantic_hit_needs_the_threshold(clock):
+    cache = SemanticCache(dim=2, threshold=0.95)
+    cache.set(unit(1, 0), "factual", "what is basel", "answer")
+    value, cached_query, similarity = cache.get(unit(1, 0.2), "factual")
+    assert (value, cached_query) == ("answer", "what is basel")
+    assert similarity == pytest.approx(float(unit(1, 0) @ unit(1, 0.2)))
+    # cos = 0.89, below the threshold
+    assert cache.get(unit(1, 0.5), "factual") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_semantic_hits_stay_within_their_partition(clock):
+    cache = SemanticCache(dim=2, threshold=0.9)
+    cache.set(unit(1, 0), ("factual", ("q", ""), 1), "q", "factual answer")
+    cache.set(unit(1, 0.01), ("explanatory", ("q", ""), 1), "q", "explanatory answer")
+    assert cache.get(unit(1, 0), ("factual", ("q", ""), 1))[0] == "factual answer"
+    assert cache.get(unit(1, 0), ("explanatory", ("q", ""), 1))[0] == "explanatory answer"
+    assert cache.get(unit(1, 0), ("factual", ("q", ""), 2)) is None
+
+
+def test_semantic_entries_expire_and_lru_is_overwritten(clock):
+    cache = SemanticCache(dim=2, max_size=2, ttl=10, threshold=0.99)
+    cache.set(unit(1, 0), "p", "a", 1)
+    clock.now += 1
+    cache.set(unit(0, 1), "p", "b", 2)
+    clock.now += 1
+    assert cache.get(unit(1, 0), "p")[0] == 1  # "b" is now least recently used
+    cache.set(unit(1, 1), "p", "c", 3)
+    assert cache.get(unit(0, 1), "p") is None
+    assert cache.stats()["evictions"] == 1
+
+    clock.now += 10
+    assert cache.get(unit(1, 0), "p") is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 2
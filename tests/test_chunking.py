@@ -0,0 +1,58 @@
+import io
+
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from llama_index.core.node_parser import SentenceSplitter
+
+from lexicontrail.chunking import iter_chunk_windows
+
+
+def stream_chunks(text, splitter, window_chars, metadata_str=""):
+    chunks = []
+    for window in iter_chunk_windows(io.StringIO(text), splitter, window_chars, metadata_str):
+        chunks.extend(window.chunks)
+    return chunks
+
+
+def test_repetitive_text_streams_like_one_shot_split():
+    splitter = SentenceSplitter(chunk_size=128, chunk_overlap=20)
+    text = "The court held that the statute applies. " * 2000
+    assert stream_chunks(text, splitter, window_chars=4096) == splitter.split_text(text)
+
+
+def test_carry_stays_within_one_chunk():
+    splitter = SentenceSplitter(chunk_size=128, chunk_overlap=20)
+    text = "The court held that the statute applies. " * 2000
+    windows = list(iter_chunk_windows(io.StringIO(text), splitter, window_chars=4096))
+    # Every full window completes chunks instead of growing the carry
+    assert all(window.chunks for window in windows if len(window.text) == 4096)
+    assert sum(len(window.chunks) for window in windows) == len(splitter.split_text(text))
+
+
+def test_metadata_aware_streaming_matches_one_shot_split():
+    splitter = SentenceSplitter(chunk_size=128, chunk_overlap=20)
+    text = " ".join(f"Paragraph {i} cites 15 U.S.C. § {i}; see also docket No. 19-cv-{i:05d}.\n"
+                    for i in range(800))
+    metadata = "title: Annual filing"
+    assert (stream_chunks(text, splitter, 3000, metadata)
+            == splitter.split_text_metadata_aware(text, metadata))
+
+
+class WordSplitter:
+    """Splitter exposing only the public ``split_text``"""
+
+    def __init__(self, words_per_chunk):
+        self.words_per_chunk = words_per_chunk
+
+    def split_text(self, text):
+        words = text.split()
+        return [" ".join(words[i:i + self.words_per_chunk])
+                for i in range(0, len(words), self.words_per_chunk)]
+
+
+def test_streaming_uses_only_the_public_splitter_api():
+    splitter = WordSplitter(7)
+    text = " ".join(f"w{i}" for i in range(5000))
+    assert stream_chunks(text, splitter, window_chars=1000) == splitter.split_text(text)
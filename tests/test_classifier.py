@@ -0,0 +1,56 @@
+import pytest
+
+from lexicontrail.classifier import DEFAULT_CLASSIFIER, QueryClassifier, classify_request
+
+
+def naive_first(rules, text, default):
+    """The substring scan the compiled classifier replaces"""
+    lowered = text.lower()
+    for label, keys in rules:
+        if any(key in lowered for key in keys):
+            return label
+    return default
+
+
+@pytest.mark.parametrize("query, query_type, route", [
+    ("What is the LCR?", "explanatory", "question"),
+    ("How do I file", "procedural", "query"),
+    # Rule order decides, not keyword position
+    ("Why and how did rates rise?", "procedural", "question"),
+    ("Explain how the document was filed", "explanatory", "document"),
+    # Substring matching: "how" fires inside "show"
+    ("show the filings", "procedural", "query"),
+    ("Capital ratio for 2024", "factual", "query"),
+])
+def test_default_rules(query, query_type, route):
+    result = DEFAULT_CLASSIFIER.classify(query)
+    assert (result.query_type, result.route) == (query_type, route)
+
+
+def test_matches_the_substring_scan_with_overlapping_keywords():
+    classifier = QueryClassifier(
+        query_type_rules=[("port", ("port",)), ("report", ("report", "rep")), ("other", ("or",))],
+        route_rules=[("long", ("reporting",)), ("short", ("in",))],
+    )
+    queries = ["reporting duties", "the port authority", "a rep", "for", "in", "nothing", "REPORTING"]
+    for query in queries:
+        result = classifier.classify(query)
+        assert result.query_type == naive_first(classifier.query_type_rules, query, "factual")
+        assert result.route == naive_first(classifier.route_rules, query, "query")
+    # Keywords shadowed by a longer match at the same position are still found
+    assert classifier.keywords("reporting") == {"reporting", "report", "rep", "port", "or", "in"}
+
+
+def test_summarize_counts_types_and_routes():
+    summary = DEFAULT_CLASSIFIER.summarize(["What?", "What?", "how", "rates"])
+    assert summary["query_type"] == {"explanatory": 2, "procedural": 1, "factual": 1}
+    assert summary["route"] == {"question": 2, "query": 2}
+    assert summary["combined"]["explanatory/question"] == 2
+
+
+def test_request_is_classified_once():
+    request = {"type": "Why?"}
+    first = classify_request(request)
+    request["type"] = "How"
+    assert classify_request(request) is first
+    assert first.query_type == "analytical"
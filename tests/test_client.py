@@ -0,0 +1,131 @@
+import io
+
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from lexicontrail.client import LexiconTrailClient
+
+QUESTION = "What does the Basel Committee set?"
+TEXT = "The Basel Committee sets liquidity coverage rules. " * 20
+
+
+@pytest.fixture
+def client():
+    return LexiconTrailClient(api_key="test")
+
+
+def test_delete_document_invalidates_cached_answers(client):
+    client.upsert_document("basel", TEXT)
+    assert client.query(QUESTION).sources == ("basel",)
+    assert client.query(QUESTION).metadata["cache_hit"]
+
+    client.delete_document("basel")
+    response = client.query(QUESTION)
+    assert not response.metadata["cache_hit"]
+    assert "basel" not in response.sources
+
+
+def test_upsert_document_invalidates_semantic_cache(client):
+    client.upsert_document("basel", TEXT)
+    client.query(QUESTION)
+    assert len(client.semantic_cache) == 1
+
+    client.upsert_document("basel", "Capital adequacy ratios are reviewed yearly. " * 20)
+    assert len(client.semantic_cache) == 0
+    assert not client.query(QUESTION).metadata["cache_hit"]
+
+
+def wait_for_sparse_index(client):
+    if client._sparse_thread is not None:
+        client._sparse_thread.join()
+    assert client.sparse_index.mirrors(client.vector_store)
+
+
+def test_keyword_index_is_rebuilt_from_the_store_on_open(tmp_path):
+    config = LexiconTrailClient._default_config()
+    config["index_path"] = str(tmp_path)
+    config["retrieval_config"]["hybrid"] = "sparse"
+    LexiconTrailClient(api_key="test", config=config).upsert_document(
+        "docket", "Docket No. 19-cv-00042 concerns 15 U.S.C. § 78. " * 5
+    )
+
+    reopened = LexiconTrailClient(api_key="test", config=config)
+    wait_for_sparse_index(reopened)
+    assert reopened._retrieve("19-cv-00042")[0].document_id == "docket"
+
+    # Rows written by batch workers are picked up as well
+    result, = reopened.analyze_documents(["Docket No. 21-cv-00777 was dismissed."], max_workers=1)
+    wait_for_sparse_index(reopened)
+    assert reopened._retrieve("21-cv-00777")[0].document_id == result.document_id
+
+
+def test_edits_by_another_process_invalidate_shared_cache(tmp_path):
+    config = LexiconTrailClient._default_config()
+    config.update(index_path=str(tmp_path), cache_backend="sqlite", cache_path=str(tmp_path / "cache.db"))
+    writer = LexiconTrailClient(api_key="test", config=config)
+    reader = LexiconTrailClient(api_key="test", config=config)
+    writer.upsert_document("basel", TEXT)
+    assert reader.query(QUESTION).sources == ("basel",)
+    assert writer.query(QUESTION).metadata["cache_hit"]
+    key = reader._query_key(QUESTION, None)
+
+    writer.delete_document("basel")
+    assert reader._query_key(QUESTION, None) != key
+    assert len(reader.semantic_cache) == 0
+    response = reader.query(QUESTION)
+    assert not response.metadata["cache_hit"]
+    assert "basel" not in response.sources
+
+
+def test_analyze_document_invalidates_cached_answers(client):
+    client.upsert_document("basel", TEXT)
+    client.query(QUESTION)
+    client.analyze_document("The Basel Committee also sets leverage ratio rules. " * 20)
+    assert len(client.semantic_cache) == 0
+    assert not client.query(QUESTION).metadata["cache_hit"]
+
+
+def test_streamed_document_id_comes_from_its_content(client):
+    first = client.analyze_document_stream(io.StringIO(TEXT), window_chars=256)
+    again = client.analyze_document_stream(iter([TEXT[:100].encode(), TEXT[100:].encode()]))
+    assert first.document_id == again.document_id == client.analyze_document(TEXT).document_id
+    assert client.vector_store.live_count == first.embeddings_created
+
+
+def test_replacing_a_streamed_document_invalidates_cached_answers(client):
+    client.analyze_document_stream(io.StringIO(TEXT), doc_id="basel")
+    assert client.query(QUESTION).sources == ("basel",)
+    assert client.query(QUESTION).metadata["cache_hit"]
+
+    client.analyze_document_stream(io.StringIO("Capital adequacy ratios are reviewed yearly. " * 20),
+                                   doc_id="basel")
+    assert len(client.semantic_cache) == 0
+    assert not client.query(QUESTION).metadata["cache_hit"]
+
+
+def test_reanalyzed_file_invalidates_cached_answers(client, tmp_path):
+    path = tmp_path / "basel.txt"
+    path.write_text(TEXT)
+    client.analyze_file(str(path), doc_id="basel")
+    assert client.query(QUESTION).sources == ("basel",)
+    assert client.query(QUESTION).metadata["cache_hit"]
+
+    path.write_text("Preamble. " * 50 + TEXT)
+    client.analyze_file(str(path), doc_id="basel")
+    response = client.query(QUESTION)
+    assert not response.metadata["cache_hit"]
+    assert len(client.semantic_cache) == 1
+
+
+def test_pooled_analysis_writes_from_spawned_workers(tmp_path):
+    config = LexiconTrailClient._default_config()
+    config["index_path"] = str(tmp_path)
+    client = LexiconTrailClient(api_key="test", config=config)
+    documents = [f"Docket No. 22-cv-{number:05d} was dismissed." for number in range(4)]
+
+    results = client.analyze_documents(documents, max_workers=2, batch_size=1)
+
+    assert sorted(result.document_id for result in results) == sorted(
+        client.analyze_document(text).document_id for text in documents
+    )
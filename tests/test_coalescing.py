@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from lexicontrail.coalescing import SingleFlight
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        runs = []
+
+        async def compute():
+            runs.append(1)
+            await release.wait()
+            return "answer"
+
+        leader = asyncio.ensure_future(flight.do_async("q", compute))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(flight.do_async("q", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(waiters[0], timeout=0.01)
+        release.set()
+        return await leader, await asyncio.gather(*waiters[1:]), runs, flight.stats()
+
+    leader, others, runs, stats = asyncio.run(scenario())
+    assert leader == ("answer", False)
+    assert others == [("answer", True), ("answer", True)]
+    assert runs == [1]
+    assert stats["in_flight"] == 0
+
+
+def test_cancelled_leader_hands_over_to_waiter():
+    async def scenario():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def stuck():
+            started.set()
+            await asyncio.sleep(3600)
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        leader = asyncio.ensure_future(flight.do_async("q", stuck))
+        await started.wait()
+        waiters = [asyncio.ensure_future(flight.do_async("q", compute)) for _ in range(2)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*waiters)
+
+    results = asyncio.run(scenario())
+    assert sorted(results) == [("answer", False), ("answer", True)]
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import pytest
+
+from lexicontrail.mock_agents import (
+    AgentOrchestrator,
+    DocumentAnalyzer,
+    FactVerifier,
+    QueryProcessor,
+    ResponseGenerator,
+)
+from lexicontrail.retrieval import SearchHit
+
+HITS = [SearchHit("basel:0", "basel", 0.9), SearchHit("crd:3", "crd", 0.8), SearchHit("basel:1", "basel", 0.7)]
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Name and input of every agent call, in the order they ran"""
+    log = []
+    lock = threading.Lock()
+    for cls in (DocumentAnalyzer, QueryProcessor, ResponseGenerator, FactVerifier):
+        def process(self, *args, _process=cls.process):
+            with lock:
+                log.append((self.name, args))
+            return _process(self, *args)
+        monkeypatch.setattr(cls, "process", process)
+    return log
+
+
+@pytest.fixture
+def orchestrator():
+    orchestrator = AgentOrchestrator({"agent_pool_size": 2, "timeout": 5})
+    yield orchestrator
+    orchestrator.close()
+
+
+def request(question):
+    return {"type": question, "data": question, "context": {}, "retrieval_results": {"hits": HITS}}
+
+
+@pytest.mark.parametrize("mode", ["dag", "sequential"])
+def test_generator_runs_after_query_processor_and_gets_its_result(orchestrator, calls, mode):
+    orchestrator.config["execution_mode"] = mode
+    routed = orchestrator.route_request(request("What does the Basel Committee set?"))
+    assert routed["agents_used"] == ["QueryProcessor", "ResponseGenerator"]
+    assert [name for name, _ in calls] == ["QueryProcessor", "ResponseGenerator"]
+    (generator_input,) = calls[1][1]
+    assert generator_input["QueryProcessor"] == routed["results"]["QueryProcessor"]
+    assert generator_input["hits"] == HITS
+
+
+def test_verifier_checks_the_generated_response_against_retrieved_documents(orchestrator, calls):
+    agents = [orchestrator.agents[key] for key in ("fact_verifier", "response_generator", "query_processor")]
+    results = orchestrator._execute_dag(agents, request("What does the Basel Committee set?"))
+    assert [name for name, _ in calls] == ["QueryProcessor", "ResponseGenerator", "FactVerifier"]
+    assert calls[2][1] == (results["ResponseGenerator"], ["basel", "crd"])
+    assert results["FactVerifier"]["supporting_sources"] == ["basel", "crd"]
+
+    calls.clear()
+    results = asyncio.run(orchestrator._execute_dag_async(agents, request("What does the Basel Committee set?")))
+    assert [name for name, _ in calls] == ["QueryProcessor", "ResponseGenerator", "FactVerifier"]
+    assert list(results) == ["FactVerifier", "ResponseGenerator", "QueryProcessor"]
+
+
+def test_verifier_without_generator_checks_the_request(orchestrator, calls):
+    orchestrator.route_request(request("Analyze this document: capital rules"))
+    verifier_inputs = [args for name, args in calls if name == "FactVerifier"]
+    assert verifier_inputs == [("Analyze this document: capital rules", ["basel", "crd"])]
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from lexicontrail.exceptions import ConfigurationError, RateLimitError, TimeoutError
+from lexicontrail.mock_agents import BaseAgent
+from lexicontrail.pool import AgentPool
+
+
+class GatedAgent(BaseAgent):
+    """Agent whose batches wait until ``gate`` is set"""
+
+    def __init__(self, gate):
+        super().__init__("Gated")
+        self.gate = gate
+        self.seen = []
+
+    def process(self, item):
+        self.gate.wait()
+        self.seen.append(item)
+        return item
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def gate():
+    gate = threading.Event()
+    yield gate
+    gate.set()
+
+
+@pytest.mark.parametrize("balancing", ["shared", "least_outstanding"])
+def test_full_queue_rejects_with_rate_limit_error(gate, balancing):
+    pool = AgentPool([GatedAgent(gate)], max_queue_size=2, balancing=balancing)
+    try:
+        running = pool.submit("running")
+        wait_until(lambda: pool._busy == 1)
+        queued = [pool.submit("a"), pool.submit("b")]
+        assert pool.state == "saturated"
+        with pytest.raises(RateLimitError) as error:
+            pool.submit("rejected")
+        assert error.value.retry_after > 0
+        assert pool.stats()["rejected"] == 1
+
+        gate.set()
+        assert [future.result(timeout=5) for future in [running] + queued] == ["running", "a", "b"]
+    finally:
+        pool.close()
+
+
+def test_timed_out_request_is_dropped_before_it_runs(gate):
+    agent = GatedAgent(gate)
+    pool = AgentPool([agent], timeout=0.05)
+    try:
+        running = pool.submit("running")
+        wait_until(lambda: pool._busy == 1)
+        with pytest.raises(TimeoutError):
+            pool.process("late")
+        assert pool.stats()["timed_out"] == 1
+
+        gate.set()
+        assert running.result(timeout=5) == "running"
+        assert pool.process("next") == "next"
+    finally:
+        pool.close()
+    assert agent.seen == ["running", "next"]
+
+
+def test_every_replica_gets_a_worker(gate):
+    replicas = [GatedAgent(gate) for _ in range(3)]
+    pool = AgentPool(replicas, max_queue_size=8)
+    try:
+        futures = [pool.submit(i) for i in range(3)]
+        # All three run at once, one per replica
+        wait_until(lambda: pool._busy == 3)
+        assert pool.utilization == 1.0
+        gate.set()
+        assert sorted(future.result(timeout=5) for future in futures) == [0, 1, 2]
+    finally:
+        pool.close()
+    assert all(len(replica.seen) == 1 for replica in replicas)
+
+
+def test_pool_needs_a_replica():
+    with pytest.raises(ConfigurationError):
+        AgentPool([])
@@ -0,0 +1,54 @@
+import numpy as np
+
+from lexicontrail.retrieval import IVFIndex, Retriever
+from lexicontrail.vector_store import MmapVectorStore
+
+
+def make_store(tmp_path, rows=200, dim=8):
+    rng = np.random.default_rng(0)
+    store = MmapVectorStore(str(tmp_path), dim=dim)
+    vectors = rng.standard_normal((rows, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    store.add([f"doc:{i}" for i in range(rows)], ["doc"] * rows, vectors)
+    return store, vectors
+
+
+def test_ivf_trains_in_background_and_serves_exact_meanwhile(tmp_path, monkeypatch):
+    store, vectors = make_store(tmp_path)
+    retriever = Retriever(store, embedder=None, mode="ivf", nlist=4, nprobe=4)
+    trained = []
+    train = IVFIndex.train.__func__
+
+    def record_train(cls, corpus, nlist):
+        trained.append(len(corpus))
+        return train(cls, corpus, nlist)
+
+    monkeypatch.setattr(IVFIndex, "train", classmethod(record_train))
+    query = vectors[:1]
+    first = retriever.search(query, k=3)[0]
+    assert first[0].node_id == "doc:0"
+    assert retriever._trainer is not None
+
+    retriever._trainer.join()
+    assert trained == [200]
+    assert retriever.search(query, k=3)[0] == first
+
+    # Appended rows are assigned to the trained lists without retraining
+    store.add(["late:0"], ["late"], vectors[:1] * 2)
+    assert [hit.node_id for hit in retriever.search(vectors[:1] * 2, k=1)[0]] == ["late:0"]
+    assert trained == [200]
+
+
+def test_train_after_compaction_replaces_stale_index(tmp_path):
+    store, vectors = make_store(tmp_path)
+    retriever = Retriever(store, embedder=None, mode="ivf", nlist=4, nprobe=4)
+    assert retriever.train()
+    stale = retriever._ivf
+
+    store.delete_document("doc")
+    store.add(["new:0"], ["new"], vectors[:1])
+    store.compact()
+    assert retriever.train()
+    assert retriever._ivf is not stale
+    assert retriever._ivf.ntotal == len(store)
+    assert [hit.node_id for hit in retriever.search(vectors[:1], k=1)[0]] == ["new:0"]
@@ -0,0 +1,45 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+pytest.importorskip("llama_index.core")
+
+from lexicontrail.client import QueryResponse
+from lexicontrail.serialization import DataclassCodec
+from lexicontrail.sqlite_cache import SQLiteCache
+
+
+def make_response(**metadata):
+    return QueryResponse("answer", 0.9, ("doc",), ("QueryProcessor",), 12, metadata)
+
+
+class Exploit:
+    def __reduce__(self):
+        return os.system, ("exit 1",)
+
+
+def test_loads_never_unpickles():
+    codec = DataclassCodec(QueryResponse)
+    row = tuple(getattr(make_response(), name) for name in codec.field_names)
+    payload = b"p" + codec._header + pickle.dumps(row + (Exploit(),))
+    assert codec.loads(payload) is None
+
+
+def test_dumps_coerces_numpy_values_to_builtins():
+    codec = DataclassCodec(QueryResponse)
+    response = make_response(score=np.float32(0.5), ranks=np.arange(3))
+    decoded = codec.loads(codec.dumps(response))
+    assert decoded.metadata == {"score": 0.5, "ranks": [0, 1, 2]}
+    assert type(decoded.metadata["score"]) is float
+
+
+def test_unencodable_values_are_not_cached(tmp_path):
+    codec = DataclassCodec(QueryResponse)
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), codec)
+    assert codec.dumps(make_response(handle=object())) is None
+    cache.set("key", make_response(handle=object()))
+    assert cache.get("key") is None
+    cache.set("key", make_response())
+    assert cache.get("key") == make_response()
@@ -0,0 +1,107 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from lexicontrail.sparse_index import InvertedIndex, analyze
+from lexicontrail.vector_store import MmapVectorStore
+
+
+def reference_scores(texts, query, k1=1.2, b=0.75):
+    """Okapi BM25 computed directly from the texts"""
+    docs = [Counter(analyze(text)) for text in texts]
+    avg_length = sum(sum(doc.values()) for doc in docs) / len(docs)
+    scores = {}
+    for entry, doc in enumerate(docs):
+        length = sum(doc.values())
+        score = 0.0
+        for term in dict.fromkeys(analyze(query)):
+            df = sum(1 for other in docs if term in other)
+            if not df or term not in doc:
+                continue
+            idf = math.log(1.0 + (len(docs) - df + 0.5) / (df + 0.5))
+            tf = doc[term]
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+        if score:
+            scores[f"n{entry}"] = score
+    return scores
+
+
+def corpus(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    words = [f"w{i}" for i in range(50)]
+    texts = []
+    for i in range(n):
+        text = " ".join(rng.choice(words, size=rng.integers(5, 40)))
+        if i % 150 == 0:
+            # Gaps and frequencies past one varint byte
+            text += " docket" * 200
+        texts.append(text)
+    return texts
+
+
+def build(texts, numbers=None):
+    index = InvertedIndex()
+    for i, text in zip(numbers or range(len(texts)), texts):
+        index.add(f"d{i}", [f"n{i}"], [text])
+    return index
+
+
+def scores_by_document(index, query):
+    return {hit.document_id: hit.score for hit in index.search(query, k=1000)}
+
+
+@pytest.mark.parametrize("query", ["w1 w7", "docket w3", "W12, w12 and w40"])
+def test_scores_match_bm25(query):
+    texts = corpus()
+    hits = build(texts).search(query, k=len(texts))
+    expected = reference_scores(texts, query)
+    assert {hit.node_id: hit.score for hit in hits} == pytest.approx(expected)
+    assert [hit.score for hit in hits] == sorted((hit.score for hit in hits), reverse=True)
+
+
+def test_terms_keep_citations_and_skip_stopwords():
+    index = InvertedIndex()
+    index.add("code", ["c:0"], ["See 15 U.S.C. § 78 and case 19-cv-00042."], spans=[(10, 52)])
+    hit, = index.search("what is 19-cv-00042")
+    assert (hit.document_id, hit.byte_range) == ("code", (10, 52))
+    assert index.search("u.s.c")[0].node_id == "c:0"
+    assert index.search("what is the") == []
+
+
+def test_deleted_entries_are_skipped_and_compact_drops_them():
+    texts = corpus()
+    index = build(texts)
+    for i in range(0, len(texts), 3):
+        index.delete_document(f"d{i}")
+    hits = index.search("docket w5", k=len(texts))
+    assert all(int(hit.node_id[1:]) % 3 for hit in hits)
+
+    assert index.compact() == len(range(0, len(texts), 3))
+    kept = [i for i in range(len(texts)) if i % 3]
+    fresh = build([texts[i] for i in kept], kept)
+    assert scores_by_document(index, "docket w5") == pytest.approx(scores_by_document(fresh, "docket w5"))
+
+
+def test_sync_follows_store_deletes_and_compaction(tmp_path):
+    texts = corpus(60)
+    store = MmapVectorStore(str(tmp_path), dim=2)
+    for i, text in enumerate(texts):
+        store.add([f"n{i}"], [f"d{i}"], np.ones((1, 2), dtype=np.float32), texts=[text])
+    index = InvertedIndex()
+    assert index.sync(store) and index.mirrors(store)
+
+    store.delete_document("d0")
+    store.add(["n60"], ["d60"], np.ones((1, 2), dtype=np.float32), texts=["docket late"])
+    assert not index.mirrors(store)
+    assert index.sync(store) and index.mirrors(store)
+    found = {hit.document_id for hit in index.search("docket", k=100)}
+    assert "d0" not in found and "d60" in found
+
+    store.compact()
+    assert not index.sync(store)
+    rebuilt = InvertedIndex()
+    assert rebuilt.sync(store) and rebuilt.mirrors(store)
+    index.compact()
+    assert scores_by_document(rebuilt, "docket w2") == pytest.approx(scores_by_document(index, "docket w2"))
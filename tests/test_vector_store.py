@@ -0,0 +1,80 @@
+import numpy as np
+
+from lexicontrail.vector_store import MmapVectorStore
+
+
+def add_document(store, doc_id, rows, rng):
+    vectors = rng.random((rows, store.dim), dtype=np.float32)
+    store.add([f"{doc_id}:{i}" for i in range(rows)], [doc_id] * rows, vectors)
+    return vectors
+
+
+def live_rows(store):
+    snapshot = store.snapshot()
+    rows = range(len(snapshot.vectors)) if snapshot.live_mask is None else np.flatnonzero(snapshot.live_mask)
+    return {snapshot.chunks.node_id(row): snapshot.vectors[row].tolist() for row in rows}
+
+
+def test_compact_keeps_edits_made_while_rewriting(tmp_path):
+    rng = np.random.default_rng(0)
+    store = MmapVectorStore(str(tmp_path), dim=4)
+    for i in range(6):
+        add_document(store, f"doc{i}", 3, rng)
+    store.delete_document("doc0")
+    store.delete_document("doc2")
+
+    copy_rows = store._copy_rows
+
+    def edit_during_rewrite(*args, **kwargs):
+        header = copy_rows(*args, **kwargs)
+        if kwargs.get("truncate"):
+            # The rewrite runs without the store lock, so edits go through
+            add_document(store, "late", 2, rng)
+            store.delete_document("doc1")
+        return header
+
+    store._copy_rows = edit_during_rewrite
+    expected_ids = {f"doc{i}:{j}" for i in (3, 4, 5) for j in range(3)} | {"late:0", "late:1"}
+    assert store.compact() == 6
+
+    assert store.generation == 1
+    assert set(live_rows(store)) == expected_ids
+    reopened = MmapVectorStore(str(tmp_path), dim=4)
+    assert live_rows(reopened) == live_rows(store)
+    assert sorted(reopened.document_ids()) == ["doc3", "doc4", "doc5", "late"]
+
+
+def test_read_texts_follows_rows_through_compaction(tmp_path):
+    rng = np.random.default_rng(0)
+    store = MmapVectorStore(str(tmp_path), dim=4)
+    store.add(["a:0", "a:1"], ["a", "a"], rng.random((2, 4)), texts=["first", "second"])
+    store.add(["b:0"], ["b"], rng.random((1, 4)))
+    texts, cursor = store.read_texts()
+    assert texts == ["first", "second", None]
+    store.add(["c:0"], ["c"], rng.random((1, 4)), texts=["third"])
+    assert store.read_texts(cursor)[0] == ["third"]
+
+    store.delete_document("a")
+    store.compact()
+    # The old cursor is stale; a new one starts over on the compacted rows
+    assert store.read_texts(cursor) == ([], cursor)
+    assert store.read_texts()[0] == [None, "third"]
+
+
+def test_file_rows_reference_their_source_instead_of_copying_text(tmp_path):
+    source = tmp_path / "filing.txt"
+    data = "Docket No. 19-cv-00042 — § 78 applies.".encode("utf-8")
+    source.write_bytes(data)
+    spans = [(0, 22), (data.index("§".encode("utf-8")), len(data))]
+    store = MmapVectorStore(str(tmp_path / "store"), dim=4)
+    store.add(["f:0", "f:1"], ["f", "f"], np.ones((2, 4), dtype=np.float32), spans=spans,
+              source_path=str(source))
+    store.add(["t:0"], ["t"], np.ones((1, 4), dtype=np.float32), texts=["plain text"])
+
+    sidecar = (tmp_path / "store" / "texts.jsonl").read_text(encoding="utf-8")
+    assert "19-cv-00042" not in sidecar
+    texts, _ = store.read_texts()
+    assert texts == ["Docket No. 19-cv-00042", "§ 78 applies.", "plain text"]
+
+    source.unlink()
+    assert store.read_texts()[0] == [None, None, "plain text"]